@@ -0,0 +1,166 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional
+    aioredis = None
+
+
+class AuthenticatedUser:
+    """Snapshot of the user fields endpoints need, safe to cache across requests"""
+
+    __slots__ = ("id", "email", "phone", "full_name", "age", "gender")
+
+    def __init__(self, id: int, email: str, phone: str, full_name: str, age: int, gender: str):
+        self.id = id
+        self.email = email
+        self.phone = phone
+        self.full_name = full_name
+        self.age = age
+        self.gender = gender
+
+    @classmethod
+    def from_model(cls, user) -> "AuthenticatedUser":
+        return cls(user.id, user.email, user.phone, user.full_name, user.age, user.gender)
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class _TTLMap:
+    """Small LRU map whose entries expire at a per-entry deadline"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[object, Tuple[object, float]]" = OrderedDict()
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, expires_at: float):
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class AuthCache:
+    """
+    Short-lived cache of decoded tokens and authenticated users.
+
+    The in-process tier answers most requests without a database round trip.
+    When a Redis URL is given, users are also shared through Redis so other
+    workers can skip the lookup too. Entries expire after `ttl_seconds`, and
+    invalidate_user() must be called whenever a user changes.
+    """
+
+    KEY_PREFIX = "medialert:auth:user:"
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 10000,
+                 redis_url: Optional[str] = None, redis_client=None):
+        self.ttl_seconds = ttl_seconds
+        self._tokens = _TTLMap(max_entries)
+        self._users = _TTLMap(max_entries)
+        self.redis = redis_client
+        if self.redis is None and redis_url:
+            if aioredis is None:
+                print("REDIS_URL is set but the redis package is not installed; using local auth cache only")
+            else:
+                self.redis = aioredis.from_url(redis_url)
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    # ---------- tokens ----------
+
+    def get_token(self, token: str) -> Optional[int]:
+        """User id for an already-decoded token"""
+        return self._tokens.get(token)
+
+    def set_token(self, token: str, user_id: int, token_expires_at: Optional[float]):
+        """Remember a decoded token, never beyond its own expiry"""
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        self._tokens.set(token, user_id, expires_at)
+
+    # ---------- users ----------
+
+    async def get_user(self, user_id: int) -> Optional[AuthenticatedUser]:
+        user = self._users.get(user_id)
+        if user is not None:
+            self.hits += 1
+            return user
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self.KEY_PREFIX + str(user_id))
+            except Exception as e:
+                print(f"Auth cache Redis error: {e}")
+                raw = None
+            if raw is not None:
+                user = AuthenticatedUser(**json.loads(raw))
+                self._users.set(user_id, user, time.time() + self.ttl_seconds)
+                self.redis_hits += 1
+                return user
+
+        self.misses += 1
+        return None
+
+    async def set_user(self, user: AuthenticatedUser):
+        self._users.set(user.id, user, time.time() + self.ttl_seconds)
+        if self.redis is not None:
+            try:
+                await self.redis.set(self.KEY_PREFIX + str(user.id), json.dumps(user.to_dict()),
+                                     ex=max(1, int(self.ttl_seconds)))
+            except Exception as e:
+                print(f"Auth cache Redis error: {e}")
+
+    def invalidate_user(self, user_id: int):
+        """Drop a user from every tier; safe to call from sync code such as ORM events"""
+        self._users.pop(user_id)
+        if self.redis is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self._delete_shared(user_id))
+
+    async def _delete_shared(self, user_id: int):
+        try:
+            await self.redis.delete(self.KEY_PREFIX + str(user_id))
+        except Exception as e:
+            print(f"Auth cache Redis error: {e}")
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.close()
+
+    def stats(self) -> Dict:
+        return {
+            "tokens": len(self._tokens),
+            "users": len(self._users),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,91 @@
+"""
+Latency benchmark for /api/hospitals/nearby.
+
+Seeds a throwaway SQLite database with N synthetic hospitals spread across
+Nigeria, loads them into the hospital store and reports p50/p99 latency of
+the nearby lookup at each size.
+
+Usage (from the backend directory):
+    python benchmarks/bench_nearby.py
+    python benchmarks/bench_nearby.py --sizes 1000 10000 --queries 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.mkdtemp(prefix="medialert-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/app.db")
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from datagen import LAT_RANGE, LON_RANGE, hospital_rows  # noqa: E402
+from database import Base  # noqa: E402
+from models import Hospital  # noqa: E402
+from pagination import PageParams  # noqa: E402
+from main import get_nearby_hospitals, hospital_store  # noqa: E402
+
+
+def seed(session, count: int, rng: random.Random):
+    """Bulk insert synthetic hospitals"""
+    session.execute(insert(Hospital), hospital_rows(count, rng))
+    session.commit()
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(sizes, queries: int, radius_km: int, seed_value: int):
+    rng = random.Random(seed_value)
+    page = PageParams(limit=50, cursor=None, fields=None)
+    print(f"{'hospitals':>10} {'p50 ms':>10} {'p99 ms':>10} {'avg hits':>10}")
+
+    for size in sizes:
+        path = f"{_tmpdir}/nearby_{size}.db"
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as session:
+            seed(session, size, rng)
+        engine.dispose()
+
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with async_sessionmaker(async_engine)() as session:
+            await hospital_store.reload(session)
+        await async_engine.dispose()
+
+        timings = []
+        hits = 0
+        for _ in range(queries):
+            lat = rng.uniform(*LAT_RANGE)
+            lon = rng.uniform(*LON_RANGE)
+            start = time.perf_counter()
+            result = await get_nearby_hospitals(lat, lon, radius_km, services=None, emergency=None, page=page)
+            timings.append((time.perf_counter() - start) * 1000)
+            hits += len(json.loads(result.body))
+
+        print(f"{size:>10} {percentile(timings, 50):>10.3f} {percentile(timings, 99):>10.3f} "
+              f"{hits / queries:>10.1f}")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.queries, args.radius, args.seed))
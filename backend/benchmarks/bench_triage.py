@@ -0,0 +1,88 @@
+"""
+Micro-benchmark for symptom triage matching.
+
+Compares the compiled Aho-Corasick lexicon with the previous nested
+substring scan, using the shipped lexicon padded with synthetic terms.
+
+Usage (from the backend directory):
+    python benchmarks/bench_triage.py
+    python benchmarks/bench_triage.py --vocab 100 1000 5000 --iterations 2000
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from triage import DEFAULT_LEXICON_PATH, TriageLexicon, normalize  # noqa: E402
+
+SAMPLE_SYMPTOMS = [
+    "Severe headache since morning",
+    "body dey hot and I dey vomit",
+    "Mild stomach ache after eating",
+    "Feeling tired and weak",
+    "Pain in lower back when walking",
+]
+
+
+def legacy_classify(symptoms, critical_terms, warning_terms):
+    """The nested any(keyword in symptom) scan previously used by assess_symptoms"""
+    symptoms_lower = [s.lower() for s in symptoms]
+    critical = any(any(c in s for c in critical_terms) for s in symptoms_lower)
+    warning_count = sum(1 for s in symptoms_lower if any(w in s for w in warning_terms))
+    return critical, warning_count
+
+
+def build_lexicon(extra_terms: int, rng: random.Random) -> dict:
+    with open(DEFAULT_LEXICON_PATH, encoding="utf-8") as f:
+        lexicon = json.load(f)
+    for i in range(extra_terms):
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 14)))
+        category = "critical" if i % 4 == 0 else "warning"
+        lexicon[category][f"synthetic {word}"] = []
+    return lexicon
+
+
+def flatten(entries: dict) -> list:
+    return [normalize(t) for canonical, synonyms in entries.items() for t in [canonical, *synonyms]]
+
+
+def timed(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(vocab_sizes, iterations: int):
+    rng = random.Random(7)
+    print(f"{'terms':>8} {'legacy us':>12} {'automaton us':>14} {'speedup':>9}")
+    for extra in vocab_sizes:
+        lexicon = build_lexicon(extra, rng)
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+            json.dump(lexicon, f)
+            path = f.name
+        try:
+            compiled = TriageLexicon(path, check_interval=3600)
+            critical_terms = flatten(lexicon["critical"])
+            warning_terms = flatten(lexicon["warning"])
+
+            legacy_us = timed(lambda: legacy_classify(SAMPLE_SYMPTOMS, critical_terms, warning_terms), iterations)
+            compiled_us = timed(lambda: compiled.classify(SAMPLE_SYMPTOMS), iterations)
+            print(f"{compiled.terms:>8} {legacy_us:>12.1f} {compiled_us:>14.1f} {legacy_us / compiled_us:>8.1f}x")
+        finally:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vocab", type=int, nargs="+", default=[0, 1_000, 5_000])
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.vocab, args.iterations)
@@ -0,0 +1,89 @@
+"""
+Connection reuse benchmark for Healthsites.io lookups.
+
+Sends N cache-missing lookups through HospitalService against the local
+stub and reports how many TCP connections the stub saw, next to the same
+requests made with a fresh ClientSession each time (the old behaviour).
+It then fires a burst of concurrent lookups in one cell to show they are
+coalesced into a single upstream request.
+
+Usage (from the backend directory):
+    python benchmarks/bench_upstream_pool.py --requests 50 --burst 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import aiohttp  # noqa: E402
+
+from healthsites_stub import HealthsitesStub  # noqa: E402
+from services.hospital_service import HospitalService  # noqa: E402
+
+
+async def shared_session(stub: HealthsitesStub, count: int) -> float:
+    service = HospitalService()
+    service.HEALTHSITES_URL = stub.url
+    await service.start()
+    start = time.perf_counter()
+    for i in range(count):
+        # Step far enough that every lookup lands in a new cache cell
+        await service.get_real_hospitals(4.0 + i * 0.05, 6.9271, 10)
+    elapsed = time.perf_counter() - start
+    await service.close()
+    return elapsed
+
+
+async def session_per_request(stub: HealthsitesStub, count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        async with aiohttp.ClientSession() as session:
+            params = {"latitude": 4.0 + i * 0.05, "longitude": 6.9271, "radius": 10000}
+            async with session.get(stub.url, params=params) as resp:
+                await resp.json()
+    return time.perf_counter() - start
+
+
+async def burst(count: int):
+    stub = HealthsitesStub(delay_seconds=0.05)
+    await stub.start()
+    service = HospitalService()
+    service.HEALTHSITES_URL = stub.url
+    await service.start()
+
+    start = time.perf_counter()
+    # Slightly different GPS fixes within the same cache cell
+    await asyncio.gather(*(
+        service.get_real_hospitals(4.8156 + (i % 7) * 0.0001, 6.9271, 10)
+        for i in range(count)
+    ))
+    elapsed = time.perf_counter() - start
+
+    await service.close()
+    await stub.stop()
+    print(f"{'concurrent burst':>20}: {count} lookups, {stub.requests} upstream requests, "
+          f"{elapsed * 1000:.1f} ms total")
+
+
+async def main(count: int, burst_size: int):
+    for label, runner in (("shared session", shared_session), ("session per request", session_per_request)):
+        stub = HealthsitesStub()
+        await stub.start()
+        elapsed = await runner(stub, count)
+        await stub.stop()
+        print(f"{label:>20}: {stub.requests} requests, {len(stub.connections)} connections, "
+              f"{elapsed * 1000 / count:.2f} ms/request")
+    await burst(burst_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--burst", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.burst))
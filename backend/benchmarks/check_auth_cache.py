@@ -0,0 +1,140 @@
+"""
+Behaviour check for AuthCache and its optional Redis tier.
+
+Runs against a small in-memory stand-in for redis.asyncio (no server
+needed): users cached by one worker are served to another through Redis,
+entries expire, invalidation clears both tiers, and a Redis that errors
+falls back to the in-process tier without failing requests. Exits non-zero
+if any check fails.
+
+Usage (from the backend directory):
+    python benchmarks/check_auth_cache.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from auth_cache import AuthCache, AuthenticatedUser  # noqa: E402
+
+
+class LocalRedis:
+    """The few redis.asyncio calls AuthCache makes, kept in a dict"""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = 0
+
+    async def get(self, key):
+        self.calls += 1
+        item = self.data.get(key)
+        if item is None or (item[1] is not None and item[1] <= time.time()):
+            return None
+        return item[0]
+
+    async def set(self, key, value, ex=None):
+        self.calls += 1
+        if isinstance(value, str):
+            value = value.encode()
+        self.data[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    async def delete(self, key):
+        self.calls += 1
+        return int(self.data.pop(key, None) is not None)
+
+    async def close(self):
+        pass
+
+
+class BrokenRedis:
+    """A Redis whose connection is gone"""
+
+    async def _fail(self, *args, **kwargs):
+        raise ConnectionError("Connection refused")
+
+    get = set = delete = _fail
+
+    async def close(self):
+        pass
+
+
+def make_user(user_id: int = 7, name: str = "Ada Obi") -> AuthenticatedUser:
+    return AuthenticatedUser(user_id, f"user{user_id}@example.com", "+2348030000000", name, 30, "female")
+
+
+def check(name: str, result: bool, failures: list):
+    print(f"{'ok  ' if result else 'FAIL'} {name}")
+    if not result:
+        failures.append(name)
+
+
+async def main() -> int:
+    failures = []
+
+    # Tokens: served from memory, never past the token's own expiry
+    cache = AuthCache(ttl_seconds=60)
+    cache.set_token("t1", 7, None)
+    cache.set_token("t2", 7, time.time() - 1)
+    check("token cached", cache.get_token("t1") == 7, failures)
+    check("token not kept past its expiry", cache.get_token("t2") is None, failures)
+
+    # In-process tier
+    await cache.set_user(make_user())
+    user = await cache.get_user(7)
+    check("user served from memory", user is not None and user.full_name == "Ada Obi"
+          and cache.hits == 1, failures)
+    cache.invalidate_user(7)
+    check("invalidated user is a miss", await cache.get_user(7) is None and cache.misses == 1, failures)
+
+    short = AuthCache(ttl_seconds=0.05)
+    await short.set_user(make_user())
+    await asyncio.sleep(0.1)
+    check("user expires after the ttl", await short.get_user(7) is None, failures)
+
+    # Shared tier: two workers, one Redis
+    redis = LocalRedis()
+    first = AuthCache(ttl_seconds=60, redis_client=redis)
+    second = AuthCache(ttl_seconds=60, redis_client=redis)
+    await first.set_user(make_user())
+    user = await second.get_user(7)
+    check("user shared with another worker", user is not None and user.email == "user7@example.com"
+          and second.redis_hits == 1, failures)
+    calls = redis.calls
+    await second.get_user(7)
+    check("shared user then served from memory", redis.calls == calls and second.hits == 1, failures)
+
+    first.invalidate_user(7)
+    await asyncio.sleep(0)  # let the scheduled Redis delete run
+    third = AuthCache(ttl_seconds=60, redis_client=redis)
+    check("invalidation clears the shared tier", await third.get_user(7) is None, failures)
+
+    # Invalidation from sync code with no event loop still clears memory
+    await first.set_user(make_user(8))
+    await asyncio.get_running_loop().run_in_executor(None, first.invalidate_user, 8)
+    check("invalidation outside the loop clears memory", first._users.get(8) is None, failures)
+
+    # Fallback: Redis errors never reach the caller
+    broken = AuthCache(ttl_seconds=60, redis_client=BrokenRedis())
+    try:
+        missing = await broken.get_user(7)
+        await broken.set_user(make_user())
+        cached = await broken.get_user(7)
+        broken.invalidate_user(7)
+        await asyncio.sleep(0)
+        after = await broken.get_user(7)
+        fell_back = missing is None and cached is not None and after is None
+    except Exception as e:
+        print(f"     {type(e).__name__}: {e}")
+        fell_back = False
+    check("broken Redis falls back to the in-process tier", fell_back, failures)
+
+    print(f"{len(failures)} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,250 @@
+"""
+Behaviour check for the SharedState backends, with a throughput report.
+
+Both backends run the same operation checks (get/mget/set/add/delete,
+delete_if, incr and expiry). RedisState runs against fakeredis, or a real
+server with --redis-url, and is skipped when neither is available. MmapState
+also gets checks for its own layout:
+
+- keys that share a home slot, including deleting from the middle of a
+  probe chain
+- a ring small enough to wrap many times, compared against a dict model
+  (evicted keys may read as missing, never as an old value)
+- several processes incrementing one counter under the file lock
+
+Then N processes each run a get/set mix on one MmapState file and the
+combined rate is printed for each N. Exits non-zero if any check fails.
+
+Usage (from the backend directory):
+    python benchmarks/check_shared_state.py --workers 1 2 4 --ops 2000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from shared_state import MmapState, RedisState, SharedState  # noqa: E402
+
+
+def check(name: str, result: bool, failures: list):
+    print(f"{'ok  ' if result else 'FAIL'} {name}")
+    if not result:
+        failures.append(name)
+
+
+async def check_operations(label: str, state: SharedState, failures: list):
+    """The SharedState contract, for any backend"""
+    await state.set("a", b"1")
+    await state.set("b", b"2")
+    check(f"{label}: get and mget", await state.get("a") == b"1"
+          and await state.mget(["a", "missing", "b"]) == [b"1", None, b"2"], failures)
+    await state.set("a", b"one")
+    check(f"{label}: set replaces", await state.get("a") == b"one", failures)
+
+    check(f"{label}: add only when missing", await state.add("c", b"x") is True
+          and await state.add("c", b"y") is False and await state.get("c") == b"x", failures)
+    await state.delete("c")
+    check(f"{label}: delete", await state.get("c") is None, failures)
+
+    await state.set("lock", b"mine")
+    kept = await state.delete_if("lock", b"theirs") is False and await state.get("lock") == b"mine"
+    check(f"{label}: delete_if keeps another owner's value", kept, failures)
+    check(f"{label}: delete_if deletes its own value", await state.delete_if("lock", b"mine") is True
+          and await state.get("lock") is None, failures)
+
+    counts = [await state.incr("n") for _ in range(3)]
+    check(f"{label}: incr counts from zero", counts == [1, 2, 3] and await state.get("n") == b"3", failures)
+
+    await state.set("short", b"v", 0.05)
+    await state.add("window", b"0", 0.05)
+    await state.incr("window")
+    fresh = await state.get("short") == b"v" and await state.get("window") == b"1"
+    await asyncio.sleep(0.1)
+    check(f"{label}: values expire after their ttl", fresh and await state.get("short") is None, failures)
+    check(f"{label}: incr keeps the key's expiry", await state.get("window") is None, failures)
+    check(f"{label}: add succeeds over an expired key", await state.add("short", b"w") is True
+          and await state.get("short") == b"w", failures)
+
+
+def colliding_keys(state: MmapState, count: int, home: int = 3):
+    """Keys whose hash lands in slot `home`"""
+    keys = []
+    n = 0
+    while len(keys) < count:
+        key = f"k{n}"
+        if state._hash(key) % state.slots == home:
+            keys.append(key)
+        n += 1
+    return keys
+
+
+async def check_collisions(path: str, failures: list):
+    state = MmapState(path, slots=16, data_bytes=64 * 1024)
+    keys = colliding_keys(state, 5)
+    for i, key in enumerate(keys):
+        await state.set(key, f"v{i}".encode())
+    check("mmap: keys sharing a home slot are all found",
+          await state.mget(keys) == [f"v{i}".encode() for i in range(len(keys))], failures)
+
+    # Deleting from the middle of the probe chain must not cut off later keys
+    await state.delete(keys[1])
+    await state.delete_if(keys[3], b"v3")
+    rest = [keys[0], keys[2], keys[4]]
+    check("mmap: deletes inside a probe chain keep the rest reachable",
+          await state.mget(rest) == [b"v0", b"v2", b"v4"]
+          and await state.get(keys[1]) is None and await state.get(keys[3]) is None, failures)
+
+    # A chain that wraps past the last slot
+    state = MmapState(path + ".wrap", slots=16, data_bytes=64 * 1024)
+    keys = colliding_keys(state, 4, home=15)
+    for i, key in enumerate(keys):
+        await state.set(key, f"w{i}".encode())
+    await state.delete(keys[0])
+    check("mmap: probe chains wrap around the slot table",
+          await state.mget(keys) == [None, b"w1", b"w2", b"w3"], failures)
+
+
+async def check_ring(path: str, failures: list):
+    state = MmapState(path, slots=256, data_bytes=4096)
+    rng = random.Random(7)
+    model = {}
+    history = {}
+    wrong = []
+    for step in range(3000):
+        key = f"key{rng.randrange(60)}"
+        op = rng.random()
+        if op < 0.6:
+            value = f"{key}:{step}:".encode() + b"x" * rng.randrange(0, 120)
+            await state.set(key, value)
+            model[key] = value
+            history.setdefault(key, set()).add(value)
+            if await state.get(key) != value:
+                wrong.append(f"step {step}: fresh write of {key} not readable")
+        elif op < 0.75:
+            await state.delete(key)
+            model.pop(key, None)
+        else:
+            got = await state.get(key)
+            # Evicted keys may read as missing; anything read must be the latest value
+            if got is not None and got != model.get(key):
+                old = got in history.get(key, ())
+                wrong.append(f"step {step}: {key} read {'an old' if old else 'a foreign'} value")
+    head, tail = state._ring()
+    check(f"mmap: ring wrapped {head // state.data_bytes} times without a wrong read",
+          head // state.data_bytes > 10 and not wrong, failures)
+    for line in wrong[:5]:
+        print(f"     {line}")
+    held = await state.mget(list(model))
+    live = sum(1 for got, value in zip(held, model.values()) if got == value)
+    print(f"     {live} of {len(model)} live keys still held after wrapping")
+
+
+def _incr_worker(path: str, count: int, go):
+    async def run():
+        state = MmapState(path)
+        go.wait()
+        for _ in range(count):
+            await state.incr("shared-counter")
+    asyncio.run(run())
+
+
+def check_processes(path: str, failures: list, processes: int = 4, count: int = 2000):
+    MmapState(path)
+    go = multiprocessing.Event()
+    workers = [multiprocessing.Process(target=_incr_worker, args=(path, count, go)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    # Start together, so the increments interleave
+    go.set()
+    for worker in workers:
+        worker.join()
+    total = asyncio.run(MmapState(path).get("shared-counter"))
+    check(f"mmap: {processes} processes x {count} incr lose no updates",
+          total == str(processes * count).encode(), failures)
+
+
+def _throughput_worker(path: str, ops: int, seed: int, go, results):
+    async def run():
+        state = MmapState(path)
+        rng = random.Random(seed)
+        value = b"x" * 512
+        go.wait()
+        started = time.perf_counter()
+        for _ in range(ops):
+            key = f"cell:{rng.randrange(1000)}"
+            if rng.random() < 0.8:
+                await state.get(key)
+            else:
+                await state.set(key, value, 60)
+        return time.perf_counter() - started
+    results.put(asyncio.run(run()))
+
+
+def report_throughput(path: str, worker_counts, ops: int):
+    print(f"\nMmapState throughput, {ops} ops per process (80% get / 20% set of 512 bytes), "
+          f"{os.cpu_count()} CPU(s):")
+    for count in worker_counts:
+        file_path = f"{path}.{count}"
+        MmapState(file_path)
+        go = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_throughput_worker, args=(file_path, ops, seed, go, results))
+                   for seed in range(count)]
+        for worker in workers:
+            worker.start()
+        go.set()
+        elapsed = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        print(f"  {count} process(es): {count * ops / max(elapsed):10.0f} ops/s combined, "
+              f"{ops / max(elapsed):8.0f} ops/s per process")
+
+
+async def redis_state(url):
+    """RedisState on the server at `url`, else on fakeredis; None when neither is available"""
+    if url:
+        return RedisState(url, prefix=f"medialert:check:{os.getpid()}:")
+    try:
+        import fakeredis
+    except ImportError:
+        return None
+    return RedisState(client=fakeredis.FakeAsyncRedis())
+
+
+async def run_checks(tmpdir: str, redis_url) -> list:
+    failures = []
+    await check_operations("mmap", MmapState(os.path.join(tmpdir, "ops")), failures)
+    redis = await redis_state(redis_url)
+    if redis is None:
+        print("skip redis: pass --redis-url or install fakeredis")
+    else:
+        await check_operations("redis", redis, failures)
+        await redis.close()
+    await check_collisions(os.path.join(tmpdir, "slots"), failures)
+    await check_ring(os.path.join(tmpdir, "ring"), failures)
+    return failures
+
+
+def main(worker_counts, ops: int, redis_url) -> int:
+    tmpdir = tempfile.mkdtemp(prefix="medialert-shared-")
+    failures = asyncio.run(run_checks(tmpdir, redis_url))
+    check_processes(os.path.join(tmpdir, "counter"), failures)
+    report_throughput(os.path.join(tmpdir, "throughput"), worker_counts, ops)
+    print(f"{len(failures)} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--redis-url", help="check RedisState against this server instead of fakeredis")
+    args = parser.parse_args()
+    sys.exit(main(args.workers, args.ops, args.redis_url))
@@ -0,0 +1,83 @@
+"""
+Regression check for symptom triage against the original keyword scan.
+
+Scores single symptoms (age 30, pain 1) with the baseline assess_symptoms
+(nested substring checks over two short keyword lists) and with the current
+one backed by the triage lexicon. Every phrase the baseline rated RED or
+YELLOW must be rated at least as severe now, and the listed false positives
+of plain substring matching must stay GREEN. Exits non-zero on any failure.
+
+Usage (from the backend directory):
+    python benchmarks/check_triage.py
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="medialert-triage-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/app.db")
+
+from main import assess_symptoms  # noqa: E402
+
+SEVERITY_RANK = {"GREEN": 0, "YELLOW": 1, "RED": 2}
+
+# Phrases the baseline caught, including inflections of its keywords
+BASELINE_PHRASES = [
+    "chest pain", "Chest pains since morning", "chest painful",
+    "difficulty breathing", "difficulty breathe", "severe allergic reaction", "severe allergic reactions",
+    "severe bleeding", "loss of consciousness", "unconscious", "unconsciousness", "choking",
+    "fever", "fevers", "cough", "coughs", "coughing", "fracture", "fractures", "fractured",
+    "burns", "vomiting", "seizure", "seizures", "head injury", "severe headache", "severe headaches",
+    "dizziness", "severe nausea",
+]
+
+# Terms that only match as whole words, inside longer words
+FALSE_POSITIVES = ["employee benefits", "new outfits", "ara wuwo", "agiri", "dakuro"]
+
+
+def baseline_severity(symptoms, age: int, pain_rating: int) -> str:
+    """The severity assess_symptoms returned before the triage lexicon"""
+    critical_symptoms = [
+        "chest pain", "difficulty breathing", "severe bleeding",
+        "loss of consciousness", "choking", "severe allergic reaction",
+        "unconscious", "difficulty breath"
+    ]
+    warning_symptoms = [
+        "fever", "cough", "severe headache", "dizziness", "severe nausea",
+        "fracture", "burns", "vomiting", "seizure", "head injury"
+    ]
+    symptoms_lower = [s.lower() for s in symptoms]
+    if any(any(c in s for c in critical_symptoms) for s in symptoms_lower):
+        return "RED"
+    age_risk = 1.5 if age > 65 else (1.3 if age > 45 else 1.0)
+    warning_count = sum(1 for s in symptoms_lower if any(w in s for w in warning_symptoms))
+    severity_score = (len(symptoms) * age_risk) + (pain_rating / 10) + (warning_count * 2)
+    if severity_score >= 6 or pain_rating >= 8:
+        return "RED"
+    if severity_score >= 3 or pain_rating >= 5:
+        return "YELLOW"
+    return "GREEN"
+
+
+def main() -> int:
+    failures = 0
+    for phrase in BASELINE_PHRASES:
+        before = baseline_severity([phrase], 30, 1)
+        after = assess_symptoms([phrase], 30, 1)["severity"]
+        ok = before != "GREEN" and SEVERITY_RANK[after] >= SEVERITY_RANK[before]
+        print(f"{'ok  ' if ok else 'FAIL'} {phrase!r}: baseline {before}, now {after}")
+        failures += not ok
+    for phrase in FALSE_POSITIVES:
+        after = assess_symptoms([phrase], 30, 1)["severity"]
+        ok = after == "GREEN"
+        print(f"{'ok  ' if ok else 'FAIL'} {phrase!r}: now {after} (expected GREEN)")
+        failures += not ok
+    print(f"{failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
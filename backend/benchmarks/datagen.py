@@ -0,0 +1,99 @@
+"""
+Synthetic data generators shared by the benchmarks.
+
+Everything is driven by a caller-supplied random.Random, so a given seed
+always produces the same hospitals, facilities, doctors and symptoms.
+"""
+import random
+from typing import Dict, List
+
+
+# Rough bounding box of Nigeria
+LAT_RANGE = (4.3, 13.9)
+LON_RANGE = (2.7, 14.6)
+
+SPECIALTIES = [
+    "General Practitioner", "Cardiologist", "Pediatrician", "Orthopedic Surgeon",
+    "Dermatologist", "Neurologist", "Psychiatrist", "Emergency Medicine",
+]
+FIRST_NAMES = ["Chioma", "Seun", "Ngozi", "Kunle", "Amaka", "Tunde", "Bola", "Emeka", "Halima", "Ifeoma"]
+LAST_NAMES = ["Okafor", "Adeyemi", "Eze", "Okonkwo", "Bello", "Nwosu", "Balogun", "Abubakar", "Ojo", "Lawal"]
+
+TOWNS = ["Port Harcourt", "Lagos", "Abuja", "Ibadan", "Kano", "Enugu", "Benin", "Jos", "Calabar", "Owerri"]
+HOSPITAL_KINDS = ["General Hospital", "Teaching Hospital", "Medical Centre", "Clinic", "Specialist Hospital",
+                  "Maternity Home", "Primary Health Centre"]
+HOSPITAL_SERVICES = ["Emergency", "General", "ICU", "Surgery", "Maternity", "Pediatrics", "Cardiology",
+                     "Orthopedics", "Radiology", "Laboratory"]
+
+SYMPTOMS = [
+    "chest pain", "shortness of breath", "severe headache since morning", "body dey hot",
+    "vomiting", "mild stomach ache after eating", "feeling tired and weak", "high fever",
+    "pain in lower back when walking", "dizziness", "cough for three days", "rash on arms",
+]
+
+
+def random_point(rng: random.Random):
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+
+
+def hospital_rows(count: int, rng: random.Random) -> List[Dict]:
+    """Rows for a bulk insert into the hospitals table"""
+    rows = []
+    for i in range(count):
+        lat, lon = random_point(rng)
+        town = rng.choice(TOWNS)
+        rows.append({
+            "external_id": f"bench_{i}",
+            "name": f"{rng.choice(LAST_NAMES)} {town} {rng.choice(HOSPITAL_KINDS)} {i}",
+            "address": f"{i} Synthetic Road, {town}",
+            "phone": "+234-000-0000",
+            "latitude": lat,
+            "longitude": lon,
+            "services": ",".join(rng.sample(HOSPITAL_SERVICES, rng.randint(1, 4))),
+        })
+    return rows
+
+
+def facility_collection(count: int, rng: random.Random) -> Dict:
+    """A Healthsites.io-shaped GeoJSON FeatureCollection of `count` facilities"""
+    features = []
+    for i in range(count):
+        lat, lon = random_point(rng)
+        features.append({
+            "type": "Feature",
+            "id": f"bench_{i}",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {
+                "name": f"Bench Facility {i}",
+                "addr:full": f"{i} Synthetic Road",
+                "contact:phone": "+234-000-0000",
+                "amenities": ["Emergency", "General"] if i % 2 else ["ICU", "Surgery"],
+                "type": "hospital",
+                "beds": 20 + i % 300,
+                "emergency": "yes" if i % 3 else "no",
+                "opening_hours": "24/7",
+                "website": f"https://facility{i}.example.ng",
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def doctors(count: int, rng: random.Random) -> List[Dict]:
+    """Doctor records in the shape DoctorService.add_doctor expects"""
+    return [
+        {
+            "id": f"bench_doc_{i:06d}",
+            "name": f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "specialty": rng.choice(SPECIALTIES),
+            "rating": round(rng.uniform(3.5, 5.0), 1),
+            "available": rng.random() < 0.7,
+            "phone": "+234-803-XXXX",
+            "experience_years": rng.randint(1, 35),
+        }
+        for i in range(count)
+    ]
+
+
+def symptom_sets(count: int, size: int, rng: random.Random) -> List[List[str]]:
+    """`count` symptom lists of `size` entries each"""
+    return [[rng.choice(SYMPTOMS) for _ in range(size)] for _ in range(count)]
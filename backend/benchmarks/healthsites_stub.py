@@ -0,0 +1,100 @@
+"""
+Local stand-in for the Healthsites.io facilities API.
+
+Serves a synthetic GeoJSON FeatureCollection around the requested point and
+counts how many TCP connections clients opened, so benchmarks can measure
+upstream behaviour without touching the network.
+
+Run standalone:
+    python benchmarks/healthsites_stub.py --port 8765 --features 200
+then point the backend at it with HEALTHSITES_URL=http://127.0.0.1:8765/api/v1/facilities
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from aiohttp import web
+
+FACILITIES_PATH = "/api/v1/facilities"
+
+
+def make_features(latitude: float, longitude: float, count: int, seed: int = 0) -> list:
+    """Synthetic facilities scattered within ~0.2 degrees of a point"""
+    rng = random.Random(seed)
+    features = []
+    for i in range(count):
+        features.append({
+            "type": "Feature",
+            "id": f"stub_{i}",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [longitude + rng.uniform(-0.2, 0.2), latitude + rng.uniform(-0.2, 0.2)],
+            },
+            "properties": {
+                "name": f"Stub Hospital {i}",
+                "addr:full": f"{i} Stub Road",
+                "contact:phone": "+234-000-0000",
+                "amenities": ["Emergency", "General"] if i % 2 else ["ICU", "Surgery"],
+                "type": "hospital",
+                "beds": 50 + i % 200,
+                "emergency": "yes",
+                "opening_hours": "24/7",
+            },
+        })
+    return features
+
+
+class HealthsitesStub:
+    """aiohttp application that records connections and requests"""
+
+    def __init__(self, features: int = 50, delay_seconds: float = 0.0):
+        self.features = features
+        self.delay_seconds = delay_seconds
+        self.requests = 0
+        self.connections = set()
+        self.app = web.Application()
+        self.app.router.add_get(FACILITIES_PATH, self.facilities)
+        self._runner = None
+        self.port = None
+
+    async def facilities(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        if self.delay_seconds:
+            await asyncio.sleep(self.delay_seconds)
+
+        latitude = float(request.query.get("latitude", 4.8156))
+        longitude = float(request.query.get("longitude", 6.9271))
+        body = {"type": "FeatureCollection", "features": make_features(latitude, longitude, self.features)}
+        return web.Response(text=json.dumps(body), content_type="application/json")
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}{FACILITIES_PATH}"
+
+    async def start(self, port: int = 0):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+async def _serve(port: int, features: int):
+    stub = HealthsitesStub(features=features)
+    await stub.start(port)
+    print(f"Healthsites stub listening on {stub.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--features", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(_serve(args.port, args.features))
@@ -0,0 +1,160 @@
+"""
+Load test for priority admission control.
+
+Starts the API under uvicorn twice (admission disabled, then enabled),
+saturates the catalogue routes (/api/doctors/*, /api/hospitals/real/search)
+with many concurrent clients, and meanwhile probes /api/emergency/assess at a
+steady rate. Reports emergency p50/p99 next to an idle baseline, plus how
+many catalogue requests were served or shed.
+
+Usage (from the backend directory):
+    python benchmarks/load_admission.py --flood 300 --seconds 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import aiohttp  # noqa: E402
+
+from healthsites_stub import HealthsitesStub  # noqa: E402
+
+CATALOGUE_PATHS = [
+    "/api/doctors/available",
+    "/api/doctors/search?query=cardio",
+    "/api/hospitals/real/search?query=stub&latitude=6.5244&longitude=3.3792",
+]
+
+ASSESSMENT = {
+    "symptoms": ["chest pain", "shortness of breath"],
+    "age": 54,
+    "pain_rating": 8,
+    "latitude": 6.5244,
+    "longitude": 3.3792,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_until_up(session: aiohttp.ClientSession, base: str):
+    for _ in range(100):
+        try:
+            async with session.get(base + "/api/health") as resp:
+                if resp.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("API did not start")
+
+
+async def probe(session: aiohttp.ClientSession, base: str, seconds: float, interval: float = 0.05):
+    """Send emergency assessments at a steady rate and return their latencies"""
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        async with session.post(base + "/api/emergency/assess", json=ASSESSMENT) as resp:
+            await resp.read()
+            if resp.status != 200:
+                raise RuntimeError(f"Emergency request failed with {resp.status}")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def flood(session: aiohttp.ClientSession, base: str, deadline: float, counts: dict, worker: int):
+    i = worker
+    while time.time() < deadline:
+        path = CATALOGUE_PATHS[i % len(CATALOGUE_PATHS)]
+        i += 1
+        try:
+            async with session.get(base + path) as resp:
+                await resp.read()
+                counts[resp.status] = counts.get(resp.status, 0) + 1
+        except aiohttp.ClientError:
+            counts["error"] = counts.get("error", 0) + 1
+
+
+async def flood_all(base: str, clients: int, deadline: float) -> dict:
+    counts = {}
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        await asyncio.gather(*(flood(session, base, deadline, counts, w) for w in range(clients)))
+    return counts
+
+
+def flood_process(base: str, clients: int, deadline: float, results):
+    """Run the flood in its own process so it does not slow down the probe"""
+    results.put(asyncio.run(flood_all(base, clients, deadline)))
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1000
+
+
+async def run_case(label: str, admission: bool, stub: HealthsitesStub, flood_clients: int, seconds: float):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tempfile.mkdtemp(prefix='medialert-admission-')}/app.db",
+        HEALTHSITES_URL=stub.url,
+        ADMISSION_ENABLED="true" if admission else "false",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await wait_until_up(session, base)
+            idle = await probe(session, base, min(2.0, seconds))
+
+            results = multiprocessing.Queue()
+            flooder = multiprocessing.Process(
+                target=flood_process, args=(base, flood_clients, time.time() + seconds + 1.0, results)
+            )
+            flooder.start()
+            await asyncio.sleep(0.5)
+            loaded = await probe(session, base, seconds)
+            counts = await asyncio.get_running_loop().run_in_executor(None, results.get)
+            flooder.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{label:>18}: idle p50 {percentile(idle, 50):7.1f} ms  p99 {percentile(idle, 99):7.1f} ms | "
+          f"saturated p50 {percentile(loaded, 50):7.1f} ms  p99 {percentile(loaded, 99):7.1f} ms | "
+          f"catalogue {counts}")
+
+
+async def main(flood_clients: int, seconds: float):
+    stub = HealthsitesStub(features=200, delay_seconds=0.02)
+    await stub.start()
+    try:
+        await run_case("admission disabled", False, stub, flood_clients, seconds)
+        await run_case("admission enabled", True, stub, flood_clients, seconds)
+    finally:
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--flood", type=int, default=300, help="concurrent catalogue clients")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.flood, args.seconds))
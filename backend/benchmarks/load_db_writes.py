@@ -0,0 +1,101 @@
+"""
+Concurrent write load test for the SQLite engine settings.
+
+Runs concurrent assessment writers (and readers) against a throwaway SQLite
+file, once with the legacy configuration (rollback journal, default
+synchronous, no mmap) and once with the tuned DatabaseSettings, and reports
+write throughput and "database is locked" failures for each.
+
+Usage (from the backend directory):
+    python benchmarks/load_db_writes.py --writers 32 --writes 50 --readers 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="medialert-load-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/app.db")
+
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker  # noqa: E402
+
+from database import Base, DatabaseSettings, create_db_engine  # noqa: E402
+from models import EmergencyAssessment  # noqa: E402
+
+LEGACY = DatabaseSettings(
+    pool_size=5,
+    max_overflow=10,
+    sqlite_wal=False,
+    sqlite_synchronous="FULL",
+    sqlite_mmap_size=0,
+    sqlite_cache_size_kb=2000,
+    sqlite_busy_timeout_ms=5000,
+)
+
+
+async def writer(Session, writes: int, errors: list):
+    for i in range(writes):
+        async with Session() as db:
+            db.add(EmergencyAssessment(symptoms="['fever']", severity_level="YELLOW", age=30,
+                                       pain_rating=i % 10, latitude=4.8, longitude=6.9,
+                                       assessment_result="{}"))
+            try:
+                await db.commit()
+            except OperationalError as e:
+                errors.append(str(e.orig))
+                await db.rollback()
+
+
+async def reader(Session, stop: asyncio.Event):
+    reads = 0
+    while not stop.is_set():
+        async with Session() as db:
+            await db.scalar(select(func.count(EmergencyAssessment.id)))
+        reads += 1
+        await asyncio.sleep(0)
+    return reads
+
+
+async def run_case(label: str, settings: DatabaseSettings, writers: int, writes: int, readers: int):
+    path = os.path.join(_tmpdir, f"{label}.db")
+    sync_engine = create_db_engine(f"sqlite:///{path}", settings)
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+
+    engine = create_db_engine(f"sqlite+aiosqlite:///{path}", settings, is_async=True)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    errors = []
+    stop = asyncio.Event()
+
+    reader_tasks = [asyncio.create_task(reader(Session, stop)) for _ in range(readers)]
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(Session, writes, errors) for _ in range(writers)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    reads = sum(await asyncio.gather(*reader_tasks))
+    await engine.dispose()
+
+    committed = writers * writes - len(errors)
+    print(f"{label:>8}: {committed / elapsed:>9.1f} writes/s, {reads / elapsed:>9.1f} reads/s, "
+          f"{len(errors)} lock errors")
+
+
+async def main(writers: int, writes: int, readers: int):
+    await run_case("legacy", LEGACY, writers, writes, readers)
+    await run_case("tuned", DatabaseSettings(), writers, writes, readers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.writers, args.writes, args.readers))
@@ -0,0 +1,71 @@
+"""
+Booking race check for DoctorService.book_consultation.
+
+Many tasks, each with its own session, try to book the same doctor slot at
+once against a throwaway SQLite file; exactly one must win and the rest must
+get a conflict. Then a burst of retries sharing one idempotency key must all
+return the same booking. Exits non-zero if either property is violated.
+
+Usage (from the backend directory):
+    python benchmarks/race_booking.py --tasks 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="medialert-race-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/app.db")
+
+from sqlalchemy import func, select  # noqa: E402
+
+from database import AsyncSessionLocal, Base, dispose_engines, engine  # noqa: E402
+from services.doctor_service import DoctorService  # noqa: E402
+from models import Consultation  # noqa: E402
+
+
+async def attempt(service: DoctorService, user_id: int, date: str, key: str = None) -> dict:
+    async with AsyncSessionLocal() as db:
+        return await service.book_consultation(
+            db, user_id, "doc_002", date, "10:00 AM", ["chest pain"], idempotency_key=key
+        )
+
+
+async def main(tasks: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    service = DoctorService()
+    failures = 0
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(attempt(service, user_id, "2030-01-07") for user_id in range(tasks)))
+    elapsed = time.perf_counter() - start
+    won = [r for r in results if r["status"] == "success"]
+    conflicts = [r for r in results if r.get("code") == "conflict"]
+    print(f"same slot: {len(won)} won, {len(conflicts)} conflicts, "
+          f"{tasks - len(won) - len(conflicts)} other ({elapsed * 1000:.0f} ms)")
+    if len(won) != 1 or len(conflicts) != tasks - 1:
+        failures += 1
+
+    results = await asyncio.gather(*(attempt(service, 99999, "2030-01-08", "retry-key") for _ in range(tasks)))
+    ids = {r["consultation_id"] for r in results if r["status"] == "success"}
+    async with AsyncSessionLocal() as db:
+        rows = await db.scalar(select(func.count(Consultation.id)).where(Consultation.user_id == 99999))
+    print(f"idempotent retries: {len(ids)} distinct booking(s), {rows} row(s)")
+    if len(ids) != 1 or rows != 1:
+        failures += 1
+
+    await dispose_engines()
+    print("OK" if not failures else "FAILED")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tasks", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.tasks)))
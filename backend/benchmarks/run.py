@@ -0,0 +1,452 @@
+"""
+Benchmark suite for the backend hot paths.
+
+Runs every benchmark against synthetic data (see datagen.py) in a throwaway
+SQLite directory and writes one JSON document: run metadata plus a result
+per benchmark and size (mean/p50/p99 in microseconds and ops/sec). Save one
+file per commit and diff them with --compare.
+
+Covered: assess_symptoms, calculate_distance, the nearby-hospital query and
+the hospital search index at several table sizes,
+HospitalService._parse_hospitals on large GeoJSON, the DoctorService
+lookup/search methods, background job throughput with a local Twilio stub,
+and HTTP throughput through the ASGI app with a local Healthsites stub
+standing in for the upstream.
+
+Usage (from the backend directory):
+    python benchmarks/run.py --output bench-$(git rev-parse --short HEAD).json
+    python benchmarks/run.py --only doctors parse --quick
+    python benchmarks/run.py --output new.json --compare old.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="medialert-suite-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/app.db")
+# The suite drives the app harder than admission control allows by default
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+import datagen  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from healthsites_stub import HealthsitesStub  # noqa: E402
+from jobs import JobQueue  # noqa: E402
+from models import Hospital  # noqa: E402
+from pagination import PageParams  # noqa: E402
+from services.doctor_service import DoctorService  # noqa: E402
+from services.hospital_search import HospitalSearchIndex, store_documents  # noqa: E402
+from services.hospital_service import HospitalService  # noqa: E402
+from services.hospital_store import HospitalStore  # noqa: E402
+from services.notification_service import NotificationService, TwilioSmsSender  # noqa: E402
+from twilio_stub import TwilioStub  # noqa: E402
+import main  # noqa: E402
+
+BENCHMARKS: Dict[str, Callable] = {}
+
+
+def benchmark(name: str):
+    """Register an async benchmark; it receives the Suite and returns nothing"""
+    def decorator(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return decorator
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Suite:
+    """Collects results and scales iteration counts for --quick runs"""
+
+    def __init__(self, quick: bool, seed: int):
+        self.quick = quick
+        self.seed = seed
+        self.results: List[Dict] = []
+
+    def rng(self) -> random.Random:
+        return random.Random(self.seed)
+
+    def scale(self, full: int, quick: int) -> int:
+        return quick if self.quick else full
+
+    def record(self, name: str, params: Dict, samples: List[float], calls: int, **extra):
+        """`samples` are per-call seconds; `calls` is how many calls they cover"""
+        total = sum(samples)
+        result = {
+            "name": name,
+            "params": params,
+            "iterations": calls,
+            "mean_us": round(total / len(samples) * 1e6, 3),
+            "p50_us": round(percentile(samples, 50) * 1e6, 3),
+            "p99_us": round(percentile(samples, 99) * 1e6, 3),
+            "min_us": round(min(samples) * 1e6, 3),
+            "ops_per_sec": round(len(samples) / total, 1) if total else None,
+            **extra,
+        }
+        self.results.append(result)
+        shown = " ".join(f"{k}={v}" for k, v in params.items())
+        print(f"{name:<32} {shown:<28} mean {result['mean_us']:>12.2f} us  "
+              f"p99 {result['p99_us']:>12.2f} us", file=sys.stderr)
+        return result
+
+    def measure(self, name: str, params: Dict, fn: Callable, iterations: int, batch: int = 1, **extra):
+        """Time `fn()`; sub-microsecond functions run in batches of `batch` per sample"""
+        samples = []
+        for _ in range(max(1, iterations // batch)):
+            start = time.perf_counter()
+            for _ in range(batch):
+                fn()
+            samples.append((time.perf_counter() - start) / batch)
+        return self.record(name, params, samples, len(samples) * batch, **extra)
+
+    async def measure_async(self, name: str, params: Dict, fn: Callable, iterations: int, **extra):
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await fn()
+            samples.append(time.perf_counter() - start)
+        return self.record(name, params, samples, iterations, **extra)
+
+
+# ==================== CPU PATHS ====================
+
+@benchmark("assess")
+async def bench_assess(suite: Suite):
+    rng = suite.rng()
+    for size in (1, 5, 20):
+        cases = datagen.symptom_sets(256, size, rng)
+        ages = [rng.randint(1, 90) for _ in cases]
+        pains = [rng.randint(0, 10) for _ in cases]
+        state = {"i": 0}
+
+        def call():
+            i = state["i"] = (state["i"] + 1) % len(cases)
+            main.assess_symptoms(cases[i], ages[i], pains[i])
+
+        suite.measure("assess_symptoms", {"symptoms": size}, call, suite.scale(20_000, 2_000), batch=100)
+
+
+@benchmark("distance")
+async def bench_distance(suite: Suite):
+    rng = suite.rng()
+    points = [(*datagen.random_point(rng), *datagen.random_point(rng)) for _ in range(1024)]
+    state = {"i": 0}
+
+    def call():
+        i = state["i"] = (state["i"] + 1) & 1023
+        main.calculate_distance(*points[i])
+
+    suite.measure("calculate_distance", {}, call, suite.scale(200_000, 20_000), batch=1000)
+
+
+class ChunkedBody:
+    """Stands in for aiohttp's StreamReader over an in-memory body"""
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+
+    async def iter_chunked(self, size: int):
+        for start in range(0, len(self.raw), size):
+            yield self.raw[start:start + size]
+
+
+@benchmark("parse")
+async def bench_parse(suite: Suite):
+    service = HospitalService()
+    service.max_results = 10 ** 9
+    for count in suite.scale((1_000, 10_000, 50_000), (1_000, 5_000)):
+        collection = datagen.facility_collection(count, suite.rng())
+        raw = json.dumps(collection).encode()
+        iterations = suite.scale(20, 5)
+        suite.measure("hospital_parse", {"features": count},
+                      lambda: service._parse_hospitals(collection), iterations)
+        suite.measure("hospital_decode_parse", {"features": count, "bytes": len(raw)},
+                      lambda: service._parse_hospitals(json.loads(raw)), iterations)
+        await suite.measure_async("hospital_stream_parse", {"features": count, "bytes": len(raw)},
+                                  lambda: service._read_hospitals(ChunkedBody(raw)), iterations)
+
+
+# ==================== DATABASE AND CATALOGUE ====================
+
+@benchmark("nearby")
+async def bench_nearby(suite: Suite):
+    rng = suite.rng()
+    page = PageParams(limit=50, cursor=None, fields=None)
+    for size in suite.scale((1_000, 10_000, 100_000), (1_000, 10_000)):
+        path = f"{_tmpdir}/nearby_{size}.db"
+        sync_engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=sync_engine)
+        with sessionmaker(bind=sync_engine)() as session:
+            session.execute(insert(Hospital), datagen.hospital_rows(size, rng))
+            session.commit()
+        sync_engine.dispose()
+
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with async_sessionmaker(async_engine)() as session:
+            await main.hospital_store.reload(session)
+        queries = [datagen.random_point(rng) for _ in range(suite.scale(300, 50))]
+        state = {"i": 0}
+
+        async def call():
+            lat, lon = queries[state["i"] % len(queries)]
+            state["i"] += 1
+            await main.get_nearby_hospitals(lat, lon, 10, services=None, emergency=None, page=page)
+
+        await suite.measure_async("nearby_query", {"hospitals": size, "radius_km": 10}, call, len(queries),
+                                  store_bytes=main.hospital_store.nbytes())
+        await async_engine.dispose()
+
+
+@benchmark("search")
+async def bench_search(suite: Suite):
+    rng = suite.rng()
+    queries = {
+        "prefix": "ada",
+        "words": "general hospital lagos",
+        "typo": "genral hospitl",
+        "service": "maternity",
+    }
+    for size in suite.scale((1_000, 10_000, 100_000), (1_000, 10_000)):
+        store = HospitalStore(capacity=size)
+        for i, row in enumerate(datagen.hospital_rows(size, rng)):
+            store.append(i, row["latitude"], row["longitude"], name=row["name"],
+                         address=row["address"], services=row["services"].split(","))
+        documents = store_documents(store)
+        start = time.perf_counter()
+        index = HospitalSearchIndex(*documents)
+        suite.record("search_index_build", {"hospitals": size}, [time.perf_counter() - start], 1,
+                     terms=len(index.terms))
+
+        points = [datagen.random_point(rng) for _ in range(32)]
+        iterations = suite.scale(200, 30)
+        for label, query in queries.items():
+            state = {"i": 0}
+
+            def call():
+                lat, lon = points[state["i"] % len(points)]
+                state["i"] += 1
+                index.search(query, lat, lon)
+
+            suite.measure(f"search_{label}", {"hospitals": size}, call, iterations)
+
+
+@benchmark("doctors")
+async def bench_doctors(suite: Suite):
+    for size in suite.scale((100, 1_000, 10_000), (100, 1_000)):
+        service = DoctorService()
+        for doctor in datagen.doctors(size, suite.rng()):
+            service.add_doctor(doctor)
+        last_id = f"bench_doc_{size - 1:06d}"
+        iterations = suite.scale(2_000, 200)
+        cases = {
+            "doctor_by_id": lambda: service.get_doctor_by_id(last_id),
+            "doctors_available": lambda: service.get_available_doctors(limit=50),
+            "doctors_available_specialty": lambda: service.get_available_doctors("cardio", limit=50),
+            "doctors_search_short": lambda: service.search_doctors("ok", limit=50),
+            "doctors_search_long": lambda: service.search_doctors("adeyemi", limit=50),
+            "doctors_search_specialty": lambda: service.search_doctors("pediatric", limit=50),
+        }
+        for name, call in cases.items():
+            await suite.measure_async(name, {"doctors": size}, call, iterations)
+
+
+# ==================== END-TO-END HTTP ====================
+
+async def http_load(client: httpx.AsyncClient, make_request: Callable, requests: int, concurrency: int):
+    """Issue `requests` calls from `concurrency` workers; returns latencies, statuses and wall time"""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for i in remaining:
+            start = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+@benchmark("http")
+async def bench_http(suite: Suite):
+    rng = suite.rng()
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        session.execute(insert(Hospital), datagen.hospital_rows(suite.scale(20_000, 2_000), rng))
+        session.commit()
+
+    stub = HealthsitesStub(features=suite.scale(200, 50))
+    await stub.start()
+    main.hospital_service.HEALTHSITES_URL = stub.url
+    points = [datagen.random_point(rng) for _ in range(64)]
+    assessment = {"symptoms": ["headache", "fever"], "age": 40, "pain_rating": 4,
+                  "latitude": 6.5244, "longitude": 3.3792}
+
+    cases = {
+        "health": lambda c, i: c.get("/api/health"),
+        "assess": lambda c, i: c.post("/api/emergency/assess", json=assessment),
+        "hospitals_nearby": lambda c, i: c.get(
+            "/api/hospitals/nearby", params={"latitude": points[i % 64][0], "longitude": points[i % 64][1]}),
+        "hospitals_real_nearby": lambda c, i: c.get(
+            "/api/hospitals/real/nearby", params={"latitude": points[i % 64][0], "longitude": points[i % 64][1]}),
+        "hospitals_search": lambda c, i: c.get(
+            "/api/hospitals/real/search", params={"query": "teach hosp", "latitude": points[i % 64][0],
+                                                  "longitude": points[i % 64][1]}),
+        "doctors_search": lambda c, i: c.get("/api/doctors/search", params={"query": "card"}),
+        "doctors_available": lambda c, i: c.get("/api/doctors/available"),
+    }
+
+    await main.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, make_request in cases.items():
+                for concurrency in (1, 16):
+                    requests = suite.scale(1_000, 100)
+                    latencies, statuses, wall = await http_load(client, make_request, requests, concurrency)
+                    suite.record(f"http_{name}", {"concurrency": concurrency}, latencies, requests,
+                                 throughput_rps=round(requests / wall, 1),
+                                 statuses={str(k): v for k, v in sorted(statuses.items())})
+    finally:
+        await main.app.router.shutdown()
+        await stub.stop()
+
+
+# ==================== BACKGROUND JOBS ====================
+
+@benchmark("jobs")
+async def bench_jobs(suite: Suite):
+    """Enqueue cost, then hospital alerts drained through a Twilio stub answering in 20 ms"""
+    stub = TwilioStub(delay_seconds=0.02)
+    await stub.start()
+    sender = TwilioSmsSender("AC0", "token", "+10000000000", api_url=stub.api_url)
+    payload = {"hospital_id": "ph_01", "patient_info": {"age": 40}, "location": {"lat": 6.5, "lon": 3.3},
+               "symptoms": ["fever"]}
+    try:
+        for batch_size in (1, 50):
+            path = f"{_tmpdir}/jobs_{batch_size}.db"
+            sync_engine = create_engine(f"sqlite:///{path}")
+            Base.metadata.create_all(bind=sync_engine)
+            sync_engine.dispose()
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            queue = JobQueue(async_sessionmaker(async_engine, expire_on_commit=False), workers=2,
+                             batch_size=batch_size)
+            NotificationService(queue.session_factory, sender).register(queue)
+
+            if batch_size == 1:
+                await suite.measure_async("jobs_enqueue", {}, lambda: queue.submit("alert_hospital", [payload]),
+                                          suite.scale(500, 50))
+            await queue.submit("alert_hospital", [payload] * suite.scale(2_000, 200))
+
+            samples: List[float] = []
+
+            async def drain():
+                while True:
+                    start = time.perf_counter()
+                    count = await queue.run_once()
+                    if not count:
+                        return
+                    samples.extend([(time.perf_counter() - start) / count] * count)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(drain() for _ in range(queue.workers)))
+            wall = time.perf_counter() - start
+            suite.record("jobs_drain", {"batch_size": batch_size}, samples, len(samples),
+                         throughput_jobs_per_sec=round(len(samples) / wall, 1))
+            await async_engine.dispose()
+    finally:
+        await sender.close()
+        await stub.stop()
+
+
+# ==================== REPORTING ====================
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result: Dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()) if k != "bytes")
+    return f"{result['name']}[{params}]"
+
+
+def compare(current: Dict, baseline_path: str):
+    """Print mean latency of this run against a previous JSON report"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+    print(f"\n{'benchmark':<60} {'before us':>12} {'after us':>12} {'change':>8}", file=sys.stderr)
+    for result in current["results"]:
+        key = result_key(result)
+        before = baseline.get(key)
+        if before is None:
+            print(f"{key:<60} {'-':>12} {result['mean_us']:>12.2f} {'new':>8}", file=sys.stderr)
+            continue
+        change = (result["mean_us"] - before["mean_us"]) / before["mean_us"] * 100
+        print(f"{key:<60} {before['mean_us']:>12.2f} {result['mean_us']:>12.2f} {change:>+7.1f}%",
+              file=sys.stderr)
+
+
+async def run(names: List[str], quick: bool, seed: int) -> Dict:
+    suite = Suite(quick, seed)
+    for name in names:
+        await BENCHMARKS[name](suite)
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "quick": quick,
+        "seed": seed,
+        "results": suite.results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer iterations")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.only, args.quick, args.seed))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        compare(report, args.compare)
@@ -0,0 +1,89 @@
+"""
+Local stand-in for the Twilio Messages API.
+
+Accepts the same form POST as api.twilio.com, records every message, and
+can add latency and fail a share of requests (429/503, which the sender
+retries) so benchmarks can exercise batching and backoff offline.
+
+Run standalone:
+    python benchmarks/twilio_stub.py --port 8766 --delay 0.2 --failure-rate 0.1
+then point the backend at it with
+    TWILIO_API_URL=http://127.0.0.1:8766 TWILIO_ACCOUNT_SID=AC0 TWILIO_AUTH_TOKEN=x TWILIO_FROM_NUMBER=+10000000000
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from aiohttp import web
+
+MESSAGES_PATH = "/2010-04-01/Accounts/{sid}/Messages.json"
+
+
+class TwilioStub:
+    """aiohttp application that records messages and fails some on purpose"""
+
+    def __init__(self, delay_seconds: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.delay_seconds = delay_seconds
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self.messages = []
+        self.app = web.Application()
+        self.app.router.add_post(MESSAGES_PATH, self.create_message)
+        self._runner = None
+        self.port = None
+
+    async def create_message(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.delay_seconds:
+            await asyncio.sleep(self.delay_seconds)
+        if not request.headers.get("Authorization", "").lower().startswith("basic "):
+            return web.json_response({"code": 20003, "message": "Authenticate"}, status=401)
+
+        form = await request.post()
+        if not form.get("To") or not form.get("Body"):
+            return web.json_response({"code": 21604, "message": "A 'To' phone number is required."}, status=400)
+        if self.rng.random() < self.failure_rate:
+            self.failures += 1
+            status = self.rng.choice((429, 503))
+            return web.json_response({"code": 20429, "message": "Too Many Requests"}, status=status)
+
+        self.messages.append({"to": form["To"], "from": form.get("From"), "body": form["Body"]})
+        sid = f"SM{len(self.messages):032d}"
+        return web.Response(
+            status=201, content_type="application/json",
+            text=json.dumps({"sid": sid, "status": "queued", "to": form["To"], "body": form["Body"]}),
+        )
+
+    @property
+    def api_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self, port: int = 0):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+async def _serve(port: int, delay_seconds: float, failure_rate: float):
+    stub = TwilioStub(delay_seconds=delay_seconds, failure_rate=failure_rate)
+    await stub.start(port)
+    print(f"Twilio stub listening on {stub.api_url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered 429/503")
+    args = parser.parse_args()
+    asyncio.run(_serve(args.port, args.delay, args.failure_rate))
@@ -1,4 +1,7 @@
-from sqlalchemy import create_engine
+from dataclasses import dataclass
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 import os
 from dotenv import load_dotenv
@@ -8,14 +11,114 @@ load_dotenv()
 # Database URL from .env
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./medialert.db")
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+# Optional read-only replica used by GET routes
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL to its async driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("postgresql:") or url.startswith("postgres:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    if url.startswith("postgresql+psycopg2:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+@dataclass
+class DatabaseSettings:
+    """Connection pool and SQLite tuning, read from the environment"""
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_timeout: float = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    sqlite_wal: bool = True
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kb: int = 64 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        return cls(
+            pool_size=int(os.getenv("DB_POOL_SIZE", cls.pool_size)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", cls.max_overflow)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", cls.pool_timeout)),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", cls.pool_recycle)),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", cls.pool_pre_ping),
+            sqlite_wal=_env_bool("SQLITE_WAL", cls.sqlite_wal),
+            sqlite_synchronous=os.getenv("SQLITE_SYNCHRONOUS", cls.sqlite_synchronous),
+            sqlite_mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", cls.sqlite_mmap_size)),
+            sqlite_cache_size_kb=int(os.getenv("SQLITE_CACHE_SIZE_KB", cls.sqlite_cache_size_kb)),
+            sqlite_busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", cls.sqlite_busy_timeout_ms)),
+        )
+
+settings = DatabaseSettings.from_env()
+
+def _sqlite_pragma_listener(settings: DatabaseSettings, read_only: bool):
+    """Build a connect hook that applies SQLite pragmas to every new connection"""
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if settings.sqlite_wal:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        # Negative cache_size is measured in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size={-int(settings.sqlite_cache_size_kb)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return set_pragmas
+
+def create_db_engine(url: str, settings: DatabaseSettings = settings,
+                     is_async: bool = False, read_only: bool = False):
+    """
+    Create a sync or async engine with pool options from settings.
+    SQLite connections get WAL/synchronous/mmap/cache/busy_timeout pragmas.
+    """
+    is_sqlite = url.startswith("sqlite")
+    options = {"pool_pre_ping": settings.pool_pre_ping}
+    if is_sqlite:
+        options["connect_args"] = {"check_same_thread": False} if not is_async else {}
+        # The default sqlite timeout is the busy timeout in seconds
+        options["connect_args"]["timeout"] = settings.sqlite_busy_timeout_ms / 1000
+    if not (is_sqlite and ":memory:" in url):
+        if is_sqlite and is_async:
+            # aiosqlite defaults to NullPool; pool connections so pragmas apply once
+            options["poolclass"] = AsyncAdaptedQueuePool
+        options.update(
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_timeout=settings.pool_timeout,
+            pool_recycle=settings.pool_recycle,
+        )
+
+    engine = create_async_engine(url, **options) if is_async else create_engine(url, **options)
+    if is_sqlite:
+        sync_engine = engine.sync_engine if is_async else engine
+        event.listen(sync_engine, "connect", _sqlite_pragma_listener(settings, read_only))
+    return engine
+
+# Create engine (sync: table creation, bulk ingestion, CLI tools)
+engine = create_db_engine(DATABASE_URL)
+
+# Async engines used by the API endpoints; reads go to the replica when configured
+async_engine = create_db_engine(ASYNC_DATABASE_URL, is_async=True)
+read_async_engine = (
+    create_db_engine(to_async_url(DATABASE_REPLICA_URL), is_async=True, read_only=True)
+    if DATABASE_REPLICA_URL else async_engine
 )
 
-# Session factory
+# Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(read_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Base for models
 Base = declarative_base()
@@ -26,4 +129,20 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async dependency for FastAPI
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Async dependency for read-only (GET) routes
+async def get_read_db():
+    async with ReadSessionLocal() as db:
+        yield db
+
+async def dispose_engines():
+    """Close every async connection pool"""
+    await async_engine.dispose()
+    if read_async_engine is not async_engine:
+        await read_async_engine.dispose()
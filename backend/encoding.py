@@ -0,0 +1,185 @@
+import gzip
+import hashlib
+from typing import Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+async def _buffer_response(app, scope, receive, send, finish):
+    """
+    Run `app`, holding back its response until the whole body is known, then
+    call `finish(start_message, body)` to send it. Streaming responses (more
+    than one body chunk) are passed through untouched.
+    """
+    start_message = None
+    chunks: List[bytes] = []
+    streaming = False
+
+    async def capture(message):
+        nonlocal start_message, streaming
+        if message["type"] == "http.response.start":
+            start_message = message
+            return
+        if message["type"] != "http.response.body" or streaming:
+            await send(message)
+            return
+        if message.get("more_body", False):
+            streaming = True
+            await send(start_message)
+            for chunk in chunks:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send(message)
+            return
+        chunks.append(message.get("body", b""))
+        await finish(start_message, b"".join(chunks))
+
+    await app(scope, receive, capture)
+
+
+def _parse_etags(value: str) -> Iterable[str]:
+    """Opaque tags from an If-None-Match header (weak comparison)"""
+    for tag in value.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        yield tag
+
+
+def _strip_encoding_suffix(tag: str) -> str:
+    """'"abc-gzip"' and '"abc-br"' name the same data as '"abc"'"""
+    for suffix in ("-br\"", "-gzip\""):
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + "\""
+    return tag
+
+
+class ETagMiddleware:
+    """
+    Strong ETags for successful GET responses under the given path prefixes.
+    A request whose If-None-Match matches the current body gets an empty
+    304, so unchanged hospital and doctor lists cost no payload bytes.
+    """
+
+    def __init__(self, app, paths: Tuple[str, ...]):
+        self.app = app
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] != "GET"
+                or not scope["path"].startswith(self.paths)):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+
+        async def finish(start_message, body: bytes):
+            headers = MutableHeaders(scope=start_message)
+            if start_message["status"] != 200 or "etag" in headers:
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            etag = f"\"{hashlib.blake2b(body, digest_size=16).hexdigest()}\""
+            headers["ETag"] = etag
+            if "cache-control" not in headers:
+                # Let clients keep the body but always revalidate it
+                headers["Cache-Control"] = "no-cache"
+
+            if if_none_match and (
+                if_none_match.strip() == "*"
+                or etag in (_strip_encoding_suffix(t) for t in _parse_etags(if_none_match))
+            ):
+                not_modified = {
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [
+                        (k, v) for k, v in start_message["headers"]
+                        if k.lower() in (b"etag", b"cache-control", b"vary")
+                    ],
+                }
+                await send(not_modified)
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await _buffer_response(self.app, scope, receive, send, finish)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported coding from an Accept-Encoding header: br, then gzip"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip response compression negotiated from Accept-Encoding.
+    Bodies under `minimum_size` bytes, non-text content types and already
+    encoded responses are sent as-is.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, brotli_quality: int = 4, gzip_level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip_level = gzip_level
+
+    def compress(self, body: bytes, coding: str) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        coding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def finish(start_message, body: bytes):
+            headers = MutableHeaders(scope=start_message)
+            content_type = headers.get("content-type", "")
+            if (len(body) < self.minimum_size or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            body = self.compress(body, coding)
+            headers["Content-Encoding"] = coding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and etag.endswith("\""):
+                # The encoded bytes differ, so a strong validator must differ too
+                headers["ETag"] = f"{etag[:-1]}-{coding}\""
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await _buffer_response(self.app, scope, receive, send, finish)
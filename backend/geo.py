@@ -0,0 +1,64 @@
+import math
+from typing import Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(latitude: float, longitude: float,
+                 latitudes: Sequence[float], longitudes: Sequence[float]) -> np.ndarray:
+    """
+    Distance in km from one origin to many points (Haversine formula).
+    Accepts any array-like of candidate coordinates and returns a float array.
+    """
+    lat1 = math.radians(latitude)
+    lon1 = math.radians(longitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon2 = np.radians(np.asarray(longitudes, dtype=np.float64))
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance in km between two coordinates (scalar form of haversine_km)"""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def nearest_k(distances: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k smallest distances, closest first.
+    Uses argpartition so only the selected k are fully sorted.
+    """
+    count = len(distances)
+    if k <= 0 or count == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < count:
+        candidates = np.argpartition(distances, k - 1)[:k]
+    else:
+        candidates = np.arange(count)
+    return candidates[np.argsort(distances[candidates], kind="stable")]
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    Return (min_lat, min_lon, max_lat, max_lon) enclosing a circle.
+    Every point within radius_km of the origin lies inside the box.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(latitude - dlat, -90.0)
+    max_lat = min(latitude + dlat, 90.0)
+
+    # Use the latitude furthest from the equator so the box stays conservative
+    widest_lat = max(abs(min_lat), abs(max_lat))
+    cos_lat = math.cos(math.radians(widest_lat))
+    if cos_lat < 1e-9:
+        return min_lat, -180.0, max_lat, 180.0
+
+    dlon = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    if dlon >= 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+    return min_lat, max(longitude - dlon, -180.0), max_lat, min(longitude + dlon, 180.0)
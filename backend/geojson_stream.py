@@ -0,0 +1,150 @@
+import codecs
+import json
+import re
+from typing import BinaryIO, Dict, Iterator, List, Union
+
+_FEATURES_ARRAY = re.compile(r'"features"\s*:\s*\[')
+_WHITESPACE = " \t\r\n\x1e"
+# Brackets and quotes, and the rest of a JSON string after its opening quote
+_STRUCTURE = re.compile(r'["{}\[\]]')
+_STRING_REST = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+
+DEFAULT_MAX_FEATURE_CHARS = 16 * 1024 * 1024
+
+
+def _value_end(text: str, pos: int) -> int:
+    """End of the bracketed JSON value starting at `pos`, or -1 if it is not closed yet"""
+    depth = 0
+    while True:
+        match = _STRUCTURE.search(text, pos)
+        if match is None:
+            return -1
+        pos = match.end()
+        char = match.group()
+        if char == '"':
+            string = _STRING_REST.match(text, pos)
+            if string is None:
+                return -1
+            pos = string.end()
+        elif char in "{[":
+            depth += 1
+        else:
+            depth -= 1
+            if depth <= 0:
+                return pos
+
+
+class FeatureStream:
+    """
+    Incremental GeoJSON feature parser.
+
+    Feed it raw chunks of a FeatureCollection (or newline-delimited GeoJSON
+    features) and it yields each feature as soon as it is complete, so memory
+    stays proportional to one feature rather than the whole document.
+
+    A feature that is closed but does not decode, or one still incomplete
+    after `max_feature_chars`, raises ValueError, as does input that ends
+    before the features array is closed.
+    """
+
+    def __init__(self, max_feature_chars: int = DEFAULT_MAX_FEATURE_CHARS):
+        self.max_feature_chars = max_feature_chars
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._mode = None  # "collection" or "sequence" once detected
+        self.done = False
+
+    def feed(self, chunk: Union[bytes, str]) -> List[Dict]:
+        """Add a chunk and return the features it completed"""
+        if self.done:
+            return []
+        if isinstance(chunk, bytes):
+            chunk = self._text.decode(chunk)
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+
+        if self._mode is None and not self._detect_mode():
+            return []
+
+        features = []
+        while not self.done:
+            feature = self._next_feature()
+            if feature is None:
+                break
+            features.append(feature)
+        return features
+
+    def close(self) -> List[Dict]:
+        """Flush any trailing feature once the input is exhausted"""
+        features = self.feed(self._text.decode(b"", final=True))
+        if not self.done:
+            remainder = self._buffer[self._pos:].strip(_WHITESPACE)
+            if self._mode == "sequence":
+                if remainder:
+                    features.append(json.loads(remainder))
+            elif self._mode == "collection":
+                raise ValueError("GeoJSON ended before the features array was closed")
+            elif remainder:
+                raise ValueError("No GeoJSON features array or feature sequence found")
+        self.done = True
+        return features
+
+    def _detect_mode(self) -> bool:
+        start = len(self._buffer) - len(self._buffer.lstrip(_WHITESPACE))
+        newline = self._buffer.find("\n", start)
+        if newline != -1:
+            try:
+                first = json.loads(self._buffer[start:newline].strip(_WHITESPACE))
+            except ValueError:
+                first = None
+            if isinstance(first, dict) and first.get("type") == "Feature":
+                self._mode = "sequence"
+                return True
+
+        match = _FEATURES_ARRAY.search(self._buffer)
+        if match is None:
+            return False
+        self._mode = "collection"
+        self._pos = match.end()
+        return True
+
+    def _next_feature(self):
+        buffer = self._buffer
+        pos = self._pos
+        length = len(buffer)
+
+        # Skip separators between features
+        while pos < length and (buffer[pos] in _WHITESPACE or buffer[pos] == ","):
+            pos += 1
+        self._pos = pos
+        if pos >= length:
+            return None
+
+        if self._mode == "collection" and buffer[pos] == "]":
+            self.done = True
+            return None
+
+        try:
+            feature, end = self._decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            # Not complete yet, unless its closing bracket already arrived
+            if _value_end(buffer, pos) != -1:
+                raise ValueError(f"Malformed GeoJSON feature: {e.msg}") from e
+            if length - pos > self.max_feature_chars:
+                raise ValueError(f"GeoJSON feature longer than {self.max_feature_chars} characters") from e
+            return None
+        self._pos = end
+        return feature
+
+
+def iter_features(stream: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[Dict]:
+    """Yield features from a binary file object without loading it whole"""
+    parser = FeatureStream()
+    while not parser.done:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            yield from parser.close()
+            return
+        yield from parser.feed(chunk)
@@ -0,0 +1,45 @@
+"""
+gunicorn settings for running the API as several uvicorn worker processes.
+
+    gunicorn main:app -c gunicorn.conf.py
+
+Every worker is a separate process with its own event loop, so CPU-bound
+work (triage, ranking, JSON encoding) scales with cores. State the workers
+must agree on goes through shared_state: Redis when REDIS_URL is set,
+otherwise a memory-mapped file on this host.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# The app starts background tasks and opens pools per worker, so it is
+# imported in each worker rather than preloaded in the master
+preload_app = False
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+# Recycle workers now and then so slow leaks cannot build up
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+if workers > 1:
+    os.environ.setdefault("SHARED_STATE_BACKEND", "redis" if os.getenv("REDIS_URL") else "mmap")
+    # One bcrypt process per worker by default, instead of two each
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+
+def on_starting(server):
+    """Create tables and a fresh shared state file once, before any worker starts"""
+    from database import Base, engine
+    import models  # noqa: F401  (registers the tables)
+
+    Base.metadata.create_all(bind=engine)
+    # Workers open their own connections; none may be inherited through fork
+    engine.dispose()
+    if os.getenv("SHARED_STATE_BACKEND") == "mmap":
+        from shared_state import DEFAULT_MMAP_PATH, MmapState
+
+        MmapState.reset(os.getenv("SHARED_STATE_PATH", DEFAULT_MMAP_PATH))
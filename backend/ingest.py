@@ -0,0 +1,179 @@
+"""
+Bulk hospital ingestion from a Healthsites.io / OSM GeoJSON export.
+
+Usage (from the backend directory):
+    python ingest.py path/to/nigeria.geojson
+    python ingest.py path/to/nigeria.geojson --batch-size 1000 --delete-missing
+"""
+import argparse
+import hashlib
+import json
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from geojson_stream import iter_features
+from models import Hospital
+
+DEFAULT_BATCH_SIZE = 500
+
+# Columns written from the export; everything else on Hospital is left alone
+_UPSERT_COLUMNS = (
+    "name", "address", "phone", "latitude", "longitude",
+    "services", "operating_hours", "emergency_available", "checksum",
+)
+
+
+def _first(props: Dict, *keys, default=None):
+    for key in keys:
+        value = props.get(key)
+        if value not in (None, ""):
+            return value
+    return default
+
+
+def feature_to_row(feature: Dict) -> Optional[Dict]:
+    """Map one GeoJSON feature to a Hospital row, or None if it is unusable"""
+    props = feature.get("properties") or {}
+    geometry = feature.get("geometry") or {}
+    coords = geometry.get("coordinates")
+    if geometry.get("type") != "Point" or not coords or len(coords) < 2:
+        return None
+
+    if props.get("osm_type") and props.get("osm_id"):
+        external_id = f"{props['osm_type']}/{props['osm_id']}"
+    else:
+        external_id = _first(props, "uuid", "osm_id", default=feature.get("id"))
+    if external_id is None:
+        return None
+
+    services = _first(props, "amenities", "speciality", "healthcare", default=[])
+    if isinstance(services, str):
+        services = [s.strip() for s in services.replace(";", ",").split(",") if s.strip()]
+
+    longitude, latitude = float(coords[0]), float(coords[1])
+    row = {
+        "external_id": str(external_id),
+        "name": _first(props, "name", default="Unknown Hospital"),
+        "address": _first(props, "addr:full", "addr_full", "address", "addr_city", default="Unknown"),
+        "phone": _first(props, "contact:phone", "contact_number", "phone"),
+        "latitude": latitude,
+        "longitude": longitude,
+        "services": ",".join(str(s) for s in services),
+        "operating_hours": _first(props, "opening_hours", "operating_hours", default="24/7"),
+        "emergency_available": str(_first(props, "emergency", default="yes")).lower() == "yes",
+    }
+    row["checksum"] = hashlib.sha1(json.dumps(row, sort_keys=True).encode()).hexdigest()
+    return row
+
+
+def _upsert_statement(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(Hospital)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(Hospital)
+    else:
+        raise ValueError(f"Bulk upsert is not supported on {dialect}")
+
+    updates = {column: stmt.excluded[column] for column in _UPSERT_COLUMNS}
+    updates["last_updated"] = func.now()
+    return stmt.on_conflict_do_update(
+        index_elements=[Hospital.external_id],
+        set_=updates,
+        where=or_(Hospital.checksum.is_(None), Hospital.checksum != stmt.excluded.checksum),
+    )
+
+
+def _write_batch(db: Session, rows: List[Dict], stats: Dict):
+    """Upsert rows whose checksum changed, skipping identical ones"""
+    # Later duplicates in the same batch win
+    by_id = {row["external_id"]: row for row in rows}
+    existing = dict(db.execute(
+        select(Hospital.external_id, Hospital.checksum).where(Hospital.external_id.in_(list(by_id)))
+    ).all())
+
+    changed = []
+    for external_id, row in by_id.items():
+        if external_id not in existing:
+            stats["inserted"] += 1
+        elif existing[external_id] != row["checksum"]:
+            stats["updated"] += 1
+        else:
+            stats["unchanged"] += 1
+            continue
+        changed.append(row)
+
+    if changed:
+        db.execute(_upsert_statement(db), changed)
+
+
+def _delete_missing(db: Session, seen: set, batch_size: int) -> int:
+    """Remove hospitals that no longer appear in the export"""
+    stale = [external_id for (external_id,) in db.execute(select(Hospital.external_id))
+             if external_id not in seen]
+    for start in range(0, len(stale), batch_size):
+        db.execute(delete(Hospital).where(Hospital.external_id.in_(stale[start:start + batch_size])))
+    return len(stale)
+
+
+def ingest_features(db: Session, features: Iterable[Dict], batch_size: int = DEFAULT_BATCH_SIZE,
+                    delete_missing: bool = False) -> Dict:
+    """
+    Upsert hospitals from GeoJSON features in batches keyed on external_id.
+    Unchanged rows (same checksum) are skipped; with delete_missing, rows
+    absent from the feed are removed, so a full export syncs incrementally.
+    """
+    started = time.perf_counter()
+    stats = {"read": 0, "skipped": 0, "inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+    seen = set()
+    batch = []
+
+    for feature in features:
+        stats["read"] += 1
+        row = feature_to_row(feature)
+        if row is None:
+            stats["skipped"] += 1
+            continue
+        seen.add(row["external_id"])
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _write_batch(db, batch, stats)
+            batch = []
+
+    if batch:
+        _write_batch(db, batch, stats)
+    if delete_missing:
+        stats["deleted"] = _delete_missing(db, seen, batch_size)
+    db.commit()
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["read"] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
+
+
+def ingest_file(db: Session, path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                delete_missing: bool = False) -> Dict:
+    """Stream a GeoJSON export from disk into the Hospital table"""
+    with open(path, "rb") as stream:
+        return ingest_features(db, iter_features(stream), batch_size, delete_missing)
+
+
+if __name__ == "__main__":
+    from database import Base, SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Load a Healthsites.io GeoJSON export into the hospitals table")
+    parser.add_argument("path", help="GeoJSON FeatureCollection or newline-delimited features")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--delete-missing", action="store_true",
+                        help="delete hospitals that are absent from the export")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        result = ingest_file(db, args.path, args.batch_size, args.delete_missing)
+    print(json.dumps(result, indent=2))
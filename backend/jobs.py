@@ -0,0 +1,315 @@
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from metrics import counter, histogram
+from models import Job
+
+JOBS_PROCESSED = counter("medialert_jobs_total", "Background jobs handled, by outcome", ("kind", "outcome"))
+JOB_WAIT = histogram("medialert_job_wait_seconds", "Time from a job being due to it starting", ("kind",),
+                     buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0))
+JOB_BATCH_DURATION = histogram("medialert_job_batch_seconds", "Handler time per batch of jobs", ("kind",))
+LOST_LEASES = counter("medialert_jobs_lost_leases_total",
+                      "Job outcomes dropped because the lease ran out and the job was claimed again")
+
+
+class PermanentJobError(Exception):
+    """Raised (or returned) by a handler for a job that must not be retried"""
+
+
+class ClaimedJob:
+    """A job handed to its handler"""
+
+    __slots__ = ("id", "kind", "payload", "attempts", "due_at")
+
+    def __init__(self, id: int, kind: str, payload: dict, attempts: int, due_at: datetime):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.due_at = due_at
+
+
+# A handler gets a batch of jobs of its kind and returns, in the same order,
+# None for each job that succeeded or the exception it failed with. Raising
+# fails the whole batch.
+JobHandler = Callable[[List[ClaimedJob]], Awaitable[Sequence[Optional[BaseException]]]]
+
+
+class JobQueue:
+    """
+    Durable background job queue in the application database, drained by
+    asyncio workers in this process.
+
+    Jobs are rows in the jobs table, so enqueue() inside a request's
+    transaction commits them together with the data they act on, and
+    nothing is lost on restart. Each worker claims up to `batch_size` due
+    jobs with one UPDATE ... RETURNING and hands them to their handler in
+    one call per kind. Failed jobs are retried with exponential backoff and
+    jitter, up to `max_attempts` in all. A claimed job holds a lease; if its
+    process dies the job runs again once the lease is over, so delivery is
+    at least once. Several processes can share one queue.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, workers: int = 2, batch_size: int = 50,
+                 poll_interval: float = 1.0, max_attempts: int = 5, backoff_seconds: float = 2.0,
+                 max_backoff_seconds: float = 300.0, timeout: float = 30.0, retention_hours: float = 168):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.timeout = timeout
+        self.retention = timedelta(hours=retention_hours)
+        self.handlers: Dict[str, JobHandler] = {}
+
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._purged_at = 0.0
+
+        self.running = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.lost_leases = 0
+
+    def register(self, kind: str, handler: JobHandler):
+        self.handlers[kind] = handler
+
+    # ---------- producing ----------
+
+    async def enqueue(self, db: AsyncSession, kind: str, payloads: List[dict],
+                      delay_seconds: float = 0) -> List[int]:
+        """
+        Add jobs in the caller's transaction and return their ids. They
+        become visible to workers when the caller commits; call wake() after
+        the commit to start them without waiting for the next poll.
+        """
+        if not payloads:
+            return []
+        now = datetime.utcnow()
+        run_at = now + timedelta(seconds=delay_seconds)
+        rows = [
+            {"kind": kind, "payload": json.dumps(payload), "status": "pending", "attempts": 0,
+             "run_at": run_at, "created_at": now}
+            for payload in payloads
+        ]
+        stmt = insert(Job).returning(Job.id, sort_by_parameter_order=True)
+        return list((await db.scalars(stmt, rows)).all())
+
+    async def submit(self, kind: str, payloads: List[dict], delay_seconds: float = 0) -> List[int]:
+        """enqueue() in a transaction of its own"""
+        async with self.session_factory() as db:
+            ids = await self.enqueue(db, kind, payloads, delay_seconds)
+            await db.commit()
+        self.wake()
+        return ids
+
+    def wake(self):
+        """Let idle workers look for jobs now"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # ---------- workers ----------
+
+    def start(self):
+        if not self._tasks:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def close(self, grace_seconds: float = 10.0):
+        """
+        Stop the workers. Each finishes the batch it is running, so its
+        outcomes are recorded, and claims no more; workers still busy after
+        `grace_seconds` are cancelled. Jobs they had claimed keep their
+        lease and run again after it ends, in this or another process.
+        """
+        self._stopping = True
+        self.wake()
+        if self._tasks:
+            _, busy = await asyncio.wait(self._tasks, timeout=grace_seconds)
+            for task in busy:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    async def _work(self):
+        while not self._stopping:
+            try:
+                self._wakeup.clear()
+                if await self.run_once():
+                    continue
+                await self._purge()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job queue error: {e}")
+            if self._stopping:
+                break
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_once(self) -> int:
+        """Claim one batch of due jobs and run it; returns how many jobs it held"""
+        jobs = await self._claim()
+        if not jobs:
+            return 0
+        by_kind: Dict[str, List[ClaimedJob]] = {}
+        for job in jobs:
+            by_kind.setdefault(job.kind, []).append(job)
+        self.running += len(jobs)
+        try:
+            outcomes = await asyncio.gather(*(self._run_batch(kind, batch) for kind, batch in by_kind.items()))
+            await self._finish([row for rows in outcomes for row in rows])
+        finally:
+            self.running -= len(jobs)
+        return len(jobs)
+
+    async def _claim(self) -> List[ClaimedJob]:
+        now = datetime.utcnow()
+        due = or_(
+            and_(Job.status == "pending", Job.run_at <= now),
+            and_(Job.status == "running", Job.locked_until < now),
+        )
+        due_ids = (
+            select(Job.id)
+            .where(due, Job.kind.in_(list(self.handlers)))
+            .order_by(Job.run_at)
+            .limit(self.batch_size)
+        )
+        # `due` is checked again on the rows being updated, so two workers
+        # selecting the same ids cannot both claim them
+        stmt = (
+            update(Job)
+            .where(Job.id.in_(due_ids.scalar_subquery()), due)
+            # Covers waiting for the other kinds in the batch as well
+            .values(status="running", attempts=Job.attempts + 1, started_at=now,
+                    locked_until=now + timedelta(seconds=2 * self.timeout))
+            .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.run_at)
+            .execution_options(synchronize_session=False)
+        )
+        async with self.session_factory() as db:
+            rows = (await db.execute(stmt)).all()
+            await db.commit()
+
+        jobs = []
+        for row in rows:
+            wait = max(0.0, (now - row.run_at).total_seconds())
+            JOB_WAIT.observe(wait, row.kind)
+            jobs.append(ClaimedJob(row.id, row.kind, json.loads(row.payload), row.attempts, row.run_at))
+        jobs.sort(key=lambda job: job.due_at)
+        return jobs
+
+    async def _run_batch(self, kind: str, jobs: List[ClaimedJob]) -> List[dict]:
+        """Run one kind's handler over its jobs; returns the update for each job's row"""
+        started_at = time.perf_counter()
+        try:
+            errors = await asyncio.wait_for(self.handlers[kind](jobs), self.timeout)
+            if len(errors) != len(jobs):
+                raise RuntimeError(f"{kind} handler returned {len(errors)} results for {len(jobs)} jobs")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            errors = [e] * len(jobs)
+        elapsed = time.perf_counter() - started_at
+        JOB_BATCH_DURATION.observe(elapsed, kind)
+
+        now = datetime.utcnow()
+        rows = []
+        for job, error in zip(jobs, errors):
+            # Every row has the same keys, for one executemany in _finish()
+            row = {"job_id": job.id, "claimed_attempts": job.attempts, "finished_at": now,
+                   "batch_duration_ms": round(elapsed * 1000, 3), "batch_jobs": len(jobs),
+                   "locked_until": None, "run_at": job.due_at}
+            if error is None:
+                row.update(status="done", last_error=None)
+                outcome = "done"
+            elif isinstance(error, PermanentJobError) or job.attempts >= self.max_attempts:
+                row.update(status="failed", last_error=self._describe(error))
+                outcome = "failed"
+            else:
+                row.update(status="pending", last_error=self._describe(error),
+                           run_at=now + timedelta(seconds=self.backoff(job.attempts)))
+                outcome = "retry"
+            JOBS_PROCESSED.inc(kind, outcome)
+            rows.append(row)
+        self.completed += sum(1 for row in rows if row["status"] == "done")
+        self.retried += sum(1 for row in rows if row["status"] == "pending")
+        self.failed += sum(1 for row in rows if row["status"] == "failed")
+        return rows
+
+    async def _finish(self, rows: List[dict]):
+        """
+        Record outcomes with one executemany UPDATE for the whole batch. A
+        row only changes while it still holds this claim: a job whose lease
+        ran out was claimed again (attempts went up), and that claim owns it.
+        """
+        stmt = (
+            update(Job.__table__)
+            .where(Job.id == bindparam("job_id"), Job.attempts == bindparam("claimed_attempts"),
+                   Job.status == "running")
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(stmt, rows)
+            await db.commit()
+        if result.supports_sane_multi_rowcount() and result.rowcount < len(rows):
+            lost = len(rows) - result.rowcount
+            LOST_LEASES.inc(amount=lost)
+            self.lost_leases += lost
+
+    async def _purge(self):
+        """Delete finished jobs older than the retention period, at most once a minute"""
+        if time.monotonic() - self._purged_at < 60:
+            return
+        self._purged_at = time.monotonic()
+        cutoff = datetime.utcnow() - self.retention
+        async with self.session_factory() as db:
+            await db.execute(delete(Job).where(Job.status.in_(("done", "failed")), Job.finished_at < cutoff))
+            await db.commit()
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds before retrying a job that failed `attempts` times: doubling, capped, jittered"""
+        ceiling = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempts - 1))
+        return random.uniform(ceiling / 2, ceiling)
+
+    @staticmethod
+    def _describe(error: BaseException) -> str:
+        return f"{type(error).__name__}: {error}"[:1000]
+
+    # ---------- stats ----------
+
+    async def counts(self) -> Dict[str, Dict[str, int]]:
+        """Jobs in the table per kind and status"""
+        stmt = select(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status)
+        async with self.session_factory() as db:
+            rows = (await db.execute(stmt)).all()
+        counts: Dict[str, Dict[str, int]] = {}
+        for kind, status, count in rows:
+            counts.setdefault(kind, {})[status] = count
+        return counts
+
+    def stats(self) -> Dict:
+        """Throughput and latency of the workers in this process"""
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "lost_leases": self.lost_leases,
+            "queue_wait": JOB_WAIT.percentiles_ms(),
+            "batch_latency": JOB_BATCH_DURATION.percentiles_ms(),
+        }
@@ -1,24 +1,48 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import BackgroundTasks, FastAPI, Depends, Header, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import insert, select, event
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 import jwt
+import hmac
 from datetime import datetime, timedelta
 import os
+import time
 from dotenv import load_dotenv
-import math
+import asyncio
+from functools import partial
 from typing import List, Optional
+import numpy as np
 
 # Import our models and schemas
-from database import engine, get_db, Base
+from database import (
+    engine, async_engine, read_async_engine, get_db, get_async_db, get_read_db, dispose_engines, Base,
+    AsyncSessionLocal, ReadSessionLocal
+)
 from models import User, EmergencyAssessment, Hospital, EmergencyContact, SeverityLevel
+from ingest import ingest_file
+from triage import TriageLexicon, DEFAULT_LEXICON_PATH
+from auth_cache import AuthCache, AuthenticatedUser
+from password_pool import PasswordHasher, PasswordPoolBusy
+from admission import AdmissionMiddleware, PriorityClass
+from pagination import NUMBER, PageParams, encode_cursor, paginate
+from encoding import CompressionMiddleware, ETagMiddleware
+from metrics import REGISTRY, MetricsMiddleware, gauge, instrument_engine, span, timed
+from geo import distance_km
+from jobs import JobQueue
 from schemas import (
-    UserCreate, UserResponse, AssessmentCreate, AssessmentResponse,
-    HospitalResponse, EmergencyContactCreate, EmergencyContactResponse,
-    ConsultationCreate, ConsultationResponse, LoginRequest, TokenResponse
+    UserCreate, UserResponse, AssessmentCreate, AssessmentBatchCreate, AssessmentResponse,
+    HospitalResponse, EmergencyContactCreate, EmergencyContactResponse, HospitalAlertCreate,
+    ConsultationCreate, ConsultationResponse, BookingCreate, LoginRequest, TokenResponse,
+    DoctorUpdate, DoctorAvailabilityUpdate
 )
-from services.hospital_service import HospitalService
-from services.doctor_service import DoctorService
+from services.hospital_service import HospitalService, HOSPITAL_FIELDS
+from services.hospital_store import HospitalStore
+from services.hospital_search import HospitalSearchIndex, index_hospitals, store_documents, tokenize
+from services.doctor_service import DoctorService, DOCTOR_FIELDS
+from services.notification_service import NotificationService, create_sms_sender
+from shared_state import create_shared_state
 
 load_dotenv()
 
@@ -29,33 +53,98 @@ Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title="MediAlert - Emergency Medical Help",
     description="World-class emergency medical assessment and hospital finder",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
+
+# Strong ETags (304 on repeat loads) for the large, mostly static lists
+app.add_middleware(ETagMiddleware, paths=("/api/hospitals", "/api/doctors", "/api/emergency-numbers"))
+
+# brotli/gzip for bodies above the threshold, negotiated per request
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+)
+
+# Priority admission: emergency routes are never queued or shed; the other
+# classes get concurrency limits and shed load past their latency budget
+admission_classes = [
+    PriorityClass("emergency", limit=None, shed=False),
+    PriorityClass("hospital", limit=int(os.getenv("ADMISSION_HOSPITAL_LIMIT", "32")), latency_budget=2.0),
+    PriorityClass("auth", limit=int(os.getenv("ADMISSION_AUTH_LIMIT", "16")), latency_budget=2.0),
+    PriorityClass("catalogue", limit=int(os.getenv("ADMISSION_CATALOGUE_LIMIT", "8")), latency_budget=0.5),
+]
+app.add_middleware(
+    AdmissionMiddleware,
+    classes=admission_classes,
+    routes=[
+        ("/api/emergency", "emergency"),
+        ("/api/emergency-numbers", "emergency"),
+        ("/api/hospitals/nearby", "emergency"),
+        ("/api/hospitals/real/nearby", "emergency"),
+        ("/api/health", "emergency"),
+        ("/api/admission", "emergency"),
+        ("/api/jobs", "emergency"),
+        ("/metrics", "emergency"),
+        ("/api/hospitals", "hospital"),
+        ("/api/contacts", "hospital"),
+        ("/api/hospitals/real/search", "catalogue"),
+        ("/api/auth", "auth"),
+        ("/api/doctors", "catalogue"),
+    ],
+    default="catalogue",
+    enabled=os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes", "on")
 )
 
-# CORS middleware
+# CORS middleware (added last so it also wraps 503s from admission control)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
+)
+
+# Route latency and per-request SQL counts; outermost so it times everything
+app.add_middleware(
+    MetricsMiddleware,
+    routes=app.router.routes,
+    trace_enabled=os.getenv("DEBUG_TRACE_ENABLED", "true").lower() in ("1", "true", "yes", "on")
 )
+for instrumented in {engine, async_engine.sync_engine, read_async_engine.sync_engine}:
+    instrument_engine(instrumented)
 
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-12345678")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# ==================== UTILITY FUNCTIONS ====================
+# Decoded tokens and users, so authenticated requests usually skip the database
+auth_cache = AuthCache(
+    ttl_seconds=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60")),
+    max_entries=int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000")),
+    redis_url=os.getenv("REDIS_URL")
+)
+
+# bcrypt runs in its own small process pool; overflow is rejected, not queued forever
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64")),
+    queue_timeout=float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "5"))
+)
+
+# Triage vocabulary, compiled once and hot-reloaded when the file changes
+triage_lexicon = TriageLexicon(os.getenv("TRIAGE_LEXICON_PATH", DEFAULT_LEXICON_PATH))
 
-def hash_password(password: str) -> str:
-    """Hash password using bcrypt"""
-    return pwd_context.hash(password)
+# ==================== UTILITY FUNCTIONS ====================
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password"""
-    return pwd_context.verify(plain_password, hashed_password)
+async def run_password_job(job):
+    """Await a password pool job, turning overload into a 503"""
+    try:
+        return await job
+    except PasswordPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT token"""
@@ -68,66 +157,70 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = None, db: Session = Depends(get_db)) -> User:
+async def get_current_user(token: str = None, db: AsyncSession = Depends(get_async_db)) -> AuthenticatedUser:
     """Get current user from JWT token"""
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
+    
+    user_id = auth_cache.get_token(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            user_id: int = payload.get("sub")
+            if user_id is None:
+                raise HTTPException(status_code=401, detail="Invalid token")
+        except jwt.InvalidTokenError:
             raise HTTPException(status_code=401, detail="Invalid token")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        auth_cache.set_token(token, user_id, payload.get("exp"))
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await auth_cache.get_user(user_id)
     if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
+        db_user = await db.get(User, user_id)
+        if db_user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        user = AuthenticatedUser.from_model(db_user)
+        await auth_cache.set_user(user)
     return user
 
+def check_admin_key(given: Optional[str], expected: Optional[str], disabled_detail: str):
+    """403 unless an admin key is configured and `given` matches it"""
+    if not expected:
+        raise HTTPException(status_code=403, detail=disabled_detail)
+    if not given or not hmac.compare_digest(given.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin key")
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_cached_user(mapper, connection, target):
+    """Drop cached copies whenever a user row changes"""
+    auth_cache.invalidate_user(target.id)
+
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance between two coordinates (in km)"""
-    R = 6371  # Earth's radius in km
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    return R * c
+    return distance_km(lat1, lon1, lat2, lon2)
 
+@timed("assess_symptoms")
 def assess_symptoms(symptoms: List[str], age: int, pain_rating: int) -> dict:
     """
     AI-based symptom assessment algorithm
     Returns severity level and recommendation
     """
-    critical_symptoms = [
-        "chest pain", "difficulty breathing", "severe bleeding",
-        "loss of consciousness", "choking", "severe allergic reaction",
-        "unconscious", "difficulty breath"
-    ]
-    
-    warning_symptoms = [
-        "fever", "cough", "severe headache", "dizziness", "severe nausea",
-        "fracture", "burns", "vomiting", "seizure", "head injury"
-    ]
-    
-    # Check for critical symptoms
-    symptoms_lower = [s.lower() for s in symptoms]
-    for symptom in symptoms_lower:
-        if any(critical in symptom for critical in critical_symptoms):
-            return {
-                "severity": "RED",
-                "action": "CALL AMBULANCE NOW",
-                "recommendation": "This is a medical emergency. Call 112 immediately.",
-                "estimated_response": "5-8 minutes",
-                "phone": "112"
-            }
+    # Check for critical symptoms (one pass of the compiled triage lexicon)
+    matches = triage_lexicon.classify(symptoms)
+    if matches.critical:
+        return {
+            "severity": "RED",
+            "action": "CALL AMBULANCE NOW",
+            "recommendation": "This is a medical emergency. Call 112 immediately.",
+            "estimated_response": "5-8 minutes",
+            "phone": "112"
+        }
     
     # Age-based risk assessment
     age_risk = 1.5 if age > 65 else (1.3 if age > 45 else 1.0)
     
     # Calculate severity score
-    warning_count = sum(1 for s in symptoms_lower if any(w in s for w in warning_symptoms))
+    warning_count = len(matches.warning)
     severity_score = (len(symptoms) * age_risk) + (pain_rating / 10) + (warning_count * 2)
     
     if severity_score >= 6 or pain_rating >= 8:
@@ -155,17 +248,157 @@ def assess_symptoms(symptoms: List[str], age: int, pain_rating: int) -> dict:
             "phone": "Call if worsens"
         }
 
+def assessment_row(assessment: AssessmentCreate, result: dict, user_id: Optional[int]) -> dict:
+    """Column values for an EmergencyAssessment row"""
+    return {
+        "user_id": user_id,
+        "symptoms": str(assessment.symptoms),
+        "severity_level": result["severity"],
+        "age": assessment.age,
+        "medical_history": assessment.medical_history,
+        "current_medications": assessment.current_medications,
+        "allergies": assessment.allergies,
+        "pain_rating": assessment.pain_rating,
+        "latitude": assessment.latitude,
+        "longitude": assessment.longitude,
+        "location_address": assessment.location_address,
+        "assessment_result": str(result)
+    }
+
+async def enqueue_contact_notifications(db: AsyncSession, assessments: list, user_id: Optional[int]) -> int:
+    """
+    Queue one notify_contact job per contact listed in each (assessment id,
+    AssessmentCreate) pair, in the caller's transaction. Anonymous
+    assessments have no contacts to notify.
+    """
+    if user_id is None:
+        return 0
+    payloads = [
+        {"assessment_id": assessment_id, "user_id": user_id, "contact_id": contact_id}
+        for assessment_id, assessment in assessments
+        for contact_id in dict.fromkeys(assessment.emergency_contacts_to_notify or ())
+    ]
+    return len(await job_queue.enqueue(db, "notify_contact", payloads))
+
 # ==================== INITIALIZE SERVICES ====================
 # Initialize AFTER all utilities and functions are defined, BEFORE routes use them
-hospital_service = HospitalService()
-doctor_service = DoctorService()
+# State every worker process must agree on (None: per-process only)
+shared_state = create_shared_state()
+DOCTOR_CATALOGUE_SYNC_SECONDS = float(os.getenv("DOCTOR_CATALOGUE_SYNC_SECONDS", "2"))
+# Key for the doctor update endpoints (unset: updates are disabled)
+DOCTOR_ADMIN_KEY = os.getenv("DOCTOR_ADMIN_KEY")
+# Key a hospital sync needs to delete rows missing from the dataset (unset: never deletes)
+HOSPITAL_ADMIN_KEY = os.getenv("HOSPITAL_ADMIN_KEY")
+# Hospital alerts each user may send per window
+HOSPITAL_ALERT_LIMIT = int(os.getenv("HOSPITAL_ALERT_LIMIT", "5"))
+HOSPITAL_ALERT_WINDOW_SECONDS = float(os.getenv("HOSPITAL_ALERT_WINDOW_SECONDS", "600"))
+hospital_service = HospitalService(shared=shared_state)
+# Columnar copy of the Hospital table behind /api/hospitals/nearby
+hospital_store = HospitalStore()
+HOSPITAL_STORE_REFRESH_SECONDS = float(os.getenv("HOSPITAL_STORE_REFRESH_SECONDS", "60"))
+# Search index over the store, replaced whenever the store changes
+hospital_search = HospitalSearchIndex([], [], [], [])
+doctor_service = DoctorService(shared=shared_state)
+# Durable queue for side effects (SMS to contacts, hospital alerts) kept off the request path
+job_queue = JobQueue(
+    AsyncSessionLocal,
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    batch_size=int(os.getenv("JOB_BATCH_SIZE", "50")),
+    poll_interval=float(os.getenv("JOB_POLL_SECONDS", "1")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "5")),
+    backoff_seconds=float(os.getenv("JOB_BACKOFF_SECONDS", "2")),
+    max_backoff_seconds=float(os.getenv("JOB_MAX_BACKOFF_SECONDS", "300")),
+    timeout=float(os.getenv("JOB_TIMEOUT_SECONDS", "30")),
+    retention_hours=float(os.getenv("JOB_RETENTION_HOURS", "168"))
+)
+# How long shutdown waits for running job batches before cancelling them
+JOB_SHUTDOWN_GRACE_SECONDS = float(os.getenv("JOB_SHUTDOWN_GRACE_SECONDS", "10"))
+notification_service = NotificationService(
+    AsyncSessionLocal, create_sms_sender(), max_concurrency=int(os.getenv("SMS_MAX_CONCURRENCY", "10"))
+)
+notification_service.register(job_queue)
+
+background_tasks = []
+
+# Scrape-time gauges for queues owned by other components
+gauge("medialert_password_pool_queue_depth", "Password hashes waiting for a worker",
+      lambda: password_hasher.waiting)
+gauge("medialert_admission_queue_depth", "Requests queued by admission control",
+      lambda: {c.name: c.waiting for c in admission_classes}, label="class")
+gauge("medialert_hospital_cache_entries", "Cached real hospital cells",
+      lambda: hospital_service.cache.stats()["entries"])
+gauge("medialert_hospital_store_rows", "Hospitals held in the in-memory store", lambda: len(hospital_store))
+gauge("medialert_hospital_store_bytes", "Approximate memory of the hospital store", hospital_store.nbytes)
+gauge("medialert_hospital_search_terms", "Distinct terms in the hospital search index",
+      lambda: len(hospital_search.terms))
+gauge("medialert_jobs_running", "Background jobs being handled in this process", lambda: job_queue.running)
+
+async def rebuild_hospital_search():
+    """Index the current store; the text is copied out here and indexed in a worker thread"""
+    global hospital_search
+    documents = store_documents(hospital_store)
+    hospital_search = await asyncio.to_thread(HospitalSearchIndex, *documents)
+
+async def reload_hospital_store():
+    """Rebuild the hospital store from the database"""
+    async with ReadSessionLocal() as db:
+        await hospital_store.reload(db)
+    await rebuild_hospital_search()
+
+async def refresh_hospital_store():
+    """Apply hospital table changes to the store on a fixed interval"""
+    while True:
+        await asyncio.sleep(HOSPITAL_STORE_REFRESH_SECONDS)
+        try:
+            async with ReadSessionLocal() as db:
+                changed = await hospital_store.refresh(db)
+            if changed or len(hospital_search) != len(hospital_store):
+                await rebuild_hospital_search()
+        except Exception as e:
+            print(f"Error refreshing hospital store: {e}")
+
+async def sync_doctor_catalogue():
+    """Pick up doctor changes published by other workers on a fixed interval"""
+    while True:
+        try:
+            await doctor_service.sync_catalogue()
+        except Exception as e:
+            print(f"Error syncing doctor catalogue: {e}")
+        await asyncio.sleep(DOCTOR_CATALOGUE_SYNC_SECONDS)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    """Open shared clients and start periodic maintenance tasks"""
+    await hospital_service.start()
+    password_hasher.start()
+    background_tasks.append(asyncio.create_task(hospital_service.cache.run_janitor()))
+    await reload_hospital_store()
+    background_tasks.append(asyncio.create_task(refresh_hospital_store()))
+    if shared_state is not None:
+        background_tasks.append(asyncio.create_task(sync_doctor_catalogue()))
+    job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    """Stop maintenance tasks and close shared clients"""
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await job_queue.close(JOB_SHUTDOWN_GRACE_SECONDS)
+    await notification_service.close()
+    await hospital_service.close()
+    await auth_cache.close()
+    if shared_state is not None:
+        await shared_state.close()
+    password_hasher.close()
+    await dispose_engines()
 
 # ==================== AUTH ENDPOINTS ====================
 
 @app.post("/api/auth/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register new user"""
-    existing_user = db.query(User).filter(User.email == user.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -175,142 +408,201 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         full_name=user.full_name,
         age=user.age,
         gender=user.gender,
-        password_hash=hash_password(user.password)
+        password_hash=await run_password_job(password_hasher.hash(user.password))
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @app.post("/api/auth/login", response_model=TokenResponse)
-def login(credentials: LoginRequest, db: Session = Depends(get_db)):
+async def login(credentials: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """Login user"""
-    user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.password_hash):
+    user = await db.scalar(select(User).where(User.email == credentials.email))
+    if not user or not await run_password_job(
+        password_hasher.verify(credentials.password, user.password_hash)
+    ):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token = create_access_token(data={"sub": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
+@app.get("/api/auth/password-pool/stats")
+def get_password_pool_stats():
+    """Get queue depth and latency of the password hashing pool"""
+    return password_hasher.stats()
+
 # ==================== EMERGENCY ASSESSMENT ENDPOINTS ====================
 
 @app.post("/api/emergency/assess", response_model=AssessmentResponse)
-def assess_emergency(
+async def assess_emergency(
     assessment: AssessmentCreate,
     token: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Assess emergency symptoms"""
     user_id = None
     if token:
-        user = get_current_user(token, db)
+        user = await get_current_user(token, db)
         user_id = user.id
     
     result = assess_symptoms(assessment.symptoms, assessment.age, assessment.pain_rating)
     
-    db_assessment = EmergencyAssessment(
-        user_id=user_id,
-        symptoms=str(assessment.symptoms),
-        severity_level=result["severity"],
-        age=assessment.age,
-        medical_history=assessment.medical_history,
-        current_medications=assessment.current_medications,
-        allergies=assessment.allergies,
-        pain_rating=assessment.pain_rating,
-        latitude=assessment.latitude,
-        longitude=assessment.longitude,
-        location_address=assessment.location_address,
-        assessment_result=str(result)
+    # INSERT ... RETURNING instead of add/commit/refresh: fewer round trips on the
+    # emergency path, so it stays fast when the event loop is busy
+    stmt = insert(EmergencyAssessment).returning(
+        EmergencyAssessment.id,
+        EmergencyAssessment.severity_level,
+        EmergencyAssessment.assessment_result,
+        EmergencyAssessment.created_at
     )
-    db.add(db_assessment)
-    db.commit()
-    db.refresh(db_assessment)
+    created = (await db.execute(stmt, assessment_row(assessment, result, user_id))).one()
+    # Contacts are texted by the job queue, committed with the assessment
+    queued = await enqueue_contact_notifications(db, [(created.id, assessment)], user_id)
+    await db.commit()
+    if queued:
+        job_queue.wake()
     
-    return db_assessment
+    return {
+        "id": created.id,
+        "severity_level": created.severity_level,
+        "assessment_result": created.assessment_result,
+        "created_at": created.created_at
+    }
+
+@app.post("/api/emergency/assess/batch", response_model=List[AssessmentResponse])
+async def assess_emergency_batch(
+    batch: AssessmentBatchCreate,
+    token: str = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Assess many emergencies at once (call-centre and offline sync)"""
+    user_id = None
+    if token:
+        user = await get_current_user(token, db)
+        user_id = user.id
+    
+    rows = [
+        assessment_row(a, assess_symptoms(a.symptoms, a.age, a.pain_rating), user_id)
+        for a in batch.assessments
+    ]
+    
+    # One multi-row INSERT ... RETURNING in a single transaction, results in input order
+    stmt = insert(EmergencyAssessment).returning(
+        EmergencyAssessment.id,
+        EmergencyAssessment.severity_level,
+        EmergencyAssessment.assessment_result,
+        EmergencyAssessment.created_at,
+        sort_by_parameter_order=True
+    )
+    created = (await db.execute(stmt, rows)).all()
+    queued = await enqueue_contact_notifications(
+        db, [(row.id, a) for row, a in zip(created, batch.assessments)], user_id
+    )
+    await db.commit()
+    if queued:
+        job_queue.wake()
+    
+    return [
+        {
+            "id": row.id,
+            "severity_level": row.severity_level,
+            "assessment_result": row.assessment_result,
+            "created_at": row.created_at
+        }
+        for row in created
+    ]
 
 @app.get("/api/emergency/assessment/{assessment_id}", response_model=AssessmentResponse)
-def get_assessment(assessment_id: int, db: Session = Depends(get_db)):
+async def get_assessment(assessment_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get assessment details"""
-    assessment = db.query(EmergencyAssessment).filter(EmergencyAssessment.id == assessment_id).first()
+    assessment = await db.get(EmergencyAssessment, assessment_id)
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found")
     return assessment
 
 # ==================== HOSPITAL ENDPOINTS ====================
 
+def service_filter(services: Optional[str]) -> List[str]:
+    """Comma-separated ?services= value as a list of service names"""
+    return [s.strip() for s in services.split(",") if s.strip()] if services else []
+
 @app.get("/api/hospitals/nearby", response_model=List[HospitalResponse])
-def get_nearby_hospitals(
+async def get_nearby_hospitals(
     latitude: float,
     longitude: float,
     radius_km: int = 10,
-    db: Session = Depends(get_db)
+    services: Optional[str] = Query(None, description="Comma-separated services every result must offer"),
+    emergency: Optional[bool] = None,
+    page: PageParams = Depends()
 ):
-    """Get nearby hospitals"""
-    hospitals = db.query(Hospital).all()
+    """Get nearby hospitals, nearest first; the next page's cursor is in X-Next-Cursor"""
+    # Radius and attribute filters run vectorized over the in-memory store,
+    # then keyset on (distance, id) so pages never skip or repeat a hospital
+    after = page.after_key(2, (NUMBER, (int,)))
+    with span("nearby.rank"):
+        rows, distances = hospital_store.select(
+            latitude, longitude, radius_km, services=service_filter(services), emergency=emergency
+        )
+        ids = np.fromiter((hospital_store.key(r) for r in rows), dtype=np.int64, count=len(rows))
+        if after is not None:
+            keep = (distances > after[0]) | ((distances == after[0]) & (ids > after[1]))
+            rows, distances, ids = rows[keep], distances[keep], ids[keep]
+        ranked = np.lexsort((ids, distances))[:page.limit + 1]
+    next_cursor = None
+    if len(ranked) > page.limit:
+        ranked = ranked[:page.limit]
+        next_cursor = encode_cursor([float(distances[ranked[-1]]), int(ids[ranked[-1]])])
     
     nearby = []
-    for hospital in hospitals:
-        distance = calculate_distance(latitude, longitude, hospital.latitude, hospital.longitude)
-        if distance <= radius_km:
-            hospital_dict = {
-                "id": hospital.id,
-                "name": hospital.name,
-                "address": hospital.address,
-                "phone": hospital.phone,
-                "latitude": hospital.latitude,
-                "longitude": hospital.longitude,
-                "services": hospital.services.split(",") if hospital.services else [],
-                "distance_km": round(distance, 2)
-            }
-            nearby.append(hospital_dict)
+    for index in ranked:
+        hospital = hospital_store.row(rows[index], distances[index])
+        nearby.append({field: hospital[field] for field in HospitalResponse.model_fields})
     
-    nearby.sort(key=lambda x: x["distance_km"])
-    return nearby
+    return ORJSONResponse(
+        content=page.project(nearby, set(HospitalResponse.model_fields)),
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+    )
 
 @app.post("/api/hospitals/sync")
-def sync_hospitals_from_healthsites(db: Session = Depends(get_db)):
-    """Sync hospital data from Healthsites.io API"""
+def sync_hospitals_from_healthsites(
+    tasks: BackgroundTasks,
+    delete_missing: bool = False,
+    x_admin_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Sync hospital data from the Healthsites.io GeoJSON export.
+    delete_missing also removes hospitals absent from it, and needs X-Admin-Key.
+    """
+    if delete_missing:
+        check_admin_key(x_admin_key, HOSPITAL_ADMIN_KEY, "Hospital deletion is disabled")
+    # Bulk file import stays on a sync session in the threadpool
+    dataset_path = os.getenv("HOSPITAL_DATASET_PATH")
+    if not dataset_path:
+        raise HTTPException(status_code=400, detail="HOSPITAL_DATASET_PATH is not configured")
+    if not os.path.exists(dataset_path):
+        raise HTTPException(status_code=404, detail="Hospital dataset not found")
+    
     try:
-        sample_hospitals = [
-            {
-                "name": "Rivers State University Teaching Hospital",
-                "address": "Port Harcourt, Rivers State",
-                "phone": "+234-803-XXXX",
-                "latitude": 4.8156,
-                "longitude": 6.9271,
-                "services": "Emergency,Surgery,ICU,Maternity"
-            },
-            {
-                "name": "University of Port Harcourt Teaching Hospital",
-                "address": "Choba, Port Harcourt",
-                "phone": "+234-803-XXXX",
-                "latitude": 4.9081,
-                "longitude": 6.9131,
-                "services": "Emergency,General,Cardiology"
-            }
-        ]
-        
-        for hosp in sample_hospitals:
-            existing = db.query(Hospital).filter(Hospital.name == hosp["name"]).first()
-            if not existing:
-                db_hospital = Hospital(**hosp, external_id=hosp["name"])
-                db.add(db_hospital)
-        
-        db.commit()
-        return {"message": "Hospitals synced successfully", "count": len(sample_hospitals)}
+        stats = ingest_file(db, dataset_path, delete_missing=delete_missing)
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
+    # Deletes are only picked up by a full reload
+    tasks.add_task(reload_hospital_store)
+    return {"message": "Hospitals synced successfully", "count": stats["inserted"] + stats["updated"], **stats}
 
 # ==================== EMERGENCY CONTACTS ENDPOINTS ====================
 
 @app.post("/api/contacts/add", response_model=EmergencyContactResponse)
-def add_emergency_contact(
+async def add_emergency_contact(
     contact: EmergencyContactCreate,
     token: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add emergency contact"""
-    user = get_current_user(token, db)
+    user = await get_current_user(token, db)
     
     db_contact = EmergencyContact(
         user_id=user.id,
@@ -319,16 +611,38 @@ def add_emergency_contact(
         relationship=contact.relationship
     )
     db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
+    await db.commit()
+    await db.refresh(db_contact)
     return db_contact
 
 @app.get("/api/contacts", response_model=List[EmergencyContactResponse])
-def get_emergency_contacts(token: str = None, db: Session = Depends(get_db)):
-    """Get user's emergency contacts"""
-    user = get_current_user(token, db)
-    contacts = db.query(EmergencyContact).filter(EmergencyContact.user_id == user.id).all()
-    return contacts
+async def get_emergency_contacts(
+    token: str = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get user's emergency contacts; the next page's cursor is in X-Next-Cursor"""
+    user = await get_current_user(token, db)
+    stmt = (
+        select(EmergencyContact)
+        .where(EmergencyContact.user_id == user.id)
+        .order_by(EmergencyContact.id)
+        .limit(page.limit + 1)
+    )
+    after = page.after_key(1, ((int,),))
+    if after is not None:
+        stmt = stmt.where(EmergencyContact.id > after[0])
+    contacts = (await db.scalars(stmt)).all()
+    
+    next_cursor = None
+    if len(contacts) > page.limit:
+        contacts = contacts[:page.limit]
+        next_cursor = encode_cursor([contacts[-1].id])
+    items = [EmergencyContactResponse.model_validate(c).model_dump() for c in contacts]
+    return ORJSONResponse(
+        content=page.project(items, set(EmergencyContactResponse.model_fields)),
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+    )
 
 # ==================== REAL HOSPITAL ENDPOINTS ====================
 
@@ -336,10 +650,14 @@ def get_emergency_contacts(token: str = None, db: Session = Depends(get_db)):
 async def get_real_nearby_hospitals(
     latitude: float = 4.8156,
     longitude: float = 6.9271,
-    radius_km: int = 15
+    radius_km: int = 15,
+    services: Optional[str] = Query(None, description="Comma-separated services every result must offer"),
+    emergency: Optional[bool] = None
 ):
-    """Get REAL hospitals from Healthsites.io API"""
-    hospitals = await hospital_service.get_real_hospitals(latitude, longitude, radius_km)
+    """Get REAL hospitals from Healthsites.io API, nearest first"""
+    hospitals = await hospital_service.get_real_hospitals(
+        latitude, longitude, radius_km, services=service_filter(services), emergency=emergency
+    )
     return {
         "status": "success",
         "count": len(hospitals),
@@ -347,6 +665,16 @@ async def get_real_nearby_hospitals(
         "user_location": {"lat": latitude, "lon": longitude}
     }
 
+@app.get("/api/hospitals/real/cache-stats")
+def get_hospital_cache_stats():
+    """Get hit/miss/eviction counters for the real hospital cache"""
+    return hospital_service.cache.stats()
+
+@app.get("/api/admission/stats")
+def get_admission_stats():
+    """Get running/queued/shed counts per priority class"""
+    return {c.name: c.stats() for c in admission_classes}
+
 @app.get("/api/emergency-numbers/{country}")
 async def get_emergency_numbers(country: str = "NG"):
     """Get emergency numbers for specific country"""
@@ -361,56 +689,156 @@ async def get_emergency_numbers(country: str = "NG"):
 async def search_hospitals(
     query: str,
     latitude: float = 4.8156,
-    longitude: float = 6.9271
+    longitude: float = 6.9271,
+    radius_km: Optional[float] = Query(None, gt=0),
+    page: PageParams = Depends()
 ):
-    """Search hospitals by name"""
-    all_hospitals = await hospital_service.get_real_hospitals(latitude, longitude, 30)
-    results = [h for h in all_hospitals if query.lower() in h["name"].lower()]
+    """
+    Search hospitals by name, services or address, best match first.
+    Prefixes and small typos match; closer hospitals rank higher.
+    """
+    if not tokenize(query):
+        raise HTTPException(status_code=400, detail="Query must contain letters or digits")
+    index, hospitals = hospital_search, None
+    if not len(index):
+        # No local hospital table yet: search upstream results around the point
+        hospitals = await hospital_service.get_real_hospitals(latitude, longitude, radius_km or 30)
+        index, hospitals = index_hospitals(hospitals)
+    
+    with span("search.rank"):
+        after = page.after_key(3, (NUMBER, NUMBER, (str,)))
+        matches = index.search(query, latitude, longitude, radius_km, after=after, limit=page.limit + 1)
+        ranked, next_cursor = paginate(matches, lambda m: (-m[0], m[1], str(m[2])), after, page.limit)
+    
+    results = []
+    for score, distance, key in ranked:
+        if hospitals is not None:
+            hospital = dict(hospitals[key], distance_km=distance)
+        else:
+            row = hospital_store.find(key)
+            if row is None:
+                # Removed since the index was built
+                continue
+            hospital = hospital_store.row(row, distance)
+        hospital["score"] = score
+        results.append(hospital)
     return {
         "query": query,
-        "results": results,
-        "count": len(results)
+        "results": page.project(results, HOSPITAL_FIELDS | {"score"}),
+        "count": len(results),
+        "next_cursor": next_cursor
     }
 
+# Per-process alert counts for the current window, used without shared state
+_alert_counts = {}
+_alert_window = None
+
+async def count_hospital_alert(user_id: int) -> int:
+    """Count an alert against the user's current window; returns alerts sent in it so far"""
+    global _alert_window
+    window = int(time.time() // HOSPITAL_ALERT_WINDOW_SECONDS)
+    if shared_state is not None:
+        key = f"alerts:{user_id}:{window}"
+        try:
+            await shared_state.add(key, b"0", HOSPITAL_ALERT_WINDOW_SECONDS)
+            return await shared_state.incr(key)
+        except Exception as e:
+            print(f"Alert throttle shared state error: {e}")
+    if window != _alert_window:
+        _alert_counts.clear()
+        _alert_window = window
+    _alert_counts[user_id] = _alert_counts.get(user_id, 0) + 1
+    return _alert_counts[user_id]
+
 @app.post("/api/emergency/alert-hospital")
 async def alert_hospital(
     hospital_id: str,
-    patient_info: dict,
-    location: dict,
-    symptoms: list
+    alert: HospitalAlertCreate,
+    assessment_id: Optional[int] = None,
+    token: str = None,
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Send emergency alert to hospital with patient details"""
+    """Send emergency alert to hospital with patient details (queued; sent by SMS in the background)"""
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    user = await get_current_user(token, db)
+    
+    if assessment_id is not None:
+        owner = await db.scalar(select(EmergencyAssessment.user_id).where(EmergencyAssessment.id == assessment_id))
+        if owner != user.id:
+            raise HTTPException(status_code=404, detail="Assessment not found")
+    
+    if await count_hospital_alert(user.id) > HOSPITAL_ALERT_LIMIT:
+        retry_after = HOSPITAL_ALERT_WINDOW_SECONDS - time.time() % HOSPITAL_ALERT_WINDOW_SECONDS
+        raise HTTPException(status_code=429, detail="Too many hospital alerts",
+                            headers={"Retry-After": str(int(retry_after) + 1)})
+    
+    payload = dict(alert.model_dump(), hospital_id=hospital_id, assessment_id=assessment_id, user_id=user.id)
+    job_ids = await job_queue.enqueue(db, "alert_hospital", [payload])
+    await db.commit()
+    job_queue.wake()
     return {
         "status": "success",
-        "message": "Emergency alert sent to hospital",
+        "message": "Emergency alert queued for hospital",
         "hospital_id": hospital_id,
+        "job_id": job_ids[0],
         "alert_timestamp": datetime.utcnow()
     }
 
+@app.get("/api/jobs/stats")
+async def get_job_stats():
+    """Get queued/done/failed job counts and this process's worker timings"""
+    return {"jobs": await job_queue.counts(), "workers": job_queue.stats()}
+
 # ==================== DOCTOR BOOKING ENDPOINTS ====================
 
+async def doctor_page(page: PageParams, fetch):
+    """One page of a doctor listing (keyset on doctor id), projected, plus the next cursor"""
+    after = page.after_key(1, ((str,),))
+    try:
+        doctors = await fetch(limit=page.limit + 1, after=after[0] if after else None)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    next_cursor = None
+    if len(doctors) > page.limit:
+        doctors = doctors[:page.limit]
+        next_cursor = encode_cursor([doctors[-1]["id"]])
+    return page.project(doctors, DOCTOR_FIELDS), next_cursor
+
 @app.get("/api/doctors/available")
-async def get_available_doctors(specialty: str = None):
+async def get_available_doctors(specialty: str = None, page: PageParams = Depends()):
     """Get available doctors"""
-    doctors = await doctor_service.get_available_doctors(specialty)
+    doctors, next_cursor = await doctor_page(page, partial(doctor_service.get_available_doctors, specialty))
     return {
         "status": "success",
         "count": len(doctors),
-        "doctors": doctors
+        "doctors": doctors,
+        "next_cursor": next_cursor
     }
 
-@app.get("/api/doctors/{doctor_id}")
-async def get_doctor_details(doctor_id: str):
-    """Get doctor details"""
-    doctor = await doctor_service.get_doctor_by_id(doctor_id)
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor not found")
-    return doctor
+@app.get("/api/doctors/slots/next")
+async def get_next_doctor_slots(
+    specialty: str = None,
+    days: int = Query(7, ge=1, le=31),
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the earliest free slots across available doctors"""
+    slots = await doctor_service.next_available_slots(db, specialty, days, limit)
+    return {
+        "specialty": specialty,
+        "count": len(slots),
+        "slots": slots
+    }
 
 @app.get("/api/doctors/slots/{doctor_id}")
-async def get_doctor_slots(doctor_id: str, date: str):
+async def get_doctor_slots(doctor_id: str, date: str, db: AsyncSession = Depends(get_read_db)):
     """Get available time slots"""
-    slots = await doctor_service.get_available_slots(doctor_id, date)
+    try:
+        slots = await doctor_service.get_available_slots(doctor_id, date, db)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
     return {
         "doctor_id": doctor_id,
         "date": date,
@@ -419,26 +847,31 @@ async def get_doctor_slots(doctor_id: str, date: str):
 
 @app.post("/api/doctors/book")
 async def book_doctor_consultation(
-    doctor_id: str,
-    booking_date: str,
-    booking_time: str,
-    symptoms: list,
-    notes: str = "",
+    booking: BookingCreate,
     token: str = None,
-    db: Session = Depends(get_db)
+    authorization: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None, max_length=128),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Book a consultation with a doctor"""
-    user = get_current_user(token, db)
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    user = await get_current_user(token, db)
     
     result = await doctor_service.book_consultation(
+        db,
         user.id,
-        doctor_id,
-        booking_date,
-        booking_time,
-        symptoms,
-        notes
+        booking.doctor_id,
+        booking.booking_date,
+        booking.booking_time,
+        booking.symptoms,
+        booking.notes,
+        idempotency_key=idempotency_key
     )
     
+    if result["status"] == "error":
+        status_codes = {"not_found": 404, "conflict": 409, "invalid": 400}
+        return ORJSONResponse(status_code=status_codes[result["code"]], content=result)
     return result
 
 @app.get("/api/doctors/specialties")
@@ -451,23 +884,56 @@ async def get_specialties():
     }
 
 @app.get("/api/doctors/search")
-async def search_doctors(query: str):
+async def search_doctors(query: str, page: PageParams = Depends()):
     """Search doctors by name or specialty"""
-    results = await doctor_service.search_doctors(query)
+    results, next_cursor = await doctor_page(page, partial(doctor_service.search_doctors, query))
     return {
         "query": query,
         "results": results,
-        "count": len(results)
+        "count": len(results),
+        "next_cursor": next_cursor
     }
 
+# Declared after the fixed /api/doctors/* paths so it does not shadow them
+@app.get("/api/doctors/{doctor_id}")
+async def get_doctor_details(doctor_id: str):
+    """Get doctor details"""
+    doctor = await doctor_service.get_doctor_by_id(doctor_id)
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    return doctor
+
 @app.get("/api/doctors/{doctor_id}/reviews")
 async def get_doctor_reviews(doctor_id: str):
     """Get doctor reviews and ratings"""
     reviews = await doctor_service.get_doctor_reviews(doctor_id)
     return reviews
 
+def require_doctor_admin(x_admin_key: Optional[str] = Header(None)):
+    """Doctor updates need the X-Admin-Key header to match DOCTOR_ADMIN_KEY"""
+    check_admin_key(x_admin_key, DOCTOR_ADMIN_KEY, "Doctor updates are disabled")
+
+@app.put("/api/doctors/{doctor_id}", dependencies=[Depends(require_doctor_admin)])
+async def put_doctor(doctor_id: str, doctor: DoctorUpdate):
+    """Add a doctor or replace their details, in every worker"""
+    record = {"id": doctor_id, **doctor.model_dump()}
+    await doctor_service.publish_doctor(record)
+    return record
+
+@app.put("/api/doctors/{doctor_id}/availability", dependencies=[Depends(require_doctor_admin)])
+async def put_doctor_availability(doctor_id: str, update: DoctorAvailabilityUpdate):
+    """Mark a doctor available or unavailable, in every worker"""
+    if not await doctor_service.publish_availability(doctor_id, update.available):
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    return await doctor_service.get_doctor_by_id(doctor_id)
+
 # ==================== HEALTH CHECK ====================
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/health")
 def health_check():
     """Health check endpoint"""
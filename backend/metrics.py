@@ -0,0 +1,302 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import Headers, MutableHeaders
+
+# Latency buckets in seconds, from sub-millisecond CPU sections to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TRACE_HEADER = "X-Debug-Trace"
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect plus two additions"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def percentile(self, pct: float, *label_values) -> float:
+        """
+        Estimated `pct` percentile, interpolated within its bucket like
+        Prometheus' histogram_quantile. Label values pick one series; with
+        none, every series is merged. Returns 0.0 before any observation.
+        """
+        with self._lock:
+            if label_values or not self.labels:
+                series = [self._series[label_values]] if label_values in self._series else []
+            else:
+                series = list(self._series.values())
+            counts = [sum(column) for column in zip(*(s[0] for s in series))]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = pct / 100 * total
+        cumulative = 0
+        for i, count in enumerate(counts[:-1]):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        # In the +Inf bucket: the highest finite bound is the best estimate
+        return self.buckets[-1]
+
+    def percentiles_ms(self, *label_values) -> Dict:
+        """p50 and p99 in milliseconds, for component stats()"""
+        return {
+            "p50_ms": round(self.percentile(50, *label_values) * 1000, 2),
+            "p99_ms": round(self.percentile(99, *label_values) * 1000, 2),
+        }
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+            cumulative += counts[-1]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time; the callback returns a number or {label value: number}"""
+
+    def __init__(self, name: str, help: str, read: Callable, label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.label = label
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.read()
+        except Exception as e:
+            print(f"Error reading gauge {self.name}: {e}")
+            return lines
+        if isinstance(value, dict):
+            for key, item in sorted(value.items()):
+                lines.append(f'{self.name}{{{self.label}="{key}"}} {item}')
+        else:
+            lines.append(f"{self.name} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labels))
+
+
+def histogram(name: str, help: str, labels: Tuple[str, ...] = (),
+              buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labels, buckets))
+
+
+def gauge(name: str, help: str, read: Callable, label: Optional[str] = None) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, read, label))
+
+
+REQUEST_SECONDS = histogram(
+    "medialert_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+SECTION_SECONDS = histogram(
+    "medialert_section_duration_seconds", "Latency of instrumented code sections", ("section", "kind")
+)
+DB_QUERY_SECONDS = histogram("medialert_db_query_duration_seconds", "Latency of individual SQL statements")
+DB_QUERIES_PER_REQUEST = histogram(
+    "medialert_db_queries_per_request", "SQL statements executed per request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50)
+)
+
+
+# ---------- per-request trace ----------
+
+class _RequestTrace:
+    __slots__ = ("enabled", "spans", "db_queries", "db_seconds")
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.spans: List[Tuple[str, float]] = []
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("medialert_trace", default=None)
+
+
+@contextmanager
+def span(section: str, kind: str = "cpu"):
+    """Time a code section into the section histogram (and the request trace, if on)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SECTION_SECONDS.observe(elapsed, section, kind)
+        trace = _current_trace.get()
+        if trace is not None and trace.enabled:
+            trace.spans.append((section, elapsed))
+
+
+def timed(section: str, kind: str = "cpu"):
+    """Decorator form of span() for plain functions"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(section, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_engine(sync_engine):
+    """Count and time every SQL statement run through an engine"""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("medialert_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("medialert_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        DB_QUERY_SECONDS.observe(elapsed)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.db_queries += 1
+            trace.db_seconds += elapsed
+
+
+class MetricsMiddleware:
+    """
+    Records request latency per route template and SQL statements per request.
+    Requests sent with `X-Debug-Trace: 1` get their spans back in a
+    Server-Timing header (visible in browser devtools).
+    """
+
+    def __init__(self, app, routes: list, trace_enabled: bool = True):
+        self.app = app
+        self.routes = routes
+        self.trace_enabled = trace_enabled
+        self._templates: Dict[object, str] = {}
+
+    def route_template(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        template = self._templates.get(endpoint)
+        if template is None:
+            template = next(
+                (getattr(r, "path", None) for r in self.routes if getattr(r, "endpoint", None) is endpoint),
+                None
+            ) or getattr(endpoint, "__name__", "unknown")
+            self._templates[endpoint] = template
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracing = self.trace_enabled and Headers(scope=scope).get(TRACE_HEADER.lower()) == "1"
+        trace = _RequestTrace(tracing)
+        token = _current_trace.set(trace)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if tracing:
+                    elapsed = time.perf_counter() - start
+                    entries = [f"total;dur={elapsed * 1000:.2f}"]
+                    entries.append(f'db;dur={trace.db_seconds * 1000:.2f};desc="{trace.db_queries} queries"')
+                    entries.extend(
+                        f"{name.replace(' ', '_')};dur={seconds * 1000:.2f}" for name, seconds in trace.spans
+                    )
+                    MutableHeaders(scope=message).append("Server-Timing", ", ".join(entries))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            route = self.route_template(scope)
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route, status)
+            DB_QUERIES_PER_REQUEST.observe(trace.db_queries, route)
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Enum, Index, text
 from sqlalchemy.sql import func
 from database import Base
 import enum
+from datetime import datetime
 
 # Severity Levels
 class SeverityLevel(str, enum.Enum):
@@ -60,6 +61,7 @@ class Hospital(Base):
     services = Column(Text, nullable=True)  # JSON array
     operating_hours = Column(Text, nullable=True)
     emergency_available = Column(Boolean, default=True)
+    checksum = Column(String(40), nullable=True)  # hash of the ingested record
     last_updated = Column(DateTime(timezone=True), server_default=func.now())
 
 # Emergency Contact Model
@@ -80,9 +82,51 @@ class Consultation(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
+    doctor_id = Column(String(32), nullable=True)
     doctor_name = Column(String, nullable=True)
     consultation_type = Column(String)  # "telemedicine", "phone", "video"
     status = Column(String)  # "scheduled", "ongoing", "completed", "cancelled"
+    symptoms = Column(Text, nullable=True)  # JSON array of symptoms
     notes = Column(Text, nullable=True)
     scheduled_at = Column(DateTime(timezone=True), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    idempotency_key = Column(String(128), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # A slot belongs to at most one live booking; the database enforces it,
+        # so concurrent bookings need no application lock
+        Index(
+            "uq_consultations_doctor_slot", "doctor_id", "scheduled_at",
+            unique=True,
+            sqlite_where=text("status != 'cancelled'"),
+            postgresql_where=text("status != 'cancelled'"),
+        ),
+        # Retried requests with the same key return the original booking
+        Index("uq_consultations_user_idempotency", "user_id", "idempotency_key", unique=True),
+    )
+
+# Background Job Model (durable queue drained by jobs.JobQueue)
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(64))  # handler name, e.g. "notify_contact"
+    payload = Column(Text)  # JSON object
+    status = Column(String(16), default="pending")  # "pending", "running", "done", "failed"
+    attempts = Column(Integer, default=0)
+    # Times are naive UTC; a job runs no earlier than run_at, and a running
+    # job whose lease (locked_until) ran out is picked up again
+    run_at = Column(DateTime)
+    locked_until = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Handlers run a batch of jobs in one call, so the last attempt is timed
+    # per batch: batch_duration_ms is shared by the batch_jobs jobs in it
+    batch_duration_ms = Column(Float, nullable=True)
+    batch_jobs = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
@@ -0,0 +1,95 @@
+import base64
+import heapq
+import json
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from fastapi import HTTPException, Query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Cursor value types for PageParams.after_key
+NUMBER = (int, float)
+
+
+def encode_cursor(key: Sequence) -> str:
+    """Opaque, URL-safe cursor for the sort key of the last item on a page"""
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(key, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def _is_a(value, types: tuple) -> bool:
+    if isinstance(value, bool) or not isinstance(value, types):
+        return False
+    return not isinstance(value, float) or math.isfinite(value)
+
+
+class PageParams:
+    """
+    `limit`, `cursor` and `fields` query parameters shared by list endpoints.
+    `after` is the decoded sort key of the previous page's last item.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    ):
+        self.limit = limit
+        self.after = decode_cursor(cursor) if cursor else None
+        self.fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+    def after_key(self, size: int, types: Optional[Sequence[tuple]] = None) -> Optional[tuple]:
+        """
+        The cursor as a tuple of `size` values, or a 400 if it has another
+        shape. With `types`, each value must be one of its position's types;
+        numbers must be finite and booleans never count as numbers.
+        """
+        if self.after is None:
+            return None
+        if len(self.after) != size:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if types is not None and not all(_is_a(v, t) for v, t in zip(self.after, types)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return tuple(self.after)
+
+    def project(self, items: Iterable[Dict], allowed: Set[str]) -> List[Dict]:
+        """Keep only the requested fields of each item"""
+        items = list(items)
+        if not self.fields:
+            return items
+        unknown = [f for f in self.fields if f not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(sorted(allowed))}"
+            )
+        return [{f: item.get(f) for f in self.fields} for item in items]
+
+
+def paginate(items: Iterable, key: Callable, after: Optional[tuple], limit: int) -> Tuple[list, Optional[str]]:
+    """
+    Keyset pagination over in-memory items: the `limit` smallest items whose
+    key is greater than `after`, plus the cursor for the next page (None on
+    the last page). Runs in O(n log limit) without sorting everything.
+    """
+    if after is not None:
+        items = (item for item in items if key(item) > after)
+    page = heapq.nsmallest(limit + 1, items, key=key)
+    if len(page) > limit:
+        page = page[:limit]
+        return page, encode_cursor(key(page[-1]))
+    return page, None
@@ -0,0 +1,114 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from passlib.context import CryptContext
+
+from metrics import SECTION_SECONDS, histogram, span
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+PASSWORD_WAIT = histogram("medialert_password_wait_seconds", "Time a password hash waited for a worker")
+
+
+def hash_password(password: str) -> str:
+    """Hash password using bcrypt"""
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify password"""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing queue is full or a request waited too long"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated, size-limited process pool.
+
+    Hashing never touches the event loop or the shared threadpool, so a login
+    burst cannot delay other routes. At most `workers` hashes run at once;
+    up to `max_pending` more may wait, for no longer than `queue_timeout`
+    seconds. Anything beyond that is rejected with PasswordPoolBusy.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 64, queue_timeout: float = 5.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self):
+        if self._executor is None:
+            # spawn keeps worker processes free of the parent's event loop and threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            self._slots = asyncio.Semaphore(self.workers)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def _run(self, fn, *args):
+        self.start()
+        queued_at = time.perf_counter()
+        if not self._slots.locked():
+            # A worker is free: acquire() returns without suspending
+            await self._slots.acquire()
+        elif self.waiting >= self.max_pending:
+            self.rejected += 1
+            raise PasswordPoolBusy("Password hashing queue is full")
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise PasswordPoolBusy("Timed out waiting for a password hashing worker")
+            finally:
+                self.waiting -= 1
+
+        PASSWORD_WAIT.observe(time.perf_counter() - queued_at)
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            with span("password_hash", "pool"):
+                return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        """Queue depth, throughput and latency of the hashing pool"""
+        return {
+            "workers": self.workers,
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait": PASSWORD_WAIT.percentiles_ms(),
+            # Recorded by the password_hash span around each pool call
+            "hash_latency": SECTION_SECONDS.percentiles_ms("password_hash", "pool"),
+        }
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -35,6 +35,12 @@ class AssessmentCreate(BaseModel):
     location_address: Optional[str] = None
     emergency_contacts_to_notify: Optional[List[int]] = None
 
+# Upper bound on assessments accepted by one batch request
+MAX_ASSESSMENT_BATCH = 500
+
+class AssessmentBatchCreate(BaseModel):
+    assessments: List[AssessmentCreate] = Field(..., min_length=1, max_length=MAX_ASSESSMENT_BATCH)
+
 class AssessmentResponse(BaseModel):
     id: int
     severity_level: str
@@ -74,11 +80,36 @@ class EmergencyContactResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Hospital alert (sent to the hospital by the job queue)
+class HospitalAlertCreate(BaseModel):
+    patient_info: dict = {}
+    location: dict = {}
+    symptoms: List[str] = []
+
+# Doctor Schemas
+class DoctorUpdate(BaseModel):
+    name: str
+    specialty: str
+    rating: float = 0.0
+    available: bool = True
+    phone: Optional[str] = None
+    experience_years: int = 0
+
+class DoctorAvailabilityUpdate(BaseModel):
+    available: bool
+
 # Consultation Schemas
 class ConsultationCreate(BaseModel):
     consultation_type: str
     scheduled_at: Optional[datetime] = None
 
+class BookingCreate(BaseModel):
+    doctor_id: str
+    booking_date: str  # YYYY-MM-DD
+    booking_time: str  # "09:30 AM" or "09:30"
+    symptoms: List[str] = []
+    notes: str = ""
+
 class ConsultationResponse(BaseModel):
     id: int
     consultation_type: str
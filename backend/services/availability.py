@@ -0,0 +1,141 @@
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_SLOT_MINUTES = 30
+
+# weekday (Monday=0) -> working intervals as "HH:MM" pairs
+DEFAULT_WORKING_HOURS = {day: [("09:00", "11:00"), ("14:00", "16:30")] for day in range(7)}
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def slot_grid(intervals: Iterable[Tuple[int, int]], slot_minutes: int) -> List[int]:
+    """Sorted slot start minutes that fit entirely inside the working intervals"""
+    starts = []
+    for start, end in sorted(intervals):
+        t = start
+        while t + slot_minutes <= end:
+            starts.append(t)
+            t += slot_minutes
+    return starts
+
+
+def free_starts(grid: List[int], booked: List[int], slot_minutes: int) -> List[int]:
+    """
+    Sorted-array merge of the day grid against sorted booking starts: keep
+    each grid slot that overlaps no booking. O(len(grid) + len(booked)).
+    """
+    free = []
+    j = 0
+    for start in grid:
+        end = start + slot_minutes
+        # Skip bookings that finish before this slot starts
+        while j < len(booked) and booked[j] + slot_minutes <= start:
+            j += 1
+        if j < len(booked) and booked[j] < end:
+            continue
+        free.append(start)
+    return free
+
+
+class AvailabilityEngine:
+    """
+    Free-slot computation for doctors.
+
+    Each doctor's working hours are compiled once into a per-weekday grid of
+    slot start minutes. A (doctor, day) grid minus that day's bookings is
+    cached for `ttl_seconds`; bookings made through this process invalidate
+    the cell at once. Cells can carry a version (see drop_if_stale) so
+    bookings made by other workers invalidate them too; otherwise the TTL
+    bounds that staleness.
+    """
+
+    def __init__(self, ttl_seconds: float = 30, max_entries: int = 50000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._schedules: Dict[str, Tuple[int, Dict[int, List[int]]]] = {}
+        self._days: "OrderedDict[Tuple[str, date], Tuple[float, Tuple[int, ...], Optional[bytes]]]" = OrderedDict()
+
+    # ---------- schedules ----------
+
+    def set_schedule(self, doctor: dict):
+        """Compile a doctor's working hours ("working_hours", "slot_minutes" keys, optional)"""
+        slot_minutes = doctor.get("slot_minutes", DEFAULT_SLOT_MINUTES)
+        working_hours = doctor.get("working_hours", DEFAULT_WORKING_HOURS)
+        grids = {
+            int(weekday): slot_grid(((_minutes(s), _minutes(e)) for s, e in intervals), slot_minutes)
+            for weekday, intervals in working_hours.items()
+        }
+        self._schedules[doctor["id"]] = (slot_minutes, grids)
+        for key in [key for key in self._days if key[0] == doctor["id"]]:
+            del self._days[key]
+
+    def slot_minutes(self, doctor_id: str) -> int:
+        return self._schedules[doctor_id][0]
+
+    def grid(self, doctor_id: str, day: date) -> List[int]:
+        schedule = self._schedules.get(doctor_id)
+        if schedule is None:
+            return []
+        return schedule[1].get(day.weekday(), [])
+
+    def is_on_grid(self, doctor_id: str, when: datetime) -> bool:
+        """True if `when` is the start of one of the doctor's working slots"""
+        grid = self.grid(doctor_id, when.date())
+        minute = when.hour * 60 + when.minute
+        i = bisect_left(grid, minute)
+        return i < len(grid) and grid[i] == minute and when.second == 0
+
+    # ---------- day cache ----------
+
+    def cached(self, doctor_id: str, day: date) -> Optional[Tuple[int, ...]]:
+        key = (doctor_id, day)
+        item = self._days.get(key)
+        if item is None:
+            return None
+        expires_at, free, _ = item
+        if expires_at <= time.monotonic():
+            del self._days[key]
+            return None
+        self._days.move_to_end(key)
+        return free
+
+    def store(self, doctor_id: str, day: date, booked: List[int],
+              version: Optional[bytes] = None) -> Tuple[int, ...]:
+        """
+        Compute and cache the free slot starts for a day given its booking
+        starts. `version` is the day's shared version read before the bookings.
+        """
+        if doctor_id not in self._schedules:
+            return ()
+        free = tuple(free_starts(self.grid(doctor_id, day), sorted(booked), self.slot_minutes(doctor_id)))
+        self._days[(doctor_id, day)] = (time.monotonic() + self.ttl_seconds, free, version)
+        self._days.move_to_end((doctor_id, day))
+        while len(self._days) > self.max_entries:
+            self._days.popitem(last=False)
+        return free
+
+    def invalidate(self, doctor_id: str, day: date):
+        self._days.pop((doctor_id, day), None)
+
+    def drop_if_stale(self, doctor_id: str, day: date, version: Optional[bytes]):
+        """Drop a cached day whose version no longer matches the shared one"""
+        item = self._days.get((doctor_id, day))
+        if item is not None and item[2] != version:
+            del self._days[(doctor_id, day)]
+
+    def iter_slots(self, doctor_id: str, days: List[date], after: datetime):
+        """Yield (start datetime, doctor_id) for cached free slots, in time order"""
+        for day in days:
+            free = self.cached(doctor_id, day) or ()
+            midnight = datetime.combine(day, datetime.min.time())
+            for minute in free:
+                start = midnight + timedelta(minutes=minute)
+                if start >= after:
+                    yield start, doctor_id
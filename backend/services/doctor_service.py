@@ -1,12 +1,43 @@
-from typing import List, Optional
-from datetime import datetime, timedelta
+import heapq
+import json
+import os
+import time
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Consultation
+from services.availability import AvailabilityEngine
+from shared_state import SharedState
+
+# Fields a client may select with ?fields=
+DOCTOR_FIELDS = {"id", "name", "specialty", "rating", "available", "phone", "experience_years"}
+
+# Longest n-gram kept in the search index; longer queries intersect trigrams
+MAX_GRAM = 3
+
+# How long a missing catalogue change is waited for before it is skipped
+CHANGE_GRACE_SECONDS = 5
+
+def _grams(text: str) -> Set[str]:
+    """Every substring up to MAX_GRAM characters long, per line of `text`"""
+    return {
+        line[i:i + n]
+        for line in text.split("\n")
+        for n in range(1, MAX_GRAM + 1)
+        for i in range(len(line) - n + 1)
+    }
 
 class DoctorService:
     """Service for managing doctor consultations and bookings"""
     
-    def __init__(self):
+    def __init__(self, shared: Optional[SharedState] = None):
         # Mock data for doctors
-        self.doctors = [
+        doctors = [
             {
                 "id": "doc_001",
                 "name": "Dr. Chioma Okafor",
@@ -56,87 +87,434 @@ class DoctorService:
             "Emergency Medicine"
         ]
         
-        self.consultations = []
+        # Free-slot grids per doctor and day
+        self.availability = AvailabilityEngine(
+            ttl_seconds=float(os.getenv("AVAILABILITY_CACHE_TTL_SECONDS", "30"))
+        )
+        
+        # Catalogue indexes, kept in sync by add_doctor() / set_availability()
+        self._by_id: Dict[str, dict] = {}
+        self._order: Dict[str, int] = {}
+        self._by_specialty: Dict[str, Set[str]] = {}
+        self._available: Set[str] = set()
+        self._search_text: Dict[str, str] = {}
+        self._gram_index: Dict[str, Set[str]] = {}
+        
+        for doctor in doctors:
+            self.add_doctor(doctor)
+        
+        # With shared state, catalogue changes and bookings made by other
+        # workers reach this one (see publish_doctor / _day_versions)
+        self.shared = shared
+        self._catalogue_version = 0
+        self._missing_changes: Dict[int, float] = {}
     
-    async def get_available_doctors(self, specialty: Optional[str] = None) -> List[dict]:
-        """Get list of available doctors, optionally filtered by specialty"""
-        doctors = [d for d in self.doctors if d["available"]]
+    @property
+    def doctors(self) -> List[dict]:
+        """All doctors in insertion order"""
+        return list(self._by_id.values())
+    
+    # ---------- index maintenance ----------
+    
+    def add_doctor(self, doctor: dict):
+        """Add a doctor, or replace the one with the same id, updating every index"""
+        doctor_id = doctor["id"]
+        if doctor_id in self._by_id:
+            self._unindex(self._by_id[doctor_id])
+        else:
+            self._order[doctor_id] = len(self._order)
         
-        if specialty:
-            doctors = [d for d in doctors if specialty.lower() in d["specialty"].lower()]
+        self._by_id[doctor_id] = doctor
+        self._by_specialty.setdefault(doctor["specialty"].lower(), set()).add(doctor_id)
+        if doctor["available"]:
+            self._available.add(doctor_id)
+        
+        # Name and specialty on separate lines so grams never span the two
+        text = f"{doctor['name']}\n{doctor['specialty']}".lower()
+        self._search_text[doctor_id] = text
+        for gram in _grams(text):
+            self._gram_index.setdefault(gram, set()).add(doctor_id)
+        
+        if doctor["specialty"] not in self.specialties:
+            self.specialties.append(doctor["specialty"])
         
-        return doctors
+        self.availability.set_schedule(doctor)
+    
+    def set_availability(self, doctor_id: str, available: bool) -> bool:
+        """Mark a doctor available/unavailable; False if the doctor is unknown"""
+        doctor = self._by_id.get(doctor_id)
+        if doctor is None:
+            return False
+        doctor["available"] = available
+        if available:
+            self._available.add(doctor_id)
+        else:
+            self._available.discard(doctor_id)
+        return True
+    
+    # ---------- shared state ----------
+    
+    async def publish_doctor(self, doctor: dict):
+        """add_doctor() in this worker and, through shared state, in every other one"""
+        self.add_doctor(doctor)
+        if self.shared is None:
+            return
+        try:
+            number = await self.shared.incr("doctors:version")
+            await self.shared.set(f"doctors:change:{number}", json.dumps(doctor).encode())
+        except Exception as e:
+            print(f"Doctor shared state error: {e}")
+    
+    async def publish_availability(self, doctor_id: str, available: bool) -> bool:
+        """set_availability() across workers; False if the doctor is unknown"""
+        doctor = self._by_id.get(doctor_id)
+        if doctor is None:
+            return False
+        await self.publish_doctor(dict(doctor, available=available))
+        return True
+    
+    async def sync_catalogue(self) -> int:
+        """Apply doctor changes published by any worker since the last sync; returns how many"""
+        if self.shared is None:
+            return 0
+        latest = int(await self.shared.get("doctors:version") or 0)
+        if latest < self._catalogue_version:
+            # The shared state was reset; replay whatever it holds now
+            self._catalogue_version = 0
+        numbers = range(self._catalogue_version + 1, latest + 1)
+        if not numbers:
+            return 0
+        applied = 0
+        changes = await self.shared.mget([f"doctors:change:{n}" for n in numbers])
+        for number, raw in zip(numbers, changes):
+            if raw is None:
+                # Numbered but not written yet; give the publisher a moment
+                first_seen = self._missing_changes.setdefault(number, time.monotonic())
+                if time.monotonic() - first_seen < CHANGE_GRACE_SECONDS:
+                    break
+            else:
+                self.add_doctor(json.loads(raw))
+                applied += 1
+            self._missing_changes.pop(number, None)
+            self._catalogue_version = number
+        return applied
+    
+    def _day_key(self, doctor_id: str, day: date) -> str:
+        return f"availability:{doctor_id}:{day.isoformat()}"
+    
+    async def _day_versions(self, doctor_ids: List[str], days: List[date]) -> Optional[Dict[tuple, Optional[bytes]]]:
+        """Shared booking version per (doctor_id, day), or None without shared state"""
+        if self.shared is None:
+            return None
+        pairs = [(doctor_id, day) for doctor_id in doctor_ids for day in days]
+        try:
+            versions = await self.shared.mget([self._day_key(*pair) for pair in pairs])
+        except Exception as e:
+            print(f"Doctor shared state error: {e}")
+            return None
+        return dict(zip(pairs, versions))
+    
+    async def _invalidate_day(self, doctor_id: str, day: date):
+        """Drop a day's free slots here, and bump its version so other workers drop theirs"""
+        self.availability.invalidate(doctor_id, day)
+        if self.shared is None:
+            return
+        try:
+            await self.shared.incr(self._day_key(doctor_id, day))
+        except Exception as e:
+            print(f"Doctor shared state error: {e}")
+    
+    def _unindex(self, doctor: dict):
+        doctor_id = doctor["id"]
+        bucket = self._by_specialty.get(doctor["specialty"].lower())
+        if bucket is not None:
+            bucket.discard(doctor_id)
+            if not bucket:
+                del self._by_specialty[doctor["specialty"].lower()]
+        self._available.discard(doctor_id)
+        for gram in _grams(self._search_text.pop(doctor_id, "")):
+            postings = self._gram_index.get(gram)
+            if postings is not None:
+                postings.discard(doctor_id)
+                if not postings:
+                    del self._gram_index[gram]
+    
+    def _in_order(
+        self,
+        doctor_ids: Iterable[str],
+        limit: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Doctors in insertion order. With `after` (a doctor id) only those
+        listed after it; with `limit`, only the first `limit` of them.
+        """
+        order = self._order
+        if after is not None:
+            if not isinstance(after, str) or after not in order:
+                raise ValueError(f"Unknown doctor id {after!r}")
+            start = order[after]
+            doctor_ids = [i for i in doctor_ids if order[i] > start]
+        if limit is None:
+            ids = sorted(doctor_ids, key=order.__getitem__)
+        else:
+            ids = heapq.nsmallest(limit, doctor_ids, key=order.__getitem__)
+        return [self._by_id[i] for i in ids]
+    
+    def _specialty_ids(self, specialty: str) -> Set[str]:
+        """Doctors whose specialty contains `specialty` (case-insensitive)"""
+        specialty = specialty.lower()
+        exact = self._by_specialty.get(specialty)
+        if exact is not None:
+            return exact
+        # Distinct specialties are few, so a substring pass over them is cheap
+        ids: Set[str] = set()
+        for name, bucket in self._by_specialty.items():
+            if specialty in name:
+                ids |= bucket
+        return ids
+    
+    # ---------- queries ----------
+    
+    async def get_available_doctors(
+        self,
+        specialty: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> List[dict]:
+        """Get list of available doctors, optionally filtered by specialty"""
+        if specialty:
+            return self._in_order(self._available & self._specialty_ids(specialty), limit, after)
+        return self._in_order(self._available, limit, after)
     
     async def get_doctor_by_id(self, doctor_id: str) -> Optional[dict]:
         """Get doctor details by ID"""
-        for doctor in self.doctors:
-            if doctor["id"] == doctor_id:
-                return doctor
-        return None
+        return self._by_id.get(doctor_id)
+    
+    async def _load_bookings(
+        self,
+        db: AsyncSession,
+        doctor_ids: List[str],
+        start: date,
+        end: date
+    ) -> Dict[tuple, List[int]]:
+        """Booked start minutes per (doctor_id, day) for days in [start, end)"""
+        booked: Dict[tuple, List[int]] = {}
+        rows = await db.execute(
+            select(Consultation.doctor_id, Consultation.scheduled_at).where(
+                Consultation.doctor_id.in_(doctor_ids),
+                Consultation.scheduled_at >= datetime.combine(start, datetime.min.time()),
+                Consultation.scheduled_at < datetime.combine(end, datetime.min.time()),
+                Consultation.status != "cancelled"
+            )
+        )
+        for doctor_id, scheduled_at in rows:
+            key = (doctor_id, scheduled_at.date())
+            booked.setdefault(key, []).append(scheduled_at.hour * 60 + scheduled_at.minute)
+        return booked
+    
+    async def _ensure_days(self, db: AsyncSession, doctor_ids: List[str], days: List[date]):
+        """Compute free-slot grids for every uncached (doctor, day) with one bookings query"""
+        # Versions are read before the bookings, so a booking committed in
+        # between leaves the cached day one version behind
+        versions = await self._day_versions(doctor_ids, days)
+        if versions is not None:
+            for (doctor_id, day), version in versions.items():
+                self.availability.drop_if_stale(doctor_id, day, version)
+        missing = [
+            doctor_id for doctor_id in doctor_ids
+            if any(self.availability.cached(doctor_id, day) is None for day in days)
+        ]
+        if not missing:
+            return
+        booked = await self._load_bookings(db, missing, days[0], days[-1] + timedelta(days=1))
+        for doctor_id in missing:
+            for day in days:
+                version = versions.get((doctor_id, day)) if versions is not None else None
+                self.availability.store(doctor_id, day, booked.get((doctor_id, day), []), version)
     
-    async def get_available_slots(self, doctor_id: str, date: str) -> List[str]:
-        """Get available time slots for a doctor on a specific date"""
-        # Mock available slots
-        slots = [
-            "09:00 AM",
-            "09:30 AM",
-            "10:00 AM",
-            "10:30 AM",
-            "02:00 PM",
-            "02:30 PM",
-            "03:00 PM",
-            "03:30 PM",
-            "04:00 PM"
+    async def get_available_slots(self, doctor_id: str, date: str, db: AsyncSession) -> List[str]:
+        """Get available time slots for a doctor on a specific date (YYYY-MM-DD)"""
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+        doctor = self._by_id.get(doctor_id)
+        if doctor is None or not doctor["available"]:
+            return []
+        await self._ensure_days(db, [doctor_id], [day])
+        # Slots that have already started cannot be booked
+        return [
+            start.strftime("%I:%M %p")
+            for start, _ in self.availability.iter_slots(doctor_id, [day], datetime.now())
         ]
-        return slots
+    
+    async def next_available_slots(
+        self,
+        db: AsyncSession,
+        specialty: Optional[str] = None,
+        days: int = 7,
+        limit: int = 20,
+        after: Optional[datetime] = None
+    ) -> List[dict]:
+        """
+        Earliest free slots across all available doctors (optionally of one
+        specialty) within `days` days, merged in time order with heapq.merge.
+        """
+        after = after or datetime.now()
+        day_list = [after.date() + timedelta(days=i) for i in range(days)]
+        doctors = await self.get_available_doctors(specialty)
+        doctor_ids = [d["id"] for d in doctors]
+        await self._ensure_days(db, doctor_ids, day_list)
+        
+        merged = heapq.merge(*(self.availability.iter_slots(i, day_list, after) for i in doctor_ids))
+        return [
+            {
+                "doctor_id": doctor_id,
+                "doctor_name": self._by_id[doctor_id]["name"],
+                "specialty": self._by_id[doctor_id]["specialty"],
+                "date": start.strftime("%Y-%m-%d"),
+                "time": start.strftime("%I:%M %p")
+            }
+            for start, doctor_id in islice(merged, limit)
+        ]
+    
+    @staticmethod
+    def parse_slot(booking_date: str, booking_time: str) -> Optional[datetime]:
+        """Combine '2024-05-01' and '09:30 AM' (or '09:30') into a datetime"""
+        for fmt in ("%Y-%m-%d %I:%M %p", "%Y-%m-%d %H:%M"):
+            try:
+                return datetime.strptime(f"{booking_date} {booking_time.strip()}", fmt)
+            except ValueError:
+                continue
+        return None
+    
+    @staticmethod
+    def _booking_result(consultation: Consultation, doctor: dict, message: str) -> dict:
+        return {
+            "status": "success",
+            "message": message,
+            "consultation_id": f"cons_{consultation.id}",
+            "consultation": {
+                "consultation_id": f"cons_{consultation.id}",
+                "user_id": consultation.user_id,
+                "doctor_id": consultation.doctor_id,
+                "doctor_name": doctor["name"],
+                "date": consultation.scheduled_at.strftime("%Y-%m-%d"),
+                "time": consultation.scheduled_at.strftime("%I:%M %p"),
+                "symptoms": json.loads(consultation.symptoms or "[]"),
+                "notes": consultation.notes,
+                "status": consultation.status,
+                "booked_at": consultation.created_at.isoformat() if consultation.created_at else None
+            }
+        }
+    
+    async def _find_by_idempotency_key(self, db: AsyncSession, user_id: int, key: str) -> Optional[Consultation]:
+        return await db.scalar(
+            select(Consultation).where(
+                Consultation.user_id == user_id,
+                Consultation.idempotency_key == key
+            )
+        )
     
     async def book_consultation(
         self,
+        db: AsyncSession,
         user_id: int,
         doctor_id: str,
         booking_date: str,
         booking_time: str,
         symptoms: List[str],
-        notes: str = ""
+        notes: str = "",
+        idempotency_key: Optional[str] = None
     ) -> dict:
-        """Book a consultation with a doctor"""
+        """
+        Book a consultation with a doctor.
+        The slot is claimed by the INSERT itself: a unique (doctor_id,
+        scheduled_at) index makes exactly one concurrent booking win, across
+        every worker, without a lock. A repeated idempotency_key returns the
+        original booking instead of creating a new one.
+        """
         doctor = await self.get_doctor_by_id(doctor_id)
         if not doctor:
-            return {"status": "error", "message": "Doctor not found"}
+            return {"status": "error", "code": "not_found", "message": "Doctor not found"}
         
-        consultation = {
-            "consultation_id": f"cons_{len(self.consultations) + 1}",
-            "user_id": user_id,
-            "doctor_id": doctor_id,
-            "doctor_name": doctor["name"],
-            "date": booking_date,
-            "time": booking_time,
-            "symptoms": symptoms,
-            "notes": notes,
-            "status": "booked",
-            "booked_at": datetime.utcnow().isoformat()
-        }
+        if idempotency_key:
+            existing = await self._find_by_idempotency_key(db, user_id, idempotency_key)
+            if existing is not None:
+                return self._booking_result(existing, doctor, f"Consultation booked with {doctor['name']}")
         
-        self.consultations.append(consultation)
+        if not doctor["available"]:
+            return {"status": "error", "code": "invalid", "message": "Doctor is not available for booking"}
         
-        return {
-            "status": "success",
-            "message": f"Consultation booked with {doctor['name']}",
-            "consultation": consultation
-        }
+        scheduled_at = self.parse_slot(booking_date, booking_time)
+        if scheduled_at is None:
+            return {"status": "error", "code": "invalid", "message": "Invalid booking date or time"}
+        if scheduled_at < datetime.now():
+            return {"status": "error", "code": "invalid", "message": "Requested time is in the past"}
+        # Only grid membership is checked here; whether the slot is still free
+        # is decided atomically by the unique index on insert
+        if not self.availability.is_on_grid(doctor_id, scheduled_at):
+            return {"status": "error", "code": "invalid", "message": "Requested time is not an available slot"}
+        
+        consultation = Consultation(
+            user_id=user_id,
+            doctor_id=doctor_id,
+            doctor_name=doctor["name"],
+            consultation_type="video",
+            status="scheduled",
+            symptoms=json.dumps(symptoms),
+            notes=notes,
+            scheduled_at=scheduled_at,
+            idempotency_key=idempotency_key
+        )
+        db.add(consultation)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            await self._invalidate_day(doctor_id, scheduled_at.date())
+            if idempotency_key:
+                # A concurrent retry with the same key may have won the race
+                existing = await self._find_by_idempotency_key(db, user_id, idempotency_key)
+                if existing is not None:
+                    return self._booking_result(existing, doctor, f"Consultation booked with {doctor['name']}")
+            return {"status": "error", "code": "conflict", "message": "This slot has already been booked"}
+        
+        await self._invalidate_day(doctor_id, scheduled_at.date())
+        await db.refresh(consultation)
+        return self._booking_result(consultation, doctor, f"Consultation booked with {doctor['name']}")
     
     def get_consultation_specialties(self) -> List[str]:
         """Get all available specialties"""
         return self.specialties
     
-    async def search_doctors(self, query: str) -> List[dict]:
+    async def search_doctors(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> List[dict]:
         """Search doctors by name or specialty"""
         query_lower = query.lower()
-        results = [
-            d for d in self.doctors 
-            if query_lower in d["name"].lower() or query_lower in d["specialty"].lower()
+        if not query_lower:
+            return self._in_order(self._by_id, limit, after)
+        if len(query_lower) <= MAX_GRAM:
+            return self._in_order(self._gram_index.get(query_lower, ()), limit, after)
+        
+        # Intersect trigram postings (rarest first), then confirm the full substring
+        postings = sorted(
+            (self._gram_index.get(query_lower[i:i + MAX_GRAM], set())
+             for i in range(len(query_lower) - MAX_GRAM + 1)),
+            key=len
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates &= posting
+        matches = [
+            i for i in candidates
+            if query_lower in self._search_text[i] and "\n" not in query_lower
         ]
-        return results
+        return self._in_order(matches, limit, after)
     
     async def get_doctor_reviews(self, doctor_id: str) -> dict:
         """Get doctor reviews and ratings"""
@@ -0,0 +1,211 @@
+import asyncio
+import heapq
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from geo import EARTH_RADIUS_KM, distance_km
+from services.hospital_store import HospitalStore
+
+
+class CacheEntry:
+    """Hospitals fetched around one grid cell centre, as a HospitalStore"""
+
+    __slots__ = ("radius_km", "store", "expires_at", "stale_until", "size_bytes")
+
+    def __init__(self, radius_km: float, store: HospitalStore, expires_at: float,
+                 stale_until: float, size_bytes: int):
+        self.radius_km = radius_km
+        self.store = store
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size_bytes = size_bytes
+
+
+class HospitalCache:
+    """
+    Bounded cache of upstream hospital lookups.
+
+    Coordinates are snapped to a grid of `cell_deg` degrees, and every entry
+    holds the hospitals within `radius_km` of its cell centre. A query
+    anywhere in the cell is answered by filtering that store, as long as the
+    query circle fits inside the cached one. Entries are evicted LRU-first
+    when the entry or byte budget is exceeded. After their TTL passes they
+    can still be served as stale for `stale_seconds` while a refresh runs,
+    and are dropped after that.
+    """
+
+    def __init__(self, cell_deg: float = 0.01, ttl_seconds: float = 3600,
+                 max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024,
+                 stale_seconds: float = 600):
+        self.cell_deg = cell_deg
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[Tuple[int, int], CacheEntry]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, Tuple[int, int]]] = []
+        self._bytes = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # ---------- grid helpers ----------
+
+    def cell_key(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Grid cell containing a coordinate"""
+        return (math.floor(latitude / self.cell_deg), math.floor(longitude / self.cell_deg))
+
+    def cell_center(self, key: Tuple[int, int]) -> Tuple[float, float]:
+        """Coordinate at the centre of a grid cell"""
+        return ((key[0] + 0.5) * self.cell_deg, (key[1] + 0.5) * self.cell_deg)
+
+    def cell_margin_km(self) -> float:
+        """Upper bound on the distance from any point in a cell to its centre"""
+        half_diagonal_deg = self.cell_deg * math.sqrt(2) / 2
+        return math.radians(half_diagonal_deg) * EARTH_RADIUS_KM
+
+    def fetch_params(self, latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float]:
+        """
+        Upstream query (lat, lon, radius_km) whose result can be cached for the cell.
+        The radius is padded so any point in the cell is covered, and is never
+        less than the cell's current entry, so refreshing a stale entry for a
+        narrow query does not replace it with a narrower one.
+        """
+        key = self.cell_key(latitude, longitude)
+        center_lat, center_lon = self.cell_center(key)
+        fetch_radius_km = math.ceil(radius_km + self.cell_margin_km())
+        entry = self._entries.get(key)
+        if entry is not None:
+            fetch_radius_km = max(fetch_radius_km, entry.radius_km)
+        return center_lat, center_lon, fetch_radius_km
+
+    # ---------- cache operations ----------
+
+    def get(self, latitude: float, longitude: float, radius_km: float) -> Optional[HospitalStore]:
+        """Return the fresh cached store covering radius_km around the point, or None"""
+        result = self.lookup(latitude, longitude, radius_km, allow_stale=False)
+        return result[0] if result is not None else None
+
+    def lookup(self, latitude: float, longitude: float, radius_km: float,
+               allow_stale: bool = True) -> Optional[Tuple[HospitalStore, bool]]:
+        """
+        Return (store covering radius_km around the point, is_stale), or None on a miss.
+        Stale results are only returned when allow_stale is set.
+        """
+        self.purge_expired()
+
+        key = self.cell_key(latitude, longitude)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is None or entry.stale_until <= now:
+            self.misses += 1
+            return None
+
+        stale = entry.expires_at <= now
+        if stale and not allow_stale:
+            self.misses += 1
+            return None
+
+        center_lat, center_lon = self.cell_center(key)
+        offset_km = distance_km(center_lat, center_lon, latitude, longitude)
+        if offset_km + radius_km > entry.radius_km:
+            # Cached circle is too small for this query
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return entry.store, stale
+
+    def put(self, latitude: float, longitude: float, radius_km: float, store: HospitalStore,
+            age_seconds: float = 0):
+        """
+        Cache the hospitals fetched around the cell containing the point.
+        `age_seconds` is how long ago they were fetched (e.g. by another worker).
+        """
+        key = self.cell_key(latitude, longitude)
+        existing = self._entries.get(key)
+        if existing is not None and existing.radius_km > radius_km and existing.expires_at > time.monotonic():
+            # Keep the wider, still-valid entry
+            return
+
+        size_bytes = store.nbytes()
+        if size_bytes > self.max_bytes:
+            return
+
+        self._remove(key)
+        expires_at = time.monotonic() + self.ttl_seconds - age_seconds
+        stale_until = expires_at + self.stale_seconds
+        self._entries[key] = CacheEntry(radius_km, store, expires_at, stale_until, size_bytes)
+        self._bytes += size_bytes
+        heapq.heappush(self._expiry_heap, (stale_until, key))
+        if len(self._expiry_heap) > 4 * self.max_entries:
+            self._compact_heap()
+
+        self.purge_expired()
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def purge_expired(self) -> int:
+        """Drop every entry past its stale window; returns how many were removed"""
+        now = time.monotonic()
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            stale_until, key = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(key)
+            # Skip heap records left behind by replaced entries
+            if entry is not None and entry.stale_until == stale_until:
+                self._remove(key)
+                self.expirations += 1
+                removed += 1
+        return removed
+
+    async def run_janitor(self, interval_seconds: float = 60):
+        """Background task that purges expired entries on a fixed interval"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            self.purge_expired()
+
+    def clear(self):
+        self._entries.clear()
+        self._expiry_heap.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Cache counters and current size"""
+        lookups = self.hits + self.stale_hits + self.misses
+        served = self.hits + self.stale_hits
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    # ---------- internals ----------
+
+    def _remove(self, key: Tuple[int, int]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size_bytes
+
+    def _compact_heap(self):
+        """Rebuild the expiry heap from live entries only"""
+        self._expiry_heap = [(entry.stale_until, key) for key, entry in self._entries.items()]
+        heapq.heapify(self._expiry_heap)
+
@@ -0,0 +1,279 @@
+import bisect
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geo import haversine_km
+
+# How much a query term matching each field counts towards the text score
+FIELD_WEIGHTS = {"name": 3.0, "services": 2.0, "address": 1.0}
+
+# Match quality of a query term against an indexed term
+EXACT = 1.0
+PREFIX = 0.75
+FUZZY = 0.5
+
+# Terms shorter than this are only matched exactly or as prefixes
+MIN_FUZZY_LENGTH = 4
+
+# Distance at which a match's score is halved
+DISTANCE_HALF_KM = 10.0
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase, accents stripped, punctuation turned into spaces"""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    plain = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", plain.lower()).strip()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return normalize(text).split()
+
+
+def _trigrams(term: str) -> List[str]:
+    """Trigrams of a term padded with "$" at both ends, so short terms get some too"""
+    padded = f"${term}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def max_edits(term: str) -> int:
+    """Typos tolerated in a query term of this length"""
+    if len(term) < MIN_FUZZY_LENGTH:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Levenshtein distance with adjacent transpositions, or limit + 1 as soon
+    as it is known to exceed `limit`
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class HospitalSearchIndex:
+    """
+    Inverted index over hospital names, services and addresses.
+
+    Every query term matches indexed terms exactly, as a prefix (for
+    typeahead) or within one or two typos (found through a trigram index of
+    the vocabulary). Hospitals must match every query term; their text
+    score adds up the best field-weighted match per term and is then
+    discounted by distance from the searcher.
+
+    The index is immutable: build a new one when the hospitals change.
+    """
+
+    def __init__(self, keys: Sequence[Hashable], latitude: Sequence[float], longitude: Sequence[float],
+                 documents: Iterable[Tuple[Optional[str], Sequence[str], Optional[str]]]):
+        """documents holds (name, services, address) per hospital, in the same order as keys"""
+        self.keys = list(keys)
+        self.latitude = np.array(latitude, dtype=np.float64)
+        self.longitude = np.array(longitude, dtype=np.float64)
+
+        postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        for row, (name, services, address) in enumerate(documents):
+            weights: Dict[str, float] = {}
+            fields = (("name", name), ("services", " ".join(services or ())), ("address", address))
+            for field, text in fields:
+                weight = FIELD_WEIGHTS[field]
+                for term in tokenize(text):
+                    if weights.get(term, 0.0) < weight:
+                        weights[term] = weight
+            for term, weight in weights.items():
+                rows, term_weights = postings.setdefault(term, ([], []))
+                rows.append(row)
+                term_weights.append(weight)
+
+        # Sorted vocabulary, so a prefix is a contiguous range found by bisection
+        self.terms = sorted(postings)
+        self._term_id = {term: i for i, term in enumerate(self.terms)}
+        # Posting lists end to end; term i owns [offsets[i], offsets[i + 1])
+        self._offsets = [0]
+        rows, weights = [], []
+        for term in self.terms:
+            rows.extend(postings[term][0])
+            weights.extend(postings[term][1])
+            self._offsets.append(len(rows))
+        self._rows = np.array(rows, dtype=np.int32)
+        self._weights = np.array(weights, dtype=np.float32)
+
+        self._gram_terms: Dict[str, List[int]] = {}
+        for term_id, term in enumerate(self.terms):
+            for gram in set(_trigrams(term)):
+                self._gram_terms.setdefault(gram, []).append(term_id)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # ---------- term matching ----------
+
+    def _prefix_range(self, prefix: str) -> range:
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "\uffff", lo=start)
+        return range(start, end)
+
+    def _fuzzy_terms(self, term: str, limit: int) -> Dict[int, int]:
+        """Vocabulary terms within `limit` edits of `term` or of its prefixes -> edits"""
+        grams = _trigrams(term)
+        # Each edit breaks at most three trigrams; the trailing "$" gram is
+        # also lost when the query is only the start of a longer term
+        needed = len(grams) - 3 * limit - 1
+        shared = Counter()
+        for gram in set(grams):
+            shared.update(self._gram_terms.get(gram, ()))
+
+        matches = {}
+        for term_id, count in shared.items():
+            if count < needed:
+                continue
+            candidate = self.terms[term_id]
+            edits = min(
+                edit_distance(term, candidate, limit),
+                edit_distance(term, candidate[:len(term)], limit),
+            )
+            if 0 < edits <= limit:
+                matches[term_id] = edits
+        return matches
+
+    def term_matches(self, term: str) -> Dict[int, float]:
+        """Indexed terms matching one query term -> match quality"""
+        matches: Dict[int, float] = {}
+        limit = max_edits(term)
+        if limit:
+            for term_id, edits in self._fuzzy_terms(term, limit).items():
+                matches[term_id] = FUZZY / edits
+        for term_id in self._prefix_range(term):
+            matches[term_id] = PREFIX
+        exact = self._term_id.get(term)
+        if exact is not None:
+            matches[exact] = EXACT
+        return matches
+
+    # ---------- queries ----------
+
+    def text_scores(self, query: str) -> np.ndarray:
+        """Text score of every hospital for `query`, 0 where a query term is missing (or there are none)"""
+        terms = tokenize(query)
+        total = np.zeros(len(self.keys), dtype=np.float32)
+        if not terms:
+            return total
+        matched = np.ones(len(self.keys), dtype=bool)
+        for term in dict.fromkeys(terms):
+            best = np.zeros(len(self.keys), dtype=np.float32)
+            rows, weights = [], []
+            for term_id, quality in self.term_matches(term).items():
+                start, end = self._offsets[term_id], self._offsets[term_id + 1]
+                rows.append(self._rows[start:end])
+                weights.append(self._weights[start:end] * quality)
+            if rows:
+                np.maximum.at(best, np.concatenate(rows), np.concatenate(weights))
+            # Hospitals missing any query term drop out
+            matched &= best > 0
+            if not matched.any():
+                break
+            total += best
+        total[~matched] = 0
+        return total
+
+    def search(self, query: str, latitude: float, longitude: float, radius_km: Optional[float] = None,
+               after: Optional[tuple] = None, limit: Optional[int] = None) -> List[Tuple[float, float, Hashable]]:
+        """
+        Matching hospitals as (score, distance_km, key), unordered. score is
+        the text score scaled down with distance from the point.
+
+        With `after` (a previous (-score, distance_km, key) sort key) only
+        later matches are kept, and with `limit` only the best `limit` scores
+        and their ties, so just one page of matches is turned into tuples.
+        """
+        text = self.text_scores(query)
+        rows = text.nonzero()[0]
+        distances = haversine_km(latitude, longitude, self.latitude[rows], self.longitude[rows])
+        if radius_km is not None:
+            keep = distances <= radius_km
+            rows, distances = rows[keep], distances[keep]
+        scores = np.round(text[rows] * (DISTANCE_HALF_KM / (DISTANCE_HALF_KM + distances)), 4)
+        distances = np.round(distances, 2)
+
+        if after is not None:
+            # Exact ties with the cursor are settled by key once the page is
+            # sorted, so they must not use up the limit
+            same_score = -scores == after[0]
+            keep = (-scores > after[0]) | (same_score & (distances >= after[1]))
+            if limit is not None:
+                limit += int(np.count_nonzero(same_score & (distances == after[1])))
+            rows, scores, distances = rows[keep], scores[keep], distances[keep]
+        if limit is not None and len(rows) > limit:
+            threshold = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+            keep = scores >= threshold
+            rows, scores, distances = rows[keep], scores[keep], distances[keep]
+
+        return [
+            (score, distance, self.keys[row])
+            for row, score, distance in zip(rows.tolist(), scores.tolist(), distances.tolist())
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            "hospitals": len(self.keys),
+            "terms": len(self.terms),
+            "postings": len(self._rows),
+        }
+
+
+def store_documents(store) -> Tuple[List[Hashable], np.ndarray, np.ndarray, List[Tuple]]:
+    """
+    Arguments for HospitalSearchIndex from a HospitalStore, copied out so the
+    index can be built in another thread while the store keeps changing
+    """
+    count = len(store)
+    keys = [store.key(row) for row in range(count)]
+    documents = [store.document(row) for row in range(count)]
+    return keys, store.latitude[:count].copy(), store.longitude[:count].copy(), documents
+
+
+def index_hospitals(hospitals: Sequence[Dict]) -> Tuple[HospitalSearchIndex, Dict[str, Dict]]:
+    """
+    Index hospital dicts shaped like HospitalStore.row(); returns the index
+    and the hospital for each of its keys. A hospital is keyed by its id as
+    text, so cursors survive a reordered response. A missing or repeated id
+    gets a numbered key of its own ("#1", or "x#1" for the second "x"), so
+    no hospital is lost.
+    """
+    by_key: Dict[str, Dict] = {}
+    for hospital in hospitals:
+        base = "" if hospital.get("id") is None else str(hospital["id"])
+        key, repeat = base, 0
+        while not key or key in by_key:
+            repeat += 1
+            key = f"{base}#{repeat}"
+        by_key[key] = hospital
+    index = HospitalSearchIndex(
+        list(by_key),
+        [h["latitude"] for h in by_key.values()],
+        [h["longitude"] for h in by_key.values()],
+        [(h.get("name"), h.get("services"), h.get("address")) for h in by_key.values()],
+    )
+    return index, by_key
@@ -1,18 +1,198 @@
 import requests
-import math
 import os
-from typing import List, Dict, Optional
+import struct
+import time
+from typing import List, Dict, Iterable, Optional, Tuple
 from datetime import datetime
 import asyncio
 import aiohttp
 
+import numpy as np
+
+from geojson_stream import FeatureStream
+from metrics import counter, span
+from services.hospital_cache import HospitalCache
+from services.hospital_store import HospitalStore, build_store
+from shared_state import SharedState
+
+CACHE_LOOKUPS = counter(
+    "medialert_hospital_cache_lookups_total", "Real hospital cache lookups by result", ("result",)
+)
+UPSTREAM_ERRORS = counter(
+    "medialert_upstream_errors_total", "Failed Healthsites.io requests by reason", ("reason",)
+)
+FALLBACKS = counter("medialert_hospital_fallbacks_total", "Requests answered from sample hospitals")
+SKIPPED_FEATURES = counter(
+    "medialert_hospital_features_skipped_total", "Upstream features dropped while parsing", ("reason",)
+)
+TRUNCATED_RESPONSES = counter(
+    "medialert_upstream_truncated_total", "Upstream responses cut off at HEALTHSITES_MAX_RESULTS"
+)
+
+# Radius and fetch time in front of a shared store's bytes
+_SHARED_ENTRY = struct.Struct("<dd")
+# Fetch lock lifetime beyond the upstream timeout
+_SHARED_LOCK_MARGIN_SECONDS = 5.0
+
+# Keys of a parsed hospital, plus distance_km where a route adds it
+HOSPITAL_FIELDS = {
+    "id", "name", "address", "phone", "latitude", "longitude", "services", "type",
+    "beds", "emergency", "operating_hours", "rating", "website", "distance_km"
+}
+
+# Fallback data for when Healthsites.io is unavailable
+SAMPLE_HOSPITALS = [
+    {
+        "id": "ph_01",
+        "name": "Rivers State University Teaching Hospital",
+        "address": "Alakahia Road, Port Harcourt, Rivers State",
+        "phone": "+234-803-123-4567",
+        "latitude": 4.8156,
+        "longitude": 6.9271,
+        "services": ["Emergency", "Surgery", "ICU", "Maternity", "Cardiology"],
+        "type": "teaching_hospital",
+        "beds": 500,
+        "emergency": True,
+        "operating_hours": "24/7",
+        "rating": 4.7,
+        "website": "https://rsuth.edu.ng",
+    },
+    {
+        "id": "ph_02",
+        "name": "University of Port Harcourt Teaching Hospital",
+        "address": "Choba, Port Harcourt, Rivers State",
+        "phone": "+234-803-456-7890",
+        "latitude": 4.9081,
+        "longitude": 6.9131,
+        "services": ["Emergency", "General", "Cardiology", "Orthopedics"],
+        "type": "teaching_hospital",
+        "beds": 400,
+        "emergency": True,
+        "operating_hours": "24/7",
+        "rating": 4.6,
+        "website": "https://uniport.edu.ng/hospital",
+    },
+    {
+        "id": "ph_03",
+        "name": "Port Harcourt Private Hospital",
+        "address": "Diobu, Port Harcourt, Rivers State",
+        "phone": "+234-803-789-0123",
+        "latitude": 4.8300,
+        "longitude": 6.9400,
+        "services": ["Emergency", "ICU", "Surgery", "Pediatrics"],
+        "type": "private_hospital",
+        "beds": 150,
+        "emergency": True,
+        "operating_hours": "24/7",
+        "rating": 4.8,
+        "website": "https://phhospital.com",
+    },
+    {
+        "id": "ph_04",
+        "name": "Saint Luke's Medical Centre",
+        "address": "GRA, Port Harcourt, Rivers State",
+        "phone": "+234-803-234-5678",
+        "latitude": 4.7900,
+        "longitude": 6.9600,
+        "services": ["Emergency", "General", "Pediatrics", "Maternity"],
+        "type": "private_hospital",
+        "beds": 120,
+        "emergency": True,
+        "operating_hours": "24/7",
+        "rating": 4.5,
+        "website": "https://stlukes.com.ng",
+    },
+    {
+        "id": "ph_05",
+        "name": "Victory Clinic & Maternity",
+        "address": "Mile 1, Port Harcourt, Rivers State",
+        "phone": "+234-803-345-6789",
+        "latitude": 4.8500,
+        "longitude": 6.9200,
+        "services": ["Emergency", "Maternity", "General", "Pediatrics"],
+        "type": "clinic",
+        "beds": 50,
+        "emergency": True,
+        "operating_hours": "24/7",
+        "rating": 4.4,
+        "website": "https://victoryclinic.com.ng",
+    }
+]
+
+
+def query_store(store: HospitalStore, latitude: float, longitude: float, radius_km: Optional[float],
+                limit: Optional[int] = None, name: Optional[str] = None, **filters) -> List[Dict]:
+    """Matching hospitals in a store as dicts with distance_km, nearest first"""
+    rows, distances = store.select(latitude, longitude, radius_km, **filters)
+    if name:
+        needle = name.lower()
+        keep = np.array([needle in (store.name(r) or "").lower() for r in rows], dtype=bool)
+        rows, distances = rows[keep], distances[keep]
+    order = np.argsort(distances, kind="stable")
+    if limit is not None:
+        order = order[:limit]
+    return [store.row(rows[i], distances[i]) for i in order]
+
+
+class HospitalRecord:
+    """One parsed Healthsites.io facility, on its way into a HospitalStore"""
+    
+    __slots__ = (
+        "id", "name", "address", "phone", "latitude", "longitude", "services", "type",
+        "beds", "emergency", "operating_hours", "rating", "website"
+    )
+    
+    def __init__(self, id, name, address, phone, latitude, longitude, services, type,
+                 beds, emergency, operating_hours, rating, website):
+        self.id = id
+        self.name = name
+        self.address = address
+        self.phone = phone
+        self.latitude = latitude
+        self.longitude = longitude
+        self.services = services
+        self.type = type
+        self.beds = beds
+        self.emergency = emergency
+        self.operating_hours = operating_hours
+        self.rating = rating
+        self.website = website
+    
+    @classmethod
+    def from_feature(cls, feature: Dict) -> Optional["HospitalRecord"]:
+        """Build a record from a GeoJSON feature, or None if it has no usable point"""
+        props = feature.get('properties') or {}
+        coords = (feature.get('geometry') or {}).get('coordinates')
+        if not isinstance(coords, list) or len(coords) < 2:
+            return None
+        try:
+            longitude, latitude = float(coords[0]), float(coords[1])
+        except (TypeError, ValueError):
+            return None
+        emergency = props.get('emergency', 'yes')
+        return cls(
+            id=feature.get('id'),
+            name=props.get('name', 'Unknown Hospital'),
+            address=props.get('addr:full', props.get('address', 'Unknown')),
+            phone=props.get('contact:phone', props.get('phone', '+234-XXX-XXXX')),
+            latitude=latitude,
+            longitude=longitude,
+            services=props.get('amenities', []),
+            type=props.get('type', 'hospital'),
+            beds=props.get('beds', None),
+            emergency=str(emergency).lower() == 'yes',
+            operating_hours=props.get('opening_hours', '24/7'),
+            rating=props.get('rating', 4.5),
+            website=props.get('website', ''),
+        )
+
 class HospitalService:
     """
     Real Hospital Finder - Integrates with Healthsites.io API
     Gets REAL hospitals in Nigeria with verified data
     """
     
-    HEALTHSITES_URL = "https://api.healthsites.io/api/v1/facilities"
+    HEALTHSITES_URL = os.getenv("HEALTHSITES_URL", "https://api.healthsites.io/api/v1/facilities")
     
     # Nigeria major cities coordinates
     NIGERIAN_HOSPITALS = {
@@ -21,184 +201,251 @@ class HospitalService:
         "abuja": {"lat": 9.0765, "lon": 7.3986, "name": "Abuja"},
     }
     
-    def __init__(self):
-        self.cache = {}
-        self.cache_time = {}
+    def __init__(self, shared: Optional[SharedState] = None):
+        self.cache = HospitalCache(
+            cell_deg=float(os.getenv("HOSPITAL_CACHE_CELL_DEG", "0.01")),
+            ttl_seconds=float(os.getenv("HOSPITAL_CACHE_TTL_SECONDS", "3600")),
+            max_entries=int(os.getenv("HOSPITAL_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("HOSPITAL_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+            stale_seconds=float(os.getenv("HOSPITAL_CACHE_STALE_SECONDS", "600")),
+        )
+        # Upper bound on facilities read from one upstream response
+        self.max_results = int(os.getenv("HEALTHSITES_MAX_RESULTS", "2000"))
+        self.chunk_size = int(os.getenv("HEALTHSITES_CHUNK_BYTES", str(64 * 1024)))
+        self.timeout_seconds = float(os.getenv("HEALTHSITES_TIMEOUT_SECONDS", "10"))
+        self.sample_store = build_store(SAMPLE_HOSPITALS)
+        # Cells fetched by any worker, so N workers do not mean N cold caches
+        self.shared = shared
+        self.shared_wait_seconds = float(os.getenv("HOSPITAL_SHARED_WAIT_SECONDS", "2"))
+        self.session: Optional[aiohttp.ClientSession] = None
+        # Upstream fetches in progress, keyed by cache cell: (radius_km, task)
+        self._inflight: Dict[Tuple[int, int], Tuple[float, asyncio.Task]] = {}
+    
+    async def start(self):
+        """
+        Open the shared upstream HTTP session.
+        Connections are kept alive and DNS answers cached, so cache misses
+        reuse an established TLS connection instead of handshaking again.
+        """
+        if self.session is not None and not self.session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=int(os.getenv("HEALTHSITES_POOL_SIZE", "100")),
+            limit_per_host=int(os.getenv("HEALTHSITES_POOL_PER_HOST", "20")),
+            ttl_dns_cache=int(os.getenv("HEALTHSITES_DNS_TTL_SECONDS", "300")),
+            keepalive_timeout=float(os.getenv("HEALTHSITES_KEEPALIVE_SECONDS", "60")),
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.timeout_seconds,
+            connect=float(os.getenv("HEALTHSITES_CONNECT_TIMEOUT_SECONDS", "3")),
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+    
+    async def close(self):
+        """Close the shared upstream HTTP session"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
     
     async def get_real_hospitals(self, latitude: float, longitude: float, 
-                                  radius_km: int = 15) -> List[Dict]:
+                                  radius_km: int = 15, name: Optional[str] = None,
+                                  **filters) -> List[Dict]:
         """
-        Fetch REAL hospitals from Healthsites.io API
+        Fetch REAL hospitals from Healthsites.io API, nearest first
         Uses actual healthcare facility database
+        `name` matches a substring of the hospital name; other filters
+        (services, emergency, min_beds) go to HospitalStore.select
+        """
+        # Check cache first (any cached circle covering this query)
+        cached = self.cache.lookup(latitude, longitude, radius_km)
+        if cached is not None:
+            store, stale = cached
+            CACHE_LOOKUPS.inc("stale" if stale else "hit")
+            if stale:
+                # Serve the expired entry now and refresh it in the background
+                self._start_fetch(latitude, longitude, radius_km)
+            return query_store(store, latitude, longitude, radius_km, name=name, **filters)
+        
+        # Concurrent misses for the same cell share one upstream request
+        CACHE_LOOKUPS.inc("miss")
+        store = await asyncio.shield(self._start_fetch(latitude, longitude, radius_km))
+        if store is None:
+            # Fallback to sample data
+            FALLBACKS.inc()
+            return self._get_sample_hospitals(latitude, longitude, name=name, **filters)
+        return query_store(store, latitude, longitude, radius_km, name=name, **filters)
+    
+    def _start_fetch(self, latitude: float, longitude: float, radius_km: float) -> asyncio.Task:
+        """Return the in-flight fetch covering this query, starting one if needed"""
+        fetch_lat, fetch_lon, fetch_radius_km = self.cache.fetch_params(latitude, longitude, radius_km)
+        cell = self.cache.cell_key(latitude, longitude)
+        
+        inflight = self._inflight.get(cell)
+        if inflight is not None and inflight[0] >= fetch_radius_km:
+            return inflight[1]
+        
+        task = asyncio.create_task(self._fetch(fetch_lat, fetch_lon, fetch_radius_km))
+        self._inflight[cell] = (fetch_radius_km, task)
+        
+        def _done(_):
+            if self._inflight.get(cell, (None, None))[1] is task:
+                del self._inflight[cell]
+        task.add_done_callback(_done)
+        return task
+    
+    async def _fetch(self, latitude: float, longitude: float, radius_km: float) -> Optional[HospitalStore]:
         """
+        Query Healthsites.io around a cell centre and cache the result.
+        Returns None when the upstream is unavailable.
+        With shared state, a result another worker cached is used instead,
+        and only one worker at a time fetches a given cell.
+        """
+        lock_token = None
+        if self.shared is not None:
+            store, lock_token = await self._shared_lookup(latitude, longitude, radius_km)
+            if store is not None:
+                return store
         try:
-            # Check cache first (cache for 1 hour)
-            cache_key = f"{latitude},{longitude},{radius_km}"
-            if cache_key in self.cache:
-                cache_age = datetime.now().timestamp() - self.cache_time.get(cache_key, 0)
-                if cache_age < 3600:  # 1 hour
-                    return self.cache[cache_key]
+            if self.session is None or self.session.closed:
+                await self.start()
+            
+            params = {
+                "latitude": latitude,
+                "longitude": longitude,
+                "radius": radius_km * 1000,  # Convert to meters
+            }
             
-            async with aiohttp.ClientSession() as session:
-                params = {
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "radius": radius_km * 1000,  # Convert to meters
-                }
-                
-                async with session.get(self.HEALTHSITES_URL, params=params, timeout=10) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        hospitals = self._parse_hospitals(data)
-                        
-                        # Cache results
-                        self.cache[cache_key] = hospitals
-                        self.cache_time[cache_key] = datetime.now().timestamp()
-                        
-                        return hospitals
-                    else:
-                        # Fallback to sample data
-                        return self._get_sample_hospitals(latitude, longitude)
+            with span("healthsites.fetch", "upstream"):
+                async with self.session.get(self.HEALTHSITES_URL, params=params) as resp:
+                    if resp.status != 200:
+                        UPSTREAM_ERRORS.inc(f"http_{resp.status}")
+                        return None
+                    store, truncated = await self._read_hospitals(resp.content)
+            
+            store.trim()
+            if truncated:
+                # Upstream order isn't by distance, so a cut-off response
+                # covers no radius; answer this request but don't cache it
+                return store
+            self.cache.put(latitude, longitude, radius_km, store)
+            if self.shared is not None:
+                await self._shared_put(latitude, longitude, radius_km, store)
+            return store
         except Exception as e:
+            UPSTREAM_ERRORS.inc(type(e).__name__)
             print(f"Error fetching hospitals: {e}")
-            return self._get_sample_hospitals(latitude, longitude)
+            return None
+        finally:
+            if lock_token is not None:
+                # Only this worker's own lock; after a timed-out wait another worker holds it
+                await self._shared_call(
+                    self.shared.delete_if(self._shared_key(latitude, longitude) + ":lock", lock_token)
+                )
     
-    def _parse_hospitals(self, data: Dict) -> List[Dict]:
-        """Parse Healthsites.io response into our format"""
-        hospitals = []
-        
-        for feature in data.get('features', []):
-            try:
-                props = feature.get('properties', {})
-                coords = feature.get('geometry', {}).get('coordinates', [0, 0])
-                
-                hospital = {
-                    "id": feature.get('id'),
-                    "name": props.get('name', 'Unknown Hospital'),
-                    "address": props.get('addr:full', props.get('address', 'Unknown')),
-                    "phone": props.get('contact:phone', props.get('phone', '+234-XXX-XXXX')),
-                    "latitude": coords[1],
-                    "longitude": coords[0],
-                    "services": props.get('amenities', []),
-                    "type": props.get('type', 'hospital'),
-                    "beds": props.get('beds', None),
-                    "emergency": props.get('emergency', 'yes').lower() == 'yes',
-                    "operating_hours": props.get('opening_hours', '24/7'),
-                    "rating": props.get('rating', 4.5),
-                    "website": props.get('website', ''),
-                }
-                hospitals.append(hospital)
-            except Exception as e:
-                print(f"Error parsing hospital: {e}")
+    # ---------- shared state ----------
+    
+    def _shared_key(self, latitude: float, longitude: float) -> str:
+        cell = self.cache.cell_key(latitude, longitude)
+        return f"hospitals:{cell[0]}:{cell[1]}"
+    
+    async def _shared_call(self, call):
+        """Await a shared state call, treating errors like a miss"""
+        try:
+            return await call
+        except Exception as e:
+            print(f"Hospital shared state error: {e}")
+            return None
+    
+    async def _shared_lookup(self, latitude: float, longitude: float,
+                             radius_km: float) -> Tuple[Optional[HospitalStore], Optional[bytes]]:
+        """
+        (store, None) with a fresh store another worker cached for this cell,
+        or (None, lock token) when this worker should fetch it. The token is
+        set when this worker took the cell's fetch lock, and is None when it
+        gave up waiting for another worker's lock. While another worker holds
+        the lock, waits up to shared_wait_seconds for its result.
+        """
+        key = self._shared_key(latitude, longitude)
+        token = os.urandom(16)
+        deadline = time.monotonic() + self.shared_wait_seconds
+        while True:
+            raw = await self._shared_call(self.shared.get(key))
+            entry = self._shared_entry(raw) if raw is not None else None
+            if entry is not None:
+                fetched_radius_km, fetched_at, store = entry
+                age = time.time() - fetched_at
+                if fetched_radius_km >= radius_km and age < self.cache.ttl_seconds:
+                    CACHE_LOOKUPS.inc("shared")
+                    self.cache.put(latitude, longitude, fetched_radius_km, store, age_seconds=age)
+                    return store, None
+            # Held for the whole upstream request, plus parsing and storing
+            # the result; _fetch() deletes it as soon as it is done
+            lock_ttl = self.timeout_seconds + _SHARED_LOCK_MARGIN_SECONDS
+            locked = await self._shared_call(self.shared.add(key + ":lock", token, lock_ttl))
+            if locked:
+                return None, token
+            if locked is None or time.monotonic() >= deadline:
+                return None, None
+            await asyncio.sleep(0.05)
+    
+    @staticmethod
+    def _shared_entry(raw: bytes) -> Optional[Tuple[float, float, HospitalStore]]:
+        """(radius_km, fetched_at, store) from a shared entry, or None if it is not valid"""
+        try:
+            radius_km, fetched_at = _SHARED_ENTRY.unpack_from(raw, 0)
+            return radius_km, fetched_at, HospitalStore.from_bytes(raw[_SHARED_ENTRY.size:])
+        except (struct.error, ValueError) as e:
+            print(f"Ignoring invalid shared hospital entry: {e}")
+            return None
+    
+    async def _shared_put(self, latitude: float, longitude: float, radius_km: float, store: HospitalStore):
+        payload = _SHARED_ENTRY.pack(radius_km, time.time()) + store.to_bytes()
+        await self._shared_call(self.shared.set(self._shared_key(latitude, longitude), payload,
+                                                self.cache.ttl_seconds))
+    
+    async def _read_hospitals(self, content: aiohttp.StreamReader) -> Tuple[HospitalStore, bool]:
+        """
+        Parse facilities from the response body as it arrives.
+        Only one chunk and the feature being decoded are held besides the
+        store itself, and reading stops after max_results facilities.
+        Returns the store and whether the response was cut off.
+        """
+        parser = FeatureStream()
+        store = HospitalStore()
+        async for chunk in content.iter_chunked(self.chunk_size):
+            if self._collect(parser.feed(chunk), store):
+                return store, True
+            if parser.done:
+                return store, False
+        truncated = self._collect(parser.close(), store)
+        return store, truncated
+    
+    def _collect(self, features: Iterable[Dict], store: HospitalStore) -> bool:
+        """Add parsed features to `store`; True once max_results is reached"""
+        for feature in features:
+            if len(store) >= self.max_results:
+                TRUNCATED_RESPONSES.inc()
+                return True
+            hospital = HospitalRecord.from_feature(feature) if isinstance(feature, dict) else None
+            if hospital is None:
+                SKIPPED_FEATURES.inc("no_coordinates")
                 continue
-        
-        return hospitals
+            store.add_record(hospital)
+        return False
     
-    def _get_sample_hospitals(self, latitude: float, longitude: float) -> List[Dict]:
+    def _parse_hospitals(self, data: Dict) -> HospitalStore:
+        """Parse an already decoded Healthsites.io response"""
+        store = HospitalStore()
+        self._collect(data.get('features', []), store)
+        return store
+    
+    def _get_sample_hospitals(self, latitude: float, longitude: float, name: Optional[str] = None,
+                              **filters) -> List[Dict]:
         """
-        Sample hospitals for Port Harcourt, Lagos, Abuja
+        The 5 closest sample hospitals (Port Harcourt, Lagos, Abuja)
         Used as fallback when API is unavailable
         """
-        sample_data = [
-            {
-                "id": "ph_01",
-                "name": "Rivers State University Teaching Hospital",
-                "address": "Alakahia Road, Port Harcourt, Rivers State",
-                "phone": "+234-803-123-4567",
-                "latitude": 4.8156,
-                "longitude": 6.9271,
-                "services": ["Emergency", "Surgery", "ICU", "Maternity", "Cardiology"],
-                "type": "teaching_hospital",
-                "beds": 500,
-                "emergency": True,
-                "operating_hours": "24/7",
-                "rating": 4.7,
-                "website": "https://rsuth.edu.ng",
-            },
-            {
-                "id": "ph_02",
-                "name": "University of Port Harcourt Teaching Hospital",
-                "address": "Choba, Port Harcourt, Rivers State",
-                "phone": "+234-803-456-7890",
-                "latitude": 4.9081,
-                "longitude": 6.9131,
-                "services": ["Emergency", "General", "Cardiology", "Orthopedics"],
-                "type": "teaching_hospital",
-                "beds": 400,
-                "emergency": True,
-                "operating_hours": "24/7",
-                "rating": 4.6,
-                "website": "https://uniport.edu.ng/hospital",
-            },
-            {
-                "id": "ph_03",
-                "name": "Port Harcourt Private Hospital",
-                "address": "Diobu, Port Harcourt, Rivers State",
-                "phone": "+234-803-789-0123",
-                "latitude": 4.8300,
-                "longitude": 6.9400,
-                "services": ["Emergency", "ICU", "Surgery", "Pediatrics"],
-                "type": "private_hospital",
-                "beds": 150,
-                "emergency": True,
-                "operating_hours": "24/7",
-                "rating": 4.8,
-                "website": "https://phhospital.com",
-            },
-            {
-                "id": "ph_04",
-                "name": "Saint Luke's Medical Centre",
-                "address": "GRA, Port Harcourt, Rivers State",
-                "phone": "+234-803-234-5678",
-                "latitude": 4.7900,
-                "longitude": 6.9600,
-                "services": ["Emergency", "General", "Pediatrics", "Maternity"],
-                "type": "private_hospital",
-                "beds": 120,
-                "emergency": True,
-                "operating_hours": "24/7",
-                "rating": 4.5,
-                "website": "https://stlukes.com.ng",
-            },
-            {
-                "id": "ph_05",
-                "name": "Victory Clinic & Maternity",
-                "address": "Mile 1, Port Harcourt, Rivers State",
-                "phone": "+234-803-345-6789",
-                "latitude": 4.8500,
-                "longitude": 6.9200,
-                "services": ["Emergency", "Maternity", "General", "Pediatrics"],
-                "type": "clinic",
-                "beds": 50,
-                "emergency": True,
-                "operating_hours": "24/7",
-                "rating": 4.4,
-                "website": "https://victoryclinic.com.ng",
-            }
-        ]
-        
-        # Calculate distance and sort
-        for hospital in sample_data:
-            hospital["distance_km"] = self._calculate_distance(
-                latitude, longitude,
-                hospital["latitude"], hospital["longitude"]
-            )
-        
-        return sorted(sample_data, key=lambda x: x["distance_km"])[:5]
-    
-    def _calculate_distance(self, lat1: float, lon1: float, 
-                           lat2: float, lon2: float) -> float:
-        """Calculate distance between two coordinates (Haversine formula)"""
-        R = 6371  # Earth's radius in km
-        
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        return round(R * c, 2)
+        return query_store(self.sample_store, latitude, longitude, None, limit=5, name=name, **filters)
     
     def get_emergency_numbers(self, country: str = "NG") -> Dict:
         """Get emergency numbers by country"""
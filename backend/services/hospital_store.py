@@ -0,0 +1,594 @@
+import struct
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from geo import bounding_box, haversine_km, nearest_k
+from models import Hospital
+
+# Services get a filter bit each, in order of first appearance
+MAX_SERVICE_BITS = 64
+
+
+def _number(value, cast):
+    """value as int/float, or None if it is missing or not numeric"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _resized(array: np.ndarray, capacity: int, fill) -> np.ndarray:
+    """Copy of `array` with `capacity` slots, new ones set to `fill`"""
+    resized = np.full(capacity, fill, dtype=array.dtype)
+    count = min(len(array), capacity)
+    resized[:count] = array[:count]
+    return resized
+
+
+class _PackedText:
+    """
+    Mostly-unique strings (names, addresses, ids) as UTF-8 in one bytearray,
+    addressed by per-row offset and length. Rewritten rows leave their old
+    bytes behind until compact().
+    """
+
+    def __init__(self, capacity: int):
+        self.data = bytearray()
+        self.start = np.zeros(capacity, dtype=np.uint32)
+        self.length = np.full(capacity, -1, dtype=np.int32)  # -1 is None
+
+    def resize(self, capacity: int):
+        self.start = _resized(self.start, capacity, 0)
+        self.length = _resized(self.length, capacity, -1)
+
+    def set(self, row: int, value: Optional[str]):
+        if value is None:
+            self.length[row] = -1
+            return
+        encoded = str(value).encode("utf-8")
+        self.start[row] = len(self.data)
+        self.length[row] = len(encoded)
+        self.data += encoded
+
+    def get(self, row: int) -> Optional[str]:
+        length = self.length[row]
+        if length < 0:
+            return None
+        start = self.start[row]
+        return self.data[start:start + length].decode("utf-8")
+
+    def move(self, source: int, target: int):
+        self.start[target] = self.start[source]
+        self.length[target] = self.length[source]
+
+    def compact(self, rows: int):
+        """Rewrite the buffer with only the bytes of the first `rows` rows"""
+        data = bytearray()
+        for row in range(rows):
+            length = self.length[row]
+            if length >= 0:
+                start = self.start[row]
+                self.start[row] = len(data)
+                data += self.data[start:start + length]
+        self.data = data
+
+    def nbytes(self) -> int:
+        return len(self.data) + self.start.nbytes + self.length.nbytes
+
+
+class _InternedColumn:
+    """Low-cardinality values (types, opening hours, service lists) stored once, with a code per row"""
+
+    def __init__(self, capacity: int):
+        self.codes = np.zeros(capacity, dtype=np.int32)
+        self.values: List = [None]
+        self._index: Dict = {None: 0}
+
+    def resize(self, capacity: int):
+        self.codes = _resized(self.codes, capacity, 0)
+
+    def set(self, row: int, value):
+        code = self._index.get(value)
+        if code is None:
+            if isinstance(value, str):
+                value = sys.intern(value)
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        self.codes[row] = code
+
+    def get(self, row: int):
+        return self.values[self.codes[row]]
+
+    def move(self, source: int, target: int):
+        self.codes[target] = self.codes[source]
+
+    def compact(self, rows: int):
+        pass
+
+    def nbytes(self) -> int:
+        return self.codes.nbytes + sum(sys.getsizeof(v) for v in self.values)
+
+
+class _KeyColumn:
+    """Hospital ids: database ids in an int64 array, upstream string ids packed"""
+
+    def __init__(self, capacity: int):
+        self.ints = np.zeros(capacity, dtype=np.int64)
+        self.is_int = np.zeros(capacity, dtype=bool)
+        self.text = _PackedText(capacity)
+
+    def resize(self, capacity: int):
+        self.ints = _resized(self.ints, capacity, 0)
+        self.is_int = _resized(self.is_int, capacity, False)
+        self.text.resize(capacity)
+
+    def set(self, row: int, key: Hashable):
+        is_int = isinstance(key, int) and not isinstance(key, bool)
+        self.is_int[row] = is_int
+        self.ints[row] = key if is_int else 0
+        self.text.set(row, None if is_int else key)
+
+    def get(self, row: int) -> Hashable:
+        return int(self.ints[row]) if self.is_int[row] else self.text.get(row)
+
+    def move(self, source: int, target: int):
+        self.ints[target] = self.ints[source]
+        self.is_int[target] = self.is_int[source]
+        self.text.move(source, target)
+
+    def compact(self, rows: int):
+        self.text.compact(rows)
+
+    def nbytes(self) -> int:
+        return self.ints.nbytes + self.is_int.nbytes + self.text.nbytes()
+
+
+class HospitalStore:
+    """
+    Columnar in-memory hospital table.
+
+    Coordinates, a service bitmask, the emergency flag, bed counts and
+    ratings are parallel NumPy arrays, so radius and attribute filters run
+    vectorized over every row at once. Text is packed or interned rather
+    than held as one dict per hospital.
+
+    append() adds rows without checking ids, for bulk loads; upsert()
+    replaces the row with the same id, building the id -> row index the
+    first time it is needed. remove() swaps the last row into the gap.
+    """
+
+    def __init__(self, capacity: int = 256):
+        capacity = max(capacity, 1)
+        self._size = 0
+        self._row_of: Optional[Dict[Hashable, int]] = None
+
+        self.latitude = np.zeros(capacity, dtype=np.float64)
+        self.longitude = np.zeros(capacity, dtype=np.float64)
+        self.services_mask = np.zeros(capacity, dtype=np.uint64)
+        self.emergency = np.zeros(capacity, dtype=bool)
+        self.beds = np.full(capacity, -1, dtype=np.int32)  # -1 is unknown
+        self.rating = np.full(capacity, np.nan, dtype=np.float32)
+
+        self._keys = _KeyColumn(capacity)
+        self._name = _PackedText(capacity)
+        self._address = _PackedText(capacity)
+        self._phone = _PackedText(capacity)
+        self._website = _PackedText(capacity)
+        self._services = _InternedColumn(capacity)
+        self._type = _InternedColumn(capacity)
+        self._hours = _InternedColumn(capacity)
+
+        self._service_bits: Dict[str, int] = {}
+
+        # Database refresh bookkeeping (see reload/refresh)
+        self.loaded_at: Optional[float] = None
+        self._watermark: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key) -> bool:
+        return key in self._index()
+
+    _ARRAYS = {"latitude": 0, "longitude": 0, "services_mask": 0, "emergency": False,
+               "beds": -1, "rating": np.nan}
+
+    @property
+    def _texts(self):
+        return (self._keys.text, self._name, self._address, self._phone, self._website)
+
+    @property
+    def _columns(self):
+        return (self._keys, self._name, self._address, self._phone, self._website,
+                self._services, self._type, self._hours)
+
+    # ---------- writes ----------
+
+    def _resize(self, capacity: int):
+        for name, fill in self._ARRAYS.items():
+            setattr(self, name, _resized(getattr(self, name), capacity, fill))
+        for column in self._columns:
+            column.resize(capacity)
+
+    def trim(self):
+        """Release spare capacity once a bulk load is finished"""
+        if len(self.latitude) > self._size:
+            self._resize(max(self._size, 1))
+
+    def _index(self) -> Dict[Hashable, int]:
+        if self._row_of is None:
+            self._row_of = {self._keys.get(row): row for row in range(self._size)}
+        return self._row_of
+
+    def service_bit(self, service: str, create: bool = False) -> Optional[int]:
+        """Filter bit of a service (case-insensitive), or None past MAX_SERVICE_BITS"""
+        service = service.strip().lower()
+        bit = self._service_bits.get(service)
+        if bit is None and create and len(self._service_bits) < MAX_SERVICE_BITS:
+            bit = self._service_bits[service] = len(self._service_bits)
+        return bit
+
+    def append(self, key: Hashable, latitude: float, longitude: float, **fields):
+        """Add a row for a hospital id that is not in the store yet"""
+        if self._size == len(self.latitude):
+            self._resize(len(self.latitude) * 2)
+        row = self._size
+        self._size += 1
+        self._keys.set(row, key)
+        if self._row_of is not None:
+            self._row_of[key] = row
+        self._write(row, latitude, longitude, **fields)
+
+    def upsert(self, key: Hashable, latitude: float, longitude: float, **fields):
+        """Insert a hospital, or overwrite the row with the same id"""
+        row = self._index().get(key)
+        if row is None:
+            self.append(key, latitude, longitude, **fields)
+        else:
+            self._write(row, latitude, longitude, **fields)
+
+    def _write(self, row: int, latitude: float, longitude: float, name: Optional[str] = None,
+               address: Optional[str] = None, phone: Optional[str] = None,
+               services: Sequence[str] = (), type: Optional[str] = None, beds: Optional[int] = None,
+               emergency: bool = True, operating_hours: Optional[str] = None,
+               rating: Optional[float] = None, website: Optional[str] = None):
+        self.latitude[row] = latitude
+        self.longitude[row] = longitude
+        services = tuple(str(s) for s in services or ())
+        mask = 0
+        for service in services:
+            bit = self.service_bit(service, create=True)
+            if bit is not None:
+                mask |= 1 << bit
+        self.services_mask[row] = mask
+        self.emergency[row] = bool(emergency)
+        beds = _number(beds, int)
+        rating = _number(rating, float)
+        self.beds[row] = beds if beds is not None and beds >= 0 else -1
+        self.rating[row] = rating if rating is not None else np.nan
+
+        self._name.set(row, name)
+        self._address.set(row, address)
+        self._phone.set(row, phone)
+        self._website.set(row, website)
+        self._services.set(row, services)
+        self._type.set(row, type)
+        self._hours.set(row, operating_hours)
+
+    def add_record(self, record):
+        """Append a parsed upstream HospitalRecord"""
+        self.append(
+            record.id, record.latitude, record.longitude, name=record.name, address=record.address,
+            phone=record.phone, services=record.services if isinstance(record.services, list) else (),
+            type=record.type, beds=record.beds, emergency=record.emergency,
+            operating_hours=record.operating_hours, rating=record.rating, website=record.website,
+        )
+
+    def remove(self, key: Hashable) -> bool:
+        index = self._index()
+        row = index.pop(key, None)
+        if row is None:
+            return False
+        last = self._size - 1
+        if row != last:
+            index[self._keys.get(last)] = row
+            for name in self._ARRAYS:
+                array = getattr(self, name)
+                array[row] = array[last]
+            for column in self._columns:
+                column.move(last, row)
+        self._size = last
+        return True
+
+    def compact(self):
+        """Drop text left behind by overwritten and removed rows"""
+        for column in self._columns:
+            column.compact(self._size)
+
+    # ---------- reads ----------
+
+    def key(self, row: int) -> Hashable:
+        return self._keys.get(row)
+
+    def name(self, row: int) -> Optional[str]:
+        return self._name.get(row)
+
+    def find(self, key: Hashable) -> Optional[int]:
+        """Row holding a hospital id, or None"""
+        return self._index().get(key)
+
+    def document(self, row: int) -> Tuple[Optional[str], Tuple[str, ...], Optional[str]]:
+        """(name, services, address) of a row, the text the search index covers"""
+        return self._name.get(row), self._services.get(row), self._address.get(row)
+
+    def row(self, row: int, distance_km: Optional[float] = None) -> Dict:
+        """One hospital as an API dict"""
+        beds = int(self.beds[row])
+        rating = float(self.rating[row])
+        hospital = {
+            "id": self._keys.get(row),
+            "name": self._name.get(row),
+            "address": self._address.get(row),
+            "phone": self._phone.get(row),
+            "latitude": float(self.latitude[row]),
+            "longitude": float(self.longitude[row]),
+            "services": list(self._services.get(row)),
+            "type": self._type.get(row),
+            "beds": beds if beds >= 0 else None,
+            "emergency": bool(self.emergency[row]),
+            "operating_hours": self._hours.get(row),
+            "rating": rating if rating == rating else None,
+            "website": self._website.get(row),
+        }
+        if distance_km is not None:
+            hospital["distance_km"] = round(float(distance_km), 2)
+        return hospital
+
+    def select(self, latitude: float, longitude: float, radius_km: Optional[float] = None,
+               services: Sequence[str] = (), emergency: Optional[bool] = None,
+               min_beds: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows matching every filter, with their distance from the point:
+        e.g. services=["ICU"], emergency=True, radius_km=10. Unordered.
+        """
+        n = self._size
+        lat = self.latitude[:n]
+        lon = self.longitude[:n]
+        if radius_km is not None:
+            min_lat, min_lon, max_lat, max_lon = bounding_box(latitude, longitude, radius_km)
+            mask = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        else:
+            mask = np.ones(n, dtype=bool)
+
+        if emergency is not None:
+            mask &= self.emergency[:n] == emergency
+        if min_beds is not None:
+            mask &= self.beds[:n] >= min_beds
+
+        overflow = []
+        required = 0
+        for service in services:
+            bit = self.service_bit(service)
+            if bit is not None:
+                required |= 1 << bit
+            else:
+                overflow.append(service.strip().lower())
+        if required:
+            bits = np.uint64(required)
+            mask &= (self.services_mask[:n] & bits) == bits
+
+        rows = mask.nonzero()[0]
+        if overflow:
+            # Services past MAX_SERVICE_BITS are matched on the stored names
+            rows = np.array([
+                r for r in rows
+                if all(s in {x.lower() for x in self._services.get(r)} for s in overflow)
+            ], dtype=np.intp)
+
+        distances = haversine_km(latitude, longitude, lat[rows], lon[rows])
+        if radius_km is not None:
+            keep = distances <= radius_km
+            rows, distances = rows[keep], distances[keep]
+        return rows, distances
+
+    def nearest(self, latitude: float, longitude: float, k: int, **filters) -> List[Dict]:
+        """The k closest matching hospitals as dicts, nearest first"""
+        rows, distances = self.select(latitude, longitude, **filters)
+        return [self.row(rows[i], distances[i]) for i in nearest_k(distances, k)]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the store"""
+        return (
+            sum(getattr(self, name).nbytes for name in self._ARRAYS)
+            + sum(column.nbytes() for column in self._columns)
+            + (sys.getsizeof(self._row_of) if self._row_of is not None else 0)
+        )
+
+    def stats(self) -> Dict:
+        return {
+            "hospitals": self._size,
+            "bytes": self.nbytes(),
+            "services_indexed": len(self._service_bits),
+            "loaded_at": self.loaded_at,
+        }
+
+    # ---------- serialization ----------
+
+    _FORMAT = b"MAHSTORE"
+    _FORMAT_VERSION = 1
+    # magic, version, JSON header length; the per-row arrays and text bytes follow
+    _FORMAT_HEADER = struct.Struct("<8sHI")
+
+    def _row_arrays(self) -> List[np.ndarray]:
+        """Every per-row array, in serialization order"""
+        arrays = [getattr(self, name) for name in self._ARRAYS] + [self._keys.ints, self._keys.is_int]
+        for text in self._texts:
+            arrays += [text.start, text.length]
+        return arrays + [column.codes for column in (self._services, self._type, self._hours)]
+
+    def to_bytes(self) -> bytes:
+        """
+        The store in a versioned binary format for sharing between
+        processes: a JSON header, then raw column buffers. Unlike pickle,
+        reading it back never runs code.
+        """
+        n = self._size
+        header = orjson.dumps({
+            "size": n,
+            "service_bits": sorted(self._service_bits, key=self._service_bits.get),
+            "services": [list(v) if v is not None else None for v in self._services.values],
+            "types": self._type.values,
+            "hours": self._hours.values,
+            "text_bytes": [len(text.data) for text in self._texts],
+        })
+        parts = [self._FORMAT_HEADER.pack(self._FORMAT, self._FORMAT_VERSION, len(header)), header]
+        parts += [array[:n].tobytes() for array in self._row_arrays()]
+        parts += [bytes(text.data) for text in self._texts]
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HospitalStore":
+        """Load a store written by to_bytes(); ValueError if the data is not a valid store"""
+        try:
+            return cls._from_bytes(memoryview(data))
+        except (KeyError, TypeError, ValueError, IndexError, struct.error) as e:
+            raise ValueError(f"Invalid hospital store data: {e}") from None
+
+    @classmethod
+    def _from_bytes(cls, data: memoryview) -> "HospitalStore":
+        magic, version, header_length = cls._FORMAT_HEADER.unpack_from(data, 0)
+        if magic != cls._FORMAT or version != cls._FORMAT_VERSION:
+            raise ValueError("unknown format or version")
+        position = cls._FORMAT_HEADER.size
+        header = orjson.loads(bytes(data[position:position + header_length]))
+        position += header_length
+
+        n = header["size"]
+        bits = header["service_bits"]
+        if not isinstance(n, int) or n < 0 or len(bits) > MAX_SERVICE_BITS:
+            raise ValueError("bad header")
+        store = cls(capacity=n)
+        for array in store._row_arrays():
+            size = n * array.itemsize
+            if position + size > len(data):
+                raise ValueError("truncated")
+            array[:n] = np.frombuffer(data, dtype=array.dtype, count=n, offset=position)
+            position += size
+        for text, size in zip(store._texts, header["text_bytes"]):
+            if not isinstance(size, int) or size < 0 or position + size > len(data):
+                raise ValueError("truncated")
+            text.data = bytearray(data[position:position + size])
+            position += size
+            present = text.length[:n] >= 0
+            if np.any(text.length[:n] < -1) or np.any(
+                    text.start[:n][present].astype(np.int64) + text.length[:n][present] > size):
+                raise ValueError("text offsets out of range")
+        if position != len(data):
+            raise ValueError("trailing bytes")
+
+        interned = (
+            (store._services, [tuple(map(str, v)) if v is not None else None for v in header["services"]]),
+            (store._type, header["types"]),
+            (store._hours, header["hours"]),
+        )
+        for column, values in interned:
+            if not values or values[0] is not None or \
+                    not all(v is None or isinstance(v, (str, tuple)) for v in values):
+                raise ValueError("bad interned values")
+            codes = column.codes[:n]
+            if np.any(codes < 0) or np.any(codes >= len(values)):
+                raise ValueError("interned codes out of range")
+            column.values = list(values)
+            column._index = {value: code for code, value in enumerate(values)}
+        store._service_bits = {str(service): bit for bit, service in enumerate(bits)}
+        store._size = n
+        return store
+
+    # ---------- database sync ----------
+
+    @staticmethod
+    def _hospital_fields(hospital) -> Dict:
+        return {
+            "name": hospital.name,
+            "address": hospital.address,
+            "phone": hospital.phone,
+            "services": [s for s in (hospital.services or "").split(",") if s],
+            "type": "hospital",
+            "emergency": hospital.emergency_available is not False,
+            "operating_hours": hospital.operating_hours,
+        }
+
+    _COLUMNS = (
+        Hospital.id, Hospital.name, Hospital.address, Hospital.phone, Hospital.latitude,
+        Hospital.longitude, Hospital.services, Hospital.operating_hours,
+        Hospital.emergency_available, Hospital.last_updated,
+    )
+
+    async def reload(self, db: AsyncSession, batch_size: int = 5000):
+        """Load every row of the Hospital table, replacing the current contents"""
+        fresh = HospitalStore(capacity=1024)
+        result = await db.stream(select(*self._COLUMNS).execution_options(yield_per=batch_size))
+        async for hospital in result:
+            fresh.append(hospital.id, hospital.latitude, hospital.longitude,
+                         **self._hospital_fields(hospital))
+            fresh._advance_watermark(hospital.last_updated)
+        fresh.trim()
+        fresh.loaded_at = time.time()
+        # Swap in one step, so concurrent readers see the old or the new table
+        self.__dict__.update(fresh.__dict__)
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """
+        Apply rows inserted or updated since the last load; returns how many.
+        Deletes are only visible as a row count mismatch, which triggers a reload.
+        Rows re-read at the watermark itself only count when they are new.
+        """
+        if self.loaded_at is None:
+            await self.reload(db)
+            return self._size
+        query = select(*self._COLUMNS)
+        if self._watermark is not None:
+            # >= so rows written within the same clock tick are not missed
+            query = query.where(Hospital.last_updated >= self._watermark)
+        changed = 0
+        previous = self._watermark
+        for hospital in (await db.execute(query)).all():
+            if hospital.last_updated != previous or hospital.id not in self:
+                changed += 1
+            self.upsert(hospital.id, hospital.latitude, hospital.longitude,
+                        **self._hospital_fields(hospital))
+            self._advance_watermark(hospital.last_updated)
+
+        total = await db.scalar(select(func.count(Hospital.id)))
+        if total != self._size:
+            await self.reload(db)
+            return self._size
+        self.loaded_at = time.time()
+        return changed
+
+    def _advance_watermark(self, last_updated: Optional[datetime]):
+        if last_updated is not None and (self._watermark is None or last_updated > self._watermark):
+            self._watermark = last_updated
+
+
+def build_store(hospitals: Iterable[Dict]) -> HospitalStore:
+    """A store from hospital dicts shaped like HospitalStore.row()"""
+    hospitals = list(hospitals)
+    store = HospitalStore(capacity=len(hospitals))
+    for h in hospitals:
+        store.upsert(
+            h["id"], h["latitude"], h["longitude"], name=h.get("name"), address=h.get("address"),
+            phone=h.get("phone"), services=h.get("services") or (), type=h.get("type"),
+            beds=h.get("beds"), emergency=h.get("emergency", True),
+            operating_hours=h.get("operating_hours"), rating=h.get("rating"), website=h.get("website"),
+        )
+    return store
@@ -0,0 +1,277 @@
+import asyncio
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from jobs import ClaimedJob, JobQueue, PermanentJobError
+from metrics import counter, span
+from models import EmergencyAssessment, EmergencyContact, Hospital, User
+from services.hospital_service import SAMPLE_HOSPITALS
+
+SMS_SENT = counter("medialert_sms_total", "SMS send attempts by sender and result", ("sender", "result"))
+
+
+class SmsError(Exception):
+    """An SMS that was not sent; `retryable` is False when sending it again cannot help"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class SmsSender:
+    """Sends one text message; subclasses talk to a provider"""
+
+    name = "base"
+
+    async def send(self, to: str, body: str) -> str:
+        """Send `body` to `to` and return the provider's message id, or raise SmsError"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class TwilioSmsSender(SmsSender):
+    """Twilio Messages API over one pooled aiohttp session"""
+
+    name = "twilio"
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str,
+                 api_url: str = "https://api.twilio.com", timeout_seconds: float = 10.0):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.url = f"{api_url.rstrip('/')}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self.timeout_seconds = timeout_seconds
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def send(self, to: str, body: str) -> str:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                auth=aiohttp.BasicAuth(self.account_sid, self.auth_token),
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+            )
+        try:
+            async with self.session.post(self.url, data={"To": to, "From": self.from_number, "Body": body}) as resp:
+                data = await resp.json(content_type=None)
+                if resp.status in (200, 201):
+                    return data["sid"]
+                message = f"Twilio returned {resp.status}: {data.get('message')}"
+                # Rate limits and server errors are worth retrying; bad numbers or credentials are not
+                raise SmsError(message, retryable=resp.status == 429 or resp.status >= 500)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise SmsError(f"Twilio request failed: {type(e).__name__}") from e
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class OutboxSmsSender(SmsSender):
+    """
+    Stand-in sender for development and benchmarks: keeps the last messages
+    in memory instead of sending them
+    """
+
+    name = "outbox"
+
+    def __init__(self, keep: int = 1000):
+        self.keep = keep
+        self.sent: List[Tuple[str, str]] = []
+
+    async def send(self, to: str, body: str) -> str:
+        self.sent.append((to, body))
+        del self.sent[:-self.keep]
+        return f"outbox-{len(self.sent)}"
+
+
+def create_sms_sender() -> SmsSender:
+    """Twilio when TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN and TWILIO_FROM_NUMBER are set, else the outbox"""
+    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
+    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+    from_number = os.getenv("TWILIO_FROM_NUMBER")
+    if account_sid and auth_token and from_number:
+        return TwilioSmsSender(
+            account_sid, auth_token, from_number,
+            api_url=os.getenv("TWILIO_API_URL", "https://api.twilio.com"),
+            timeout_seconds=float(os.getenv("TWILIO_TIMEOUT_SECONDS", "10")),
+        )
+    print("Twilio is not configured; SMS go to the in-memory outbox")
+    return OutboxSmsSender()
+
+
+def _location_text(latitude: Optional[float], longitude: Optional[float], address: Optional[str]) -> str:
+    if address:
+        return address
+    if latitude is None or longitude is None:
+        return "unknown location"
+    return f"https://maps.google.com/?q={latitude:.5f},{longitude:.5f}"
+
+
+class NotificationService:
+    """
+    Job handlers for emergency side effects: texting a user's emergency
+    contacts after an assessment, and alerting a hospital.
+
+    Each handler takes a whole batch of jobs, loads what it needs with one
+    query per table and sends the batch's messages concurrently (at most
+    `max_concurrency` at a time).
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, sender: SmsSender, max_concurrency: int = 10):
+        self.session_factory = session_factory
+        self.sender = sender
+        self.max_concurrency = max_concurrency
+
+    def register(self, queue: JobQueue):
+        queue.register("notify_contact", self.notify_contacts)
+        queue.register("alert_hospital", self.alert_hospitals)
+
+    async def close(self):
+        await self.sender.close()
+
+    async def _send_all(self, prepared: Sequence) -> List[Optional[BaseException]]:
+        """Send the (to, body) pairs in `prepared` concurrently; anything else is skipped"""
+        slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def send(message):
+            async with slots:
+                try:
+                    await self.sender.send(*message)
+                except SmsError as e:
+                    SMS_SENT.inc(self.sender.name, "error")
+                    return e if e.retryable else PermanentJobError(str(e))
+                except Exception as e:
+                    # Fails just this message, not the messages already sent
+                    SMS_SENT.inc(self.sender.name, "error")
+                    return e
+                SMS_SENT.inc(self.sender.name, "sent")
+                return None
+
+        with span("sms.send", "upstream"):
+            return await asyncio.gather(*(send(m) for m in prepared if isinstance(m, tuple)))
+
+    @staticmethod
+    def _merge(prepared: List, sent: List[Optional[BaseException]]) -> List[Optional[BaseException]]:
+        """Line send results back up with jobs; prepared holds a message or the job's error"""
+        results = iter(sent)
+        return [next(results) if isinstance(item, tuple) else item for item in prepared]
+
+    # ---------- contact notifications ----------
+
+    async def notify_contacts(self, jobs: List[ClaimedJob]) -> List[Optional[BaseException]]:
+        """Job payload: assessment_id, user_id, contact_id"""
+        async with self.session_factory() as db:
+            assessments = {
+                a.id: a for a in (await db.scalars(select(EmergencyAssessment).where(
+                    EmergencyAssessment.id.in_({job.payload["assessment_id"] for job in jobs})
+                ))).all()
+            }
+            contacts = {
+                c.id: c for c in (await db.scalars(select(EmergencyContact).where(
+                    EmergencyContact.id.in_({job.payload["contact_id"] for job in jobs})
+                ))).all()
+            }
+            names = dict((await db.execute(select(User.id, User.full_name).where(
+                User.id.in_({job.payload["user_id"] for job in jobs})
+            ))).all())
+
+        prepared = []
+        for job in jobs:
+            assessment = assessments.get(job.payload["assessment_id"])
+            contact = contacts.get(job.payload["contact_id"])
+            if assessment is None:
+                prepared.append(PermanentJobError("assessment not found"))
+            elif contact is None or contact.user_id != job.payload["user_id"] or not contact.is_active:
+                prepared.append(PermanentJobError("contact not found"))
+            else:
+                prepared.append((contact.contact_phone, self._contact_message(
+                    contact, names.get(job.payload["user_id"]) or "Someone", assessment
+                )))
+        errors = self._merge(prepared, await self._send_all(prepared))
+
+        notified = {job.payload["assessment_id"] for job, error in zip(jobs, errors) if error is None}
+        if notified:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(EmergencyAssessment)
+                    .where(EmergencyAssessment.id.in_(notified))
+                    .values(contacts_notified=True)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        return errors
+
+    @staticmethod
+    def _contact_message(contact: EmergencyContact, user_name: str, assessment: EmergencyAssessment) -> str:
+        severity = getattr(assessment.severity_level, "value", assessment.severity_level)
+        location = _location_text(assessment.latitude, assessment.longitude, assessment.location_address)
+        return (
+            f"MediAlert: {user_name} listed you as an emergency contact and just reported "
+            f"a {severity} emergency. Location: {location}"
+        )
+
+    # ---------- hospital alerts ----------
+
+    async def alert_hospitals(self, jobs: List[ClaimedJob]) -> List[Optional[BaseException]]:
+        """Job payload: hospital_id, patient_info, location, symptoms and optionally assessment_id"""
+        phones = await self._hospital_phones({str(job.payload["hospital_id"]) for job in jobs})
+        prepared = []
+        for job in jobs:
+            phone = phones.get(str(job.payload["hospital_id"]))
+            if not phone:
+                prepared.append(PermanentJobError("no phone number for hospital"))
+            else:
+                prepared.append((phone, self._hospital_message(job.payload)))
+        errors = self._merge(prepared, await self._send_all(prepared))
+
+        alerted = {
+            job.payload["assessment_id"] for job, error in zip(jobs, errors)
+            if error is None and job.payload.get("assessment_id") is not None
+        }
+        if alerted:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(EmergencyAssessment)
+                    .where(EmergencyAssessment.id.in_(alerted))
+                    .values(hospital_alert_sent=True)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        return errors
+
+    async def _hospital_phones(self, hospital_ids: set) -> Dict[str, Optional[str]]:
+        """Phone per hospital id: the hospitals table (external or row id), then the sample hospitals"""
+        numeric = {int(h) for h in hospital_ids if h.isdigit()}
+        async with self.session_factory() as db:
+            rows = (await db.execute(
+                select(Hospital.id, Hospital.external_id, Hospital.phone)
+                .where(or_(Hospital.external_id.in_(hospital_ids), Hospital.id.in_(numeric)))
+            )).all()
+        phones: Dict[str, Optional[str]] = {
+            h["id"]: h["phone"] for h in SAMPLE_HOSPITALS if h["id"] in hospital_ids
+        }
+        for row in rows:
+            if row.external_id in hospital_ids:
+                phones[row.external_id] = row.phone
+            if str(row.id) in hospital_ids:
+                phones[str(row.id)] = row.phone
+        return phones
+
+    @staticmethod
+    def _hospital_message(payload: dict) -> str:
+        patient = payload.get("patient_info") or {}
+        location = payload.get("location") or {}
+        details = ", ".join(f"{k}: {v}" for k, v in patient.items() if v not in (None, ""))
+        symptoms = ", ".join(str(s) for s in payload.get("symptoms") or []) or "not given"
+        place = _location_text(location.get("latitude", location.get("lat")),
+                               location.get("longitude", location.get("lon")), location.get("address"))
+        return (
+            f"MediAlert EMERGENCY: patient on the way. {details + '. ' if details else ''}"
+            f"Symptoms: {symptoms}. Location: {place}"
+        )
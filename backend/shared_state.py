@@ -0,0 +1,397 @@
+import asyncio
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import List, Optional, Sequence
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional
+    aioredis = None
+
+DEFAULT_MMAP_PATH = os.path.join(tempfile.gettempdir(), "medialert-shared-state")
+
+
+class SharedState(ABC):
+    """
+    Small key/value store shared by every worker process.
+
+    Values are bytes. Keys may expire after `ttl_seconds`, and counters made
+    with incr() are stored as their decimal text, like Redis does. Backends
+    raise on connection errors; callers decide whether to fall back to their
+    own per-process state.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    async def add(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> bool:
+        """Set `key` only if it does not exist; True if it was set"""
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    async def delete_if(self, key: str, value: bytes) -> bool:
+        """Delete `key` only while it still holds `value` (an owned lock); True if deleted"""
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Atomically add one to a counter (missing counts as 0) and return it"""
+        ...
+
+    async def close(self):
+        pass
+
+
+class RedisState(SharedState):
+    """SharedState on a Redis server, for deployments spanning several hosts"""
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "medialert:shared:"):
+        self.prefix = prefix
+        self.redis = client
+        if self.redis is None:
+            if aioredis is None:
+                raise RuntimeError("the redis package is required for the Redis shared state")
+            self.redis = aioredis.from_url(url)
+
+    @staticmethod
+    def _px(ttl_seconds: Optional[float]) -> Optional[int]:
+        return max(1, int(ttl_seconds * 1000)) if ttl_seconds is not None else None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.redis.get(self.prefix + key)
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        return await self.redis.mget([self.prefix + key for key in keys])
+
+    async def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None):
+        await self.redis.set(self.prefix + key, value, px=self._px(ttl_seconds))
+
+    async def add(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> bool:
+        return bool(await self.redis.set(self.prefix + key, value, px=self._px(ttl_seconds), nx=True))
+
+    async def delete(self, key: str):
+        await self.redis.delete(self.prefix + key)
+
+    async def delete_if(self, key: str, value: bytes) -> bool:
+        key = self.prefix + key
+        async with self.redis.pipeline() as pipe:
+            try:
+                # WATCH makes the DEL fail if the key changes after the GET
+                await pipe.watch(key)
+                if await pipe.get(key) != value:
+                    await pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.delete(key)
+                return bool((await pipe.execute())[0])
+            except aioredis.WatchError:
+                return False
+
+    async def incr(self, key: str) -> int:
+        return await self.redis.incr(self.prefix + key)
+
+    async def close(self):
+        await self.redis.close()
+
+
+class MmapState(SharedState):
+    """
+    SharedState in a memory-mapped file, for several workers on one host.
+
+    The file holds a header, an open-addressing table of key slots and a
+    ring of (key hash, value) records. Writes append to the ring; when it is
+    full the oldest records are either copied forward (while still live) or
+    dropped, so the store behaves like a FIFO cache sized by `data_bytes`.
+    Every operation runs under an flock on the file, so it is atomic across
+    processes; it runs in a worker thread, so waiting for another process's
+    lock never blocks the event loop. Keys are identified by a 64-bit hash.
+    """
+
+    MAGIC = b"MASTATE1"
+    _HEADER = struct.Struct("<8sIQQQ")   # magic, slots, data_bytes, head, tail
+    _HEADER_BYTES = 64
+    _SLOT = struct.Struct("<QQId")       # key hash (0 = empty), record position, length, expires_at
+    _RECORD = struct.Struct("<QI")       # key hash (0 = padding), value length
+
+    def __init__(self, path: str = DEFAULT_MMAP_PATH, slots: int = 65536, data_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._mm = None
+        with self._locked(exclusive=True):
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, self._HEADER_BYTES + slots * self._SLOT.size + data_bytes)
+                self._mm = mmap.mmap(self._fd, 0)
+                self._HEADER.pack_into(self._mm, 0, self.MAGIC, slots, data_bytes, 0, 0)
+            else:
+                self._mm = mmap.mmap(self._fd, 0)
+            magic, self.slots, self.data_bytes, _, _ = self._HEADER.unpack_from(self._mm, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"{path} is not a shared state file")
+        self._data_start = self._HEADER_BYTES + self.slots * self._SLOT.size
+        self._rescued = 0
+
+    @classmethod
+    def reset(cls, path: str = DEFAULT_MMAP_PATH):
+        """
+        Remove the file so the next process to open it starts empty.
+        Only call this before any worker has opened it.
+        """
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    async def _run(self, exclusive: bool, operation, *args):
+        """Run `operation(*args)` under the file lock in a worker thread"""
+        def locked():
+            with self._locked(exclusive):
+                return operation(*args)
+
+        return await asyncio.to_thread(locked)
+
+    # ---------- SharedState ----------
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._run(False, self._read, self._hash(key))
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        hashes = [self._hash(key) for key in keys]
+        return await self._run(False, lambda: [self._read(key_hash) for key_hash in hashes])
+
+    async def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None):
+        await self._run(True, self._write, self._hash(key), value, self._expires_at(ttl_seconds))
+
+    async def add(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> bool:
+        return await self._run(True, self._add, self._hash(key), value, self._expires_at(ttl_seconds))
+
+    async def delete(self, key: str):
+        await self._run(True, self._delete, self._hash(key))
+
+    async def delete_if(self, key: str, value: bytes) -> bool:
+        return await self._run(True, self._delete_if, self._hash(key), value)
+
+    async def incr(self, key: str) -> int:
+        return await self._run(True, self._incr, self._hash(key))
+
+    async def close(self):
+        # The mapping lives as long as the process, so an app restarted in
+        # the same process (tests, benchmarks) keeps working
+        pass
+
+    # ---------- operations (called with the lock held) ----------
+
+    def _add(self, key_hash: int, value: bytes, expires_at: float) -> bool:
+        if self._read(key_hash) is not None:
+            return False
+        self._write(key_hash, value, expires_at)
+        return True
+
+    def _delete(self, key_hash: int):
+        slot = self._find(key_hash)
+        if slot is not None:
+            self._delete_slot(slot)
+
+    def _delete_if(self, key_hash: int, value: bytes) -> bool:
+        if self._read(key_hash) != value:
+            return False
+        self._delete_slot(self._find(key_hash))
+        return True
+
+    def _incr(self, key_hash: int) -> int:
+        current = self._read(key_hash)
+        value = int(current or 0) + 1
+        slot = self._find(key_hash)
+        # Like Redis, incrementing keeps the key's expiry
+        expires_at = self._slot(slot)[3] if current is not None else 0.0
+        self._write(key_hash, str(value).encode(), expires_at)
+        return value
+
+    # ---------- slots ----------
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        return value or 1
+
+    @staticmethod
+    def _expires_at(ttl_seconds: Optional[float]) -> float:
+        return time.time() + ttl_seconds if ttl_seconds is not None else 0.0
+
+    def _slot(self, index: int):
+        return self._SLOT.unpack_from(self._mm, self._HEADER_BYTES + index * self._SLOT.size)
+
+    def _put_slot(self, index: int, key_hash: int, position: int, length: int, expires_at: float):
+        self._SLOT.pack_into(self._mm, self._HEADER_BYTES + index * self._SLOT.size,
+                             key_hash, position, length, expires_at)
+
+    def _find(self, key_hash: int) -> Optional[int]:
+        index = key_hash % self.slots
+        for _ in range(self.slots):
+            slot_hash = self._slot(index)[0]
+            if slot_hash == key_hash:
+                return index
+            if slot_hash == 0:
+                return None
+            index = (index + 1) % self.slots
+        return None
+
+    def _claim(self, key_hash: int) -> int:
+        """Slot for `key_hash`: its own, the first free one, or (table full) its home slot"""
+        home = index = key_hash % self.slots
+        for _ in range(self.slots):
+            slot_hash = self._slot(index)[0]
+            if slot_hash in (0, key_hash):
+                return index
+            index = (index + 1) % self.slots
+        return home
+
+    def _delete_slot(self, index: int):
+        """Empty a slot, shifting later entries of its probe chain back (no tombstones)"""
+        self._put_slot(index, 0, 0, 0, 0.0)
+        hole, current = index, index
+        while True:
+            current = (current + 1) % self.slots
+            slot = self._slot(current)
+            if slot[0] == 0:
+                return
+            home = slot[0] % self.slots
+            # The entry may move into the hole unless its home lies cyclically in (hole, current]
+            if (current > hole and (home <= hole or home > current)) or \
+                    (current < hole and home <= hole and home > current):
+                self._put_slot(hole, *slot)
+                self._put_slot(current, 0, 0, 0, 0.0)
+                hole = current
+
+    # ---------- ring ----------
+
+    def _ring(self):
+        return self._HEADER.unpack_from(self._mm, 0)[3:]
+
+    def _set_ring(self, head: int, tail: int):
+        struct.pack_into("<QQ", self._mm, self._HEADER.size - 16, head, tail)
+
+    def _has_room(self, size: int) -> bool:
+        head, tail = self._ring()
+        offset = head % self.data_bytes
+        padding = self.data_bytes - offset if self.data_bytes - offset < size else 0
+        return self.data_bytes - (head - tail) >= size + padding
+
+    def _append(self, key_hash: int, value: bytes) -> int:
+        """Write a record at the head of the ring (room must already exist); returns its position"""
+        size = self._RECORD.size + len(value)
+        head, tail = self._ring()
+        offset = head % self.data_bytes
+        if self.data_bytes - offset < size:
+            # Records never wrap; pad out the end of the ring instead
+            if self.data_bytes - offset >= self._RECORD.size:
+                self._RECORD.pack_into(self._mm, self._data_start + offset, 0,
+                                       self.data_bytes - offset - self._RECORD.size)
+            head += self.data_bytes - offset
+            offset = 0
+        start = self._data_start + offset
+        self._RECORD.pack_into(self._mm, start, key_hash, len(value))
+        self._mm[start + self._RECORD.size:start + size] = value
+        self._set_ring(head + size, tail)
+        return head
+
+    def _collect(self):
+        """Free the oldest record, copying it forward if it is still live"""
+        head, tail = self._ring()
+        offset = tail % self.data_bytes
+        if self.data_bytes - offset < self._RECORD.size:
+            self._set_ring(head, tail + self.data_bytes - offset)
+            return
+        start = self._data_start + offset
+        key_hash, length = self._RECORD.unpack_from(self._mm, start)
+        size = self._RECORD.size + length
+        self._set_ring(head, tail + size)
+        if key_hash == 0:
+            return
+        index = self._find(key_hash)
+        if index is None or self._slot(index)[1] != tail:
+            return
+        expires_at = self._slot(index)[3]
+        live = not expires_at or expires_at > time.time()
+        if live and self._rescued + size <= self.data_bytes // 2 and self._has_room(size):
+            value = bytes(self._mm[start + self._RECORD.size:start + size])
+            self._put_slot(index, key_hash, self._append(key_hash, value), length, expires_at)
+            self._rescued += size
+        else:
+            self._delete_slot(index)
+
+    def _write(self, key_hash: int, value: bytes, expires_at: float):
+        size = self._RECORD.size + len(value)
+        if size > self.data_bytes // 4:
+            raise ValueError(f"Value of {len(value)} bytes is too large for the shared state file")
+        self._rescued = 0
+        while not self._has_room(size):
+            self._collect()
+        position = self._append(key_hash, value)
+        self._put_slot(self._claim(key_hash), key_hash, position, len(value), expires_at)
+
+    def _read(self, key_hash: int) -> Optional[bytes]:
+        index = self._find(key_hash)
+        if index is None:
+            return None
+        _, position, length, expires_at = self._slot(index)
+        if expires_at and expires_at <= time.time():
+            return None
+        start = self._data_start + position % self.data_bytes + self._RECORD.size
+        return bytes(self._mm[start:start + length])
+
+
+def create_shared_state() -> Optional[SharedState]:
+    """
+    The backend named by SHARED_STATE_BACKEND ("redis" or "mmap"), or None
+    when every worker should keep its own state
+    """
+    backend = os.getenv("SHARED_STATE_BACKEND", "").lower()
+    if backend == "redis":
+        url = os.getenv("SHARED_STATE_REDIS_URL") or os.getenv("REDIS_URL")
+        if not url or aioredis is None:
+            print("SHARED_STATE_BACKEND=redis needs REDIS_URL and the redis package; state stays per-process")
+            return None
+        return RedisState(url)
+    if backend == "mmap":
+        return MmapState(
+            os.getenv("SHARED_STATE_PATH", DEFAULT_MMAP_PATH),
+            slots=int(os.getenv("SHARED_STATE_SLOTS", "65536")),
+            data_bytes=int(os.getenv("SHARED_STATE_BYTES", str(64 * 1024 * 1024))),
+        )
+    if backend:
+        print(f"Unknown SHARED_STATE_BACKEND {backend!r}; state stays per-process")
+    return None
@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+import time
+import unicodedata
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+CRITICAL = 1
+WARNING = 2
+
+_CATEGORIES = {"critical": CRITICAL, "warning": WARNING}
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "triage_lexicon.json")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip diacritics so 'Ìrora àyà' matches 'irora aya'"""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _is_boundary(text: str, index: int) -> bool:
+    """True if `index` is outside `text` or on a character that is not part of a word"""
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+class TriageAutomaton:
+    """
+    Aho-Corasick automaton over triage keywords.
+
+    A keyword must start a word, so "fits" does not match inside
+    "benefits", but may run on into a longer one ("chest pain" matches
+    "chest pains") unless it is in `whole_words`. Each node stores (length,
+    categories, whole_word) for every keyword ending there, including via
+    fail links, so a scan never walks the fail chain to report matches.
+    """
+
+    def __init__(self, keywords: Dict[str, int], whole_words: Set[str] = frozenset()):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[tuple] = [()]
+
+        for keyword, category in keywords.items():
+            node = 0
+            for ch in keyword:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                node = nxt
+            self.out[node] += ((len(keyword), category, keyword in whole_words),)
+
+        # Breadth-first pass to build fail links
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                fallback = self.fail[node]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def scan(self, text: str) -> List[tuple]:
+        """Return (end_index, categories) for every position where a keyword ends"""
+        goto = self.goto
+        fail = self.fail
+        out = self.out
+        node = 0
+        hits = []
+        for index, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                categories = 0
+                for length, category, whole_word in out[node]:
+                    if _is_boundary(text, index - length) and (not whole_word or _is_boundary(text, index + 1)):
+                        categories |= category
+                if categories:
+                    hits.append((index, categories))
+        return hits
+
+
+class TriageResult:
+    """Which symptoms (by position in the input list) matched each category"""
+
+    __slots__ = ("critical", "warning")
+
+    def __init__(self, critical: Set[int], warning: Set[int]):
+        self.critical = critical
+        self.warning = warning
+
+
+class TriageLexicon:
+    """
+    Triage vocabulary compiled into a single automaton.
+
+    The lexicon file maps each category ("critical", "warning") to canonical
+    terms and their synonyms in any language. Terms match at the start of a
+    word and cover its inflections; terms under "whole_word" must also end
+    one (short terms such as "ara wu" that begin other words). The file is
+    re-read when its modification time changes, checked at most every
+    `check_interval` seconds.
+    """
+
+    def __init__(self, path: str = DEFAULT_LEXICON_PATH, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self.terms = 0
+        self.automaton = self._load()
+
+    def _load(self) -> TriageAutomaton:
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self._mtime = os.path.getmtime(self.path)
+
+        keywords: Dict[str, int] = {}
+        for category_name, entries in data.items():
+            category = _CATEGORIES.get(category_name)
+            if category is None:
+                continue
+            for canonical, synonyms in entries.items():
+                for term in [canonical, *synonyms]:
+                    term = normalize(term).strip()
+                    if term:
+                        keywords[term] = keywords.get(term, 0) | category
+
+        whole_words = {normalize(term).strip() for term in data.get("whole_word", ())}
+        self.terms = len(keywords)
+        return TriageAutomaton(keywords, whole_words)
+
+    def reload(self):
+        """Recompile the automaton from the lexicon file"""
+        self.automaton = self._load()
+
+    def reload_if_changed(self):
+        """Reload when the lexicon file changed; cheap enough to call per request"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                if os.path.getmtime(self.path) != self._mtime:
+                    self.reload()
+            except (OSError, ValueError) as e:
+                # Keep serving the last good lexicon
+                print(f"Error reloading triage lexicon: {e}")
+
+    def classify(self, symptoms: Iterable[str]) -> TriageResult:
+        """Match every symptom against the lexicon in one scan of the joined text"""
+        self.reload_if_changed()
+
+        # Newlines never appear in keywords, so matches can't span symptoms
+        starts = []
+        parts = []
+        offset = 0
+        for symptom in symptoms:
+            text = normalize(symptom).replace("\n", " ")
+            starts.append(offset)
+            parts.append(text)
+            offset += len(text) + 1
+
+        critical: Set[int] = set()
+        warning: Set[int] = set()
+        for end, categories in self.automaton.scan("\n".join(parts)):
+            index = bisect_right(starts, end) - 1
+            if categories & CRITICAL:
+                critical.add(index)
+            if categories & WARNING:
+                warning.add(index)
+        return TriageResult(critical, warning)